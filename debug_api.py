@@ -1,4 +1,3 @@
-import requests
 import json
 import sys
 import os
@@ -6,8 +5,10 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 try:
     from src import config
+    from src.http_session import get_session
 except ImportError:
     import config
+    from http_session import get_session
 
 def inspect_api_structure():
     # URL for games
@@ -20,7 +21,7 @@ def inspect_api_structure():
 
     print(f"🕵️ Fetching raw data from: {url}")
     try:
-        response = requests.get(url, headers=headers, params=params)
+        response = get_session().get(url, headers=headers, params=params)
         data = response.json()
         
         if not data.get('response'):
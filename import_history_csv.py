@@ -1,14 +1,23 @@
 import pandas as pd
 import psycopg2
-from psycopg2.extras import execute_values
+import argparse
 import hashlib
+import json
+import time
+import sys
 import os
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from src.bulk_writer import bulk_upsert
 
 # --- CONFIG ---
 DB_HOST = "localhost"
 DB_NAME = "football_db"
 DB_USER = "postgres"
 DB_PASS = "1004"
+WORKERS = os.cpu_count() or 2   # Files parsed in parallel
+MANIFEST_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache", "history_import_manifest.json")
 
 # --- LEAGUE MAPPING ---
 LEAGUE_MAP = {
@@ -35,94 +44,209 @@ def generate_id(date_str, home, away):
     unique_str = f"{date_str}-{home}-{away}"
     return int(hashlib.sha256(unique_str.encode('utf-8')).hexdigest(), 16) % (10**8)
 
-def import_csv_to_db():
+def team_id(name):
+    return int(hashlib.sha256(name.encode('utf-8')).hexdigest(), 16) % (10**6)
+
+MATCH_COLUMNS = ['match_id', 'league_id', 'match_date', 'home_team_id', 'away_team_id', 'home_goals', 'away_goals', 'status']
+
+def league_for_file(filename):
+    name_no_ext = os.path.splitext(filename)[0].split(' ')[0]
+    for key in LEAGUE_MAP:
+        if key.lower() == name_no_ext.lower():
+            return LEAGUE_MAP[key]
+    return None
+
+def find_history_files(root_dir):
+    """(path, league_id) for every league file in the datahistory_* season folders, oldest season first."""
+    files = []
+    for folder in sorted(os.listdir(root_dir)):
+        folder_path = os.path.join(root_dir, folder)
+        if not folder.startswith('datahistory_') or not os.path.isdir(folder_path): continue
+        for filename in sorted(os.listdir(folder_path)):
+            if not filename.lower().endswith(".csv"): continue
+            league_id = league_for_file(filename)
+            if league_id:
+                files.append((os.path.join(folder_path, filename), league_id))
+    return files
+
+def match_keys(df, league_id):
+    """
+    Column-wise identity of every importable row of a football-data frame:
+    unparseable dates, missing home teams and non-numeric scores are dropped,
+    like the former per-row loop. Returns a DataFrame indexed like `df`.
+    """
+    # 1. Dates (one vectorized parse instead of one per row)
+    dates = pd.to_datetime(df['Date'], dayfirst=True, format='mixed', errors='coerce')
+
+    # 2. Teams
+    home = df['HomeTeam'].astype(str).str.strip()
+    away = df['AwayTeam'].astype(str).str.strip()
+    hg = pd.to_numeric(df['FTHG'], errors='coerce')
+    ag = pd.to_numeric(df['FTAG'], errors='coerce')
+
+    valid = dates.notna() & (home != '') & (away != '') & (home != 'nan') & hg.notna() & ag.notna()
+    date_str = dates[valid].dt.strftime('%Y-%m-%d')
+    home, away = home[valid], away[valid]
+
+    # 3. IDs (each team name is hashed once per file)
+    ids = {name: team_id(name) for name in pd.unique(pd.concat([home, away]))}
+
+    return pd.DataFrame({
+        'match_id': [generate_id(d, h, a) for d, h, a in zip(date_str, home, away)],
+        'league_id': league_id,
+        'match_date': date_str,
+        'home_team': home,
+        'away_team': away,
+        'home_team_id': home.map(ids),
+        'away_team_id': away.map(ids),
+        'home_goals': hg[valid].astype(int),
+        'away_goals': ag[valid].astype(int),
+    }, index=date_str.index)
+
+def parse_history_file(path, league_id):
+    """One football-data CSV -> (matches, teams) DataFrames, built column-wise."""
+    try:
+        df = pd.read_csv(path, encoding='latin-1')
+        if not {'FTHG', 'FTAG', 'Date', 'HomeTeam', 'AwayTeam'}.issubset(df.columns): return None
+
+        keys = match_keys(df, league_id)
+        matches = keys.assign(status='FT')[MATCH_COLUMNS].reset_index(drop=True)
+        teams = pd.concat([
+            keys[['home_team_id', 'home_team']].set_axis(['team_id', 'name'], axis=1),
+            keys[['away_team_id', 'away_team']].set_axis(['team_id', 'name'], axis=1),
+        ]).drop_duplicates().reset_index(drop=True)
+        return matches, teams
+    except Exception as e:
+        print(f"    Error reading {path}: {e}")
+        return None
+
+# --- MANIFEST ---
+# Per file: size, mtime, sha256 and one hash per imported row, so a re-run only
+# reads files that changed and only writes their new or edited rows.
+
+def load_manifest(path=None):
+    try:
+        with open(path or MANIFEST_PATH, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_manifest(manifest, path=None):
+    path = path or MANIFEST_PATH
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.tmp{os.getpid()}"
+    with open(tmp, 'w') as f:
+        json.dump(manifest, f)
+    os.replace(tmp, path)
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def row_hashes(matches):
+    """One stable 64-bit hash per match row (same values -> same hash across runs)."""
+    return pd.util.hash_pandas_object(matches, index=False).tolist()
+
+def changed_files(files, manifest):
+    """
+    Splits files into (to_parse, unchanged). size + mtime is the cheap check;
+    the content hash settles touched-but-identical files.
+    """
+    to_parse, unchanged = [], 0
+    for path, league_id in files:
+        key = os.path.abspath(path)
+        stat = os.stat(path)
+        entry = manifest.get(key)
+        if entry and entry['size'] == stat.st_size and entry['mtime'] == stat.st_mtime:
+            unchanged += 1
+            continue
+        sha = file_sha256(path)
+        if entry and entry['sha256'] == sha:
+            entry['mtime'] = stat.st_mtime
+            unchanged += 1
+            continue
+        to_parse.append((path, league_id, {'size': stat.st_size, 'mtime': stat.st_mtime, 'sha256': sha}))
+    return to_parse, unchanged
+
+def new_rows(matches, entry):
+    """Rows past the previously imported count, plus earlier rows whose content changed."""
+    hashes = row_hashes(matches)
+    old = entry.get('row_hashes', []) if entry else []
+    keep = [i >= len(old) or h != old[i] for i, h in enumerate(hashes)]
+    return matches[keep], hashes
+
+def import_csv_to_db(root_dir=None, workers=None, full=False):
+    root_dir = root_dir or os.path.dirname(os.path.abspath(__file__))
+    files = find_history_files(root_dir)
+    print(f"Found {len(files)} league files in {root_dir}/datahistory_*")
+    if not files: return
+
+    manifest = {} if full else load_manifest()
+    to_parse, unchanged = changed_files(files, manifest)
+    print(f"Manifest: {unchanged} unchanged files skipped, {len(to_parse)} new or changed")
+    if not to_parse:
+        save_manifest(manifest)
+        print("\n✅ History already up to date.")
+        return
+
     conn = get_db_connection()
     if not conn:
         print("Could not connect to DB.")
         return
-    cursor = conn.cursor()
 
-    print(f"Scanning entire project for league files...")
-    root_dir = os.getcwd() 
-    total_imported = 0
+    # Files are parsed in parallel; results come back in file order so later
+    # seasons overwrite earlier ones exactly like the sequential import did.
+    start = time.perf_counter()
+    paths, leagues, fingerprints = zip(*to_parse)
+    with ProcessPoolExecutor(max_workers=workers or WORKERS) as pool:
+        results = list(pool.map(parse_history_file, paths, leagues))
+    print(f"Parsed {sum(r is not None for r in results)} files in {time.perf_counter() - start:.2f}s")
+
+    # Only new or edited rows are written; the manifest entry is replaced once committed
+    match_parts, team_parts, updates = [], [], {}
+    for path, fingerprint, result in zip(paths, fingerprints, results):
+        key = os.path.abspath(path)
+        if result is None:
+            # Not a results file (or unreadable): remembered so it is not re-read until it changes
+            updates[key] = {**fingerprint, 'rows': 0, 'row_hashes': []}
+            continue
+        file_matches, file_teams = result
+        rows, hashes = new_rows(file_matches, manifest.get(key))
+        match_parts.append(rows)
+        team_parts.append(file_teams[file_teams['team_id'].isin(
+            pd.concat([rows['home_team_id'], rows['away_team_id']]))])
+        updates[key] = {**fingerprint, 'rows': len(hashes), 'row_hashes': hashes}
+    if not match_parts:
+        conn.close()
+        manifest.update(updates)
+        save_manifest(manifest)
+        return
 
-    for dirpath, dirnames, filenames in os.walk(root_dir):
-        if any(x in dirpath for x in ['.venv', '.git', '.idea']): continue
-            
-        for filename in filenames:
-            if not filename.lower().endswith(".csv"): continue
+    matches = pd.concat(match_parts, ignore_index=True)
+    teams = pd.concat(team_parts, ignore_index=True)
+    print(f"{len(matches)} new or changed rows to write")
 
-            name_no_ext = os.path.splitext(filename)[0].split(' ')[0] 
-            league_code = None
-            for key in LEAGUE_MAP:
-                if key.lower() == name_no_ext.lower():
-                    league_code = key
-                    break
-            
-            if league_code:
-                full_path = os.path.join(dirpath, filename)
-                league_id = LEAGUE_MAP[league_code]
-                
-                print(f"Processing {filename} (League {league_id})...")
-
-                try:
-                    df = pd.read_csv(full_path, encoding='latin-1')
-                    if 'FTHG' not in df.columns: continue
-
-                    matches_to_insert = []
-                    teams_to_insert = set()
-
-                    for index, row in df.iterrows():
-                        try:
-                            # 1. Date
-                            try:
-                                date_str = pd.to_datetime(row['Date'], dayfirst=True).strftime('%Y-%m-%d')
-                            except: continue
-
-                            # 2. Teams
-                            home = str(row['HomeTeam']).strip()
-                            away = str(row['AwayTeam']).strip()
-                            if not home or not away or home == 'nan': continue
-
-                            hg = int(row['FTHG'])
-                            ag = int(row['FTAG'])
-                            
-                            # 3. IDs
-                            m_id = generate_id(date_str, home, away)
-                            h_id = int(hashlib.sha256(home.encode('utf-8')).hexdigest(), 16) % (10**6)
-                            a_id = int(hashlib.sha256(away.encode('utf-8')).hexdigest(), 16) % (10**6)
-
-                            teams_to_insert.add((h_id, home))
-                            teams_to_insert.add((a_id, away))
-                            
-                            # Matches Schema (Original 8 columns)
-                            matches_to_insert.append((m_id, league_id, date_str, h_id, a_id, hg, ag, 'FT'))
-                        except: continue
-
-                    if teams_to_insert:
-                        query_teams = "INSERT INTO teams (team_id, name) VALUES %s ON CONFLICT (team_id) DO NOTHING"
-                        execute_values(cursor, query_teams, list(teams_to_insert))
-                    
-                    if matches_to_insert:
-                        query_matches = """
-                            INSERT INTO matches 
-                            (match_id, league_id, match_date, home_team_id, away_team_id, home_goals, away_goals, status) 
-                            VALUES %s 
-                            ON CONFLICT (match_id) DO UPDATE SET
-                                home_goals = EXCLUDED.home_goals,
-                                away_goals = EXCLUDED.away_goals,
-                                status = EXCLUDED.status;
-                        """
-                        execute_values(cursor, query_matches, matches_to_insert)
-                    
-                    total_imported += len(matches_to_insert)
-
-                except Exception as e:
-                    print(f"    Error reading file: {e}")
+    # Single writer: one COPY stream per table
+    bulk_upsert(conn, "teams", ['team_id', 'name'], teams.itertuples(index=False, name=None),
+                conflict_cols=['team_id'])
+    bulk_upsert(conn, "matches", MATCH_COLUMNS,
+                ((int(r[0]), int(r[1]), r[2], int(r[3]), int(r[4]), int(r[5]), int(r[6]), r[7])
+                 for r in matches.itertuples(index=False, name=None)),
+                conflict_cols=['match_id'], update_cols=['home_goals', 'away_goals', 'status'])
 
     conn.commit()
     conn.close()
-    print(f"\n✅ SUCCESS! Total matches imported: {total_imported}")
+    manifest.update(updates)
+    save_manifest(manifest)
+    print(f"\n✅ SUCCESS! Total matches imported: {len(matches)}")
 
 if __name__ == "__main__":
-    import_csv_to_db()
\ No newline at end of file
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--root', help="Folder containing the datahistory_* season folders (default: project root)")
+    parser.add_argument('--workers', type=int)
+    parser.add_argument('--full', action='store_true', help="Ignore the manifest and re-import every file")
+    args = parser.parse_args()
+    import_csv_to_db(args.root, args.workers, args.full)
\ No newline at end of file
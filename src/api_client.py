@@ -0,0 +1,284 @@
+import asyncio
+import random
+import threading
+import time
+import sys
+import os
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+try:
+    from src import config
+    from src.http_session import get_session
+    from src.response_cache import ResponseCache
+    from src.quota_planner import get_quota_planner
+except ImportError:
+    import config
+    from http_session import get_session
+    from response_cache import ResponseCache
+    from quota_planner import get_quota_planner
+
+
+class RateLimiter:
+    """
+    Token bucket shared by every request made with the same API key.
+
+    - Starts from config.API_REQUESTS_PER_MINUTE and refills continuously.
+    - Each response re-syncs the bucket with the server's view
+      (x-ratelimit-remaining / x-ratelimit-limit headers).
+    - 429s / rate-limit errors trigger an adaptive backoff (Retry-After when
+      given, otherwise exponential from the refill interval, with jitter)
+      instead of a fixed 65s sleep.
+
+    Thread-safe: football and hockey imports may run concurrently.
+    """
+
+    def __init__(self, per_minute=None, max_backoff=None, window=60.0):
+        self.capacity = float(per_minute or config.API_REQUESTS_PER_MINUTE)
+        self.window = window
+        self.tokens = self.capacity
+        self.max_backoff = max_backoff or config.API_BACKOFF_MAX
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.strikes = 0
+        self.lock = threading.Lock()
+
+    @property
+    def refill_rate(self):
+        return self.capacity / self.window  # tokens per second
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.refill_rate)
+        self.updated = now
+
+    def reserve(self):
+        """Takes one token and returns how many seconds the caller must wait before sending."""
+        with self.lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.tokens -= 1
+            wait = 0.0 if self.tokens >= 0 else -self.tokens / self.refill_rate
+            return max(wait, self.blocked_until - now)
+
+    def update_from_headers(self, headers):
+        """Aligns the bucket with the quota the server reports."""
+        remaining = headers.get('x-ratelimit-remaining')
+        limit = headers.get('x-ratelimit-limit')
+        if remaining is None or limit is None:
+            return
+        try:
+            remaining, limit = float(remaining), float(limit)
+        except ValueError:
+            return
+        with self.lock:
+            self._refill(time.monotonic())
+            if limit > 0:
+                self.capacity = limit
+            # Other clients may have spent quota: never believe we have more than the server says
+            self.tokens = min(self.tokens, remaining)
+
+    def on_success(self):
+        with self.lock:
+            self.strikes = 0
+
+    def backoff(self, retry_after=None):
+        """Registers a rate-limit hit. Returns the delay applied to ALL callers."""
+        with self.lock:
+            self.strikes += 1
+            if retry_after is not None:
+                delay = float(retry_after)
+            else:
+                delay = (1.0 / self.refill_rate) * (2 ** (self.strikes - 1))
+            delay = min(delay, self.max_backoff) * random.uniform(1.0, 1.25)
+            now = time.monotonic()
+            self.blocked_until = max(self.blocked_until, now + delay)
+            self.tokens = min(self.tokens, 0.0)
+            self.updated = now
+            return delay
+
+
+_LIMITERS = {}
+_LIMITERS_LOCK = threading.Lock()
+
+def get_rate_limiter(api_key=None):
+    """One limiter per API key, shared across importers and threads."""
+    api_key = api_key or config.API_KEY
+    with _LIMITERS_LOCK:
+        if api_key not in _LIMITERS:
+            _LIMITERS[api_key] = RateLimiter()
+        return _LIMITERS[api_key]
+
+
+def _rate_limit_error(data):
+    """API-Sports reports some limits as HTTP 200 with an 'errors' payload."""
+    errors = data.get('errors', {}) if isinstance(data, dict) else {}
+    if isinstance(errors, list):
+        errors = errors[0] if errors else {}
+    if not errors:
+        return None, None
+    text = str(errors).lower()
+    is_limit = 'rate' in text and 'limit' in text or 'requests per minute' in text or 'too many requests' in text
+    return errors, is_limit
+
+
+class ApiClient:
+    """
+    API-Sports client with a shared rate limiter and on-disk response cache.
+    get() is blocking; get_async()/fetch_many() run requests concurrently.
+    Returns the decoded JSON payload, or None when the request failed.
+
+    cache=False disables the response cache; in replay mode (config.API_REPLAY)
+    only recorded responses are served and the network is never touched.
+    Requests that reach the network are charged to the key's daily quota
+    (src/quota_planner.py); quota=False disables the accounting.
+    """
+
+    def __init__(self, base_url, api_key=None, limiter=None, max_retries=None, session=None, cache=None,
+                 quota=None):
+        self.base_url = base_url.rstrip('/')
+        self.headers = {'x-apisports-key': api_key or config.API_KEY}
+        self.limiter = limiter or get_rate_limiter(api_key)
+        self.max_retries = config.API_MAX_RETRIES if max_retries is None else max_retries
+        self.session = session or get_session()
+        if cache is None:
+            cache = ResponseCache() if config.API_CACHE_ENABLED or config.API_REPLAY else False
+        self.cache = cache or None
+        self.quota = get_quota_planner(api_key) if quota is None else (quota or None)
+
+    def _from_cache(self, endpoint, params):
+        """Returns (served, payload). served=False means the network must be used."""
+        if self.cache is None:
+            return False, None
+        payload = self.cache.get(self.base_url, endpoint, params)
+        if payload is not None:
+            return True, payload
+        if self.cache.replay:
+            print(f"📼 Replay miss: {endpoint} {params}")
+            return True, None
+        return False, None
+
+    def _to_cache(self, endpoint, params, payload):
+        if self.cache is not None and payload is not None:
+            self.cache.put(self.base_url, endpoint, params, payload)
+        return payload
+
+    def _send(self, endpoint, params):
+        if self.quota is not None:
+            self.quota.record()
+        # Pooled session: keep-alive, timeouts and 5xx/network retries
+        return self.session.get(f"{self.base_url}/{endpoint}", headers=self.headers, params=params)
+
+    def _handle(self, response):
+        """Returns ('ok', data) | ('retry', delay) | ('error', None)."""
+        self.limiter.update_from_headers(response.headers)
+        if self.quota is not None:
+            self.quota.update_from_headers(response.headers)
+
+        if response.status_code == 429:
+            delay = self.limiter.backoff(response.headers.get('retry-after'))
+            print(f"⏳ Rate Limit Hit (429). Backing off {delay:.1f}s...")
+            return 'retry', delay
+        if response.status_code != 200:
+            print(f"⚠️ API Error {response.status_code}: {response.text[:200]}")
+            return 'error', None
+
+        data = response.json()
+        errors, is_limit = _rate_limit_error(data)
+        if errors and is_limit:
+            delay = self.limiter.backoff()
+            print(f"⏳ API Limit Reached. Backing off {delay:.1f}s...")
+            return 'retry', delay
+        if errors:
+            print(f"❌ API Error: {errors}")
+            return 'error', None
+
+        self.limiter.on_success()
+        return 'ok', data
+
+    def get(self, endpoint, params=None):
+        served, payload = self._from_cache(endpoint, params)
+        if served:
+            return payload
+        return self._to_cache(endpoint, params, self._fetch(endpoint, params))
+
+    def _fetch(self, endpoint, params):
+        for _ in range(self.max_retries + 1):
+            time.sleep(self.limiter.reserve())
+            try:
+                outcome, value = self._handle(self._send(endpoint, params))
+            except Exception as e:
+                print(f"❌ Network Error: {e}")
+                return None
+            if outcome == 'ok':
+                return value
+            if outcome == 'error':
+                return None
+        print(f"❌ Giving up on {endpoint} {params} after {self.max_retries + 1} attempts.")
+        return None
+
+    async def get_async(self, endpoint, params=None, semaphore=None):
+        served, payload = self._from_cache(endpoint, params)
+        if served:
+            return payload
+        return self._to_cache(endpoint, params, await self._fetch_async(endpoint, params, semaphore))
+
+    async def _fetch_async(self, endpoint, params, semaphore=None):
+        semaphore = semaphore or asyncio.Semaphore(1)
+        for _ in range(self.max_retries + 1):
+            await asyncio.sleep(self.limiter.reserve())
+            async with semaphore:
+                try:
+                    response = await asyncio.to_thread(self._send, endpoint, params)
+                    outcome, value = self._handle(response)
+                except Exception as e:
+                    print(f"❌ Network Error: {e}")
+                    return None
+            if outcome == 'ok':
+                return value
+            if outcome == 'error':
+                return None
+        print(f"❌ Giving up on {endpoint} {params} after {self.max_retries + 1} attempts.")
+        return None
+
+    async def gather(self, calls, concurrency=None):
+        semaphore = asyncio.Semaphore(concurrency or config.API_MAX_CONCURRENCY)
+        return await asyncio.gather(*(self.get_async(endpoint, params, semaphore) for endpoint, params in calls))
+
+    def fetch_many(self, calls, concurrency=None, budget=None):
+        """
+        Runs [(endpoint, params), ...] concurrently under the rate limiter.
+        Returns payloads in the same order (None for failed calls).
+        With a quota budget (QuotaPlanner.task()), calls beyond the granted
+        share are not sent and come back as None.
+        """
+        allowed = len(calls) if budget is None else budget.grant(len(calls))
+        if not allowed:
+            return [None] * len(calls)
+        return asyncio.run(self.gather(calls[:allowed], concurrency)) + [None] * (len(calls) - allowed)
+
+
+if __name__ == "__main__":
+    # Self-check against the local mock server (quota + random 429s)
+    try:
+        from src import mock_api_server
+        from src.http_session import print_connection_stats
+    except ImportError:
+        import mock_api_server
+        from http_session import print_connection_stats
+
+    # Compressed clock: a 5s "minute" keeps the run short
+    server, url = mock_api_server.start_in_thread(per_minute=10, error_rate=0.1, server_error_rate=0.05, window=5.0)
+    limiter = RateLimiter(per_minute=10, max_backoff=5.0, window=5.0)
+    client = ApiClient(url, api_key="mock-key", limiter=limiter, max_retries=8, cache=False, quota=False)
+    calls = [("fixtures", {"date": f"2026-01-{day:02d}"}) for day in range(1, 41)]
+
+    start = time.perf_counter()
+    results = client.fetch_many(calls, concurrency=8)
+    elapsed = time.perf_counter() - start
+    server.shutdown()
+
+    ok = sum(1 for r in results if r is not None)
+    print(f"\n✅ {ok}/{len(calls)} requests succeeded in {elapsed:.1f}s "
+          f"(server saw {server.stats['requests']} requests, {server.stats['throttled']} throttled, "
+          f"{server.stats['server_errors']} server errors)")
+    print_connection_stats()
\ No newline at end of file
@@ -0,0 +1,119 @@
+import time
+import numpy as np
+import pandas as pd
+
+CLASS_NAMES = ['away', 'draw', 'home']   # Model classes 0 / 1 / 2
+
+
+# --- TREE PATH ATTRIBUTIONS ---
+# Saabas-style: walking a row down a tree, every split moves the expected
+# output from the parent's mean leaf value to the child's; that change is
+# credited to the split feature. Per class, bias + sum of the feature
+# contributions equals the model's raw score (softmax logit) exactly.
+
+def node_means(nodes):
+    """Training-count weighted mean of the leaf values under every node of one tree."""
+    means = nodes['value'].astype(np.float64)
+    counts = nodes['count'].astype(np.float64)
+    # Children are stored after their parent: one reverse pass fills every internal node
+    for i in range(len(nodes) - 1, -1, -1):
+        if not nodes['is_leaf'][i]:
+            left, right = nodes['left'][i], nodes['right'][i]
+            total = counts[left] + counts[right]
+            means[i] = (counts[left] * means[left] + counts[right] * means[right]) / total if total \
+                else (means[left] + means[right]) / 2
+    return means
+
+
+def tree_attributions(model, X):
+    """
+    Per-class attributions of a fitted HistGradientBoostingClassifier for all
+    rows of X in one pass per tree (rows move down a level at a time together).
+    Returns (contributions of shape (rows, features, classes), bias of shape (rows, classes)),
+    features in the column order of X.
+    """
+    X_binned = model._bin_mapper.transform(model._preprocess_X(X, reset=False))
+    n_rows, n_features = X_binned.shape
+    n_classes = model.n_trees_per_iteration_
+    missing_bin = model._bin_mapper.missing_values_bin_idx_
+
+    contributions = np.zeros((n_rows, n_features, n_classes))
+    bias = np.repeat(model._baseline_prediction.reshape(1, -1).astype(np.float64), n_rows, axis=0)
+    all_rows = np.arange(n_rows)
+
+    for trees in model._predictors:
+        for k, tree in enumerate(trees):
+            nodes = tree.nodes
+            means = node_means(nodes)
+            is_leaf = nodes['is_leaf'].astype(bool)
+            bias[:, k] += means[0]
+
+            node = np.zeros(n_rows, dtype=np.intp)
+            rows = all_rows[~is_leaf[node]]
+            while len(rows):
+                current = node[rows]
+                feature = nodes['feature_idx'][current]
+                values = X_binned[rows, feature]
+
+                go_left = values <= nodes['bin_threshold'][current]
+                categorical = nodes['is_categorical'][current].astype(bool)
+                if categorical.any():
+                    bitsets = tree.binned_left_cat_bitsets[nodes['bitset_idx'][current[categorical]]]
+                    cat_values = values[categorical].astype(np.uint32)
+                    words = bitsets[np.arange(len(cat_values)), cat_values // 32]
+                    go_left[categorical] = (words >> (cat_values % 32)) & 1
+                missing = values == missing_bin
+                go_left[missing] = nodes['missing_go_to_left'][current[missing]].astype(bool)
+
+                child = np.where(go_left, nodes['left'][current], nodes['right'][current]).astype(np.intp)
+                contributions[rows, feature, k] += means[child] - means[current]
+                node[rows] = child
+                rows = rows[~is_leaf[child]]
+
+    # The preprocessor moves categorical features first: back to the caller's order
+    if model.is_categorical_ is not None:
+        order = np.concatenate([np.flatnonzero(model.is_categorical_), np.flatnonzero(~model.is_categorical_)])
+        restored = np.empty_like(contributions)
+        restored[:, order] = contributions
+        contributions = restored
+    return contributions, bias
+
+
+# --- OUTPUT ---
+
+def attribution_frame(contributions, bias, features, keys):
+    """
+    Long table stored next to the predictions: one row per fixture and class
+    (`keys` columns identify the fixture), bias + one column per feature, in logits.
+    """
+    n_rows, _, n_classes = contributions.shape
+    frames = []
+    for k in range(n_classes):
+        frame = keys.reset_index(drop=True).copy()
+        frame['class'] = CLASS_NAMES[k]
+        frame['bias'] = bias[:, k]
+        frame[list(features)] = contributions[:, :, k]
+        frames.append(frame)
+    return pd.concat(frames, ignore_index=True).round(5)
+
+
+def top_factors(contributions, features, k, n=3):
+    """'elo_diff +0.41, form_diff +0.12, ...' for class k of every row: the strongest drivers."""
+    labels = []
+    for row in contributions[:, :, k]:
+        top = np.argsort(-np.abs(row))[:n]
+        labels.append(", ".join(f"{features[i]} {row[i]:+.2f}" for i in top))
+    return labels
+
+
+def explain(model, X, keys):
+    """Attributions of the day's fixtures (`model` may be a ShardRouter). Returns (frame, contributions)."""
+    start = time.perf_counter()
+    if hasattr(model, 'attributions'):
+        contributions, bias = model.attributions(X)
+    else:
+        contributions, bias = tree_attributions(model, X)
+    frame = attribution_frame(contributions, bias, list(X.columns), keys)
+    print(f"🧮 Attributions: {len(X)} fixtures x {X.shape[1]} features x {contributions.shape[2]} classes "
+          f"in {time.perf_counter() - start:.3f}s")
+    return frame, contributions
@@ -1,59 +1,198 @@
-import time
-from datetime import datetime, timedelta
-from importer_hockey import HockeyImporter
+import argparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date, datetime, timedelta
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 try:
     from src import config
+    from src.importer_hockey import HockeyImporter
 except ImportError:
     import config
+    from importer_hockey import HockeyImporter
+
+# --- CHECKPOINTS ---
+# One row per work unit: a (league, season) or a range of dates.
+# Interrupted runs pick up every unit that is not 'done'.
+
+def create_checkpoint_table(cursor):
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {config.HOCKEY_BACKFILL_TABLE} (
+            unit_key VARCHAR(64) PRIMARY KEY,
+            kind VARCHAR(10) NOT NULL,
+            league_id INT, season INT,
+            date_from DATE, date_to DATE,
+            status VARCHAR(10) NOT NULL DEFAULT 'pending',
+            attempts INT NOT NULL DEFAULT 0,
+            games INT, last_error TEXT,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );""")
+
+
+def build_units(seasons, leagues, days_back, range_days):
+    units = []
+    for league_id in leagues:
+        for season in seasons:
+            units.append({
+                'unit_key': f"season:{league_id}:{season}", 'kind': 'season',
+                'league_id': league_id, 'season': season, 'date_from': None, 'date_to': None
+            })
+
+    # Recent games (current season) are fetched by date, in ranges aligned to a fixed
+    # epoch (day ordinal // range_days): a range keeps its unit_key from one day to the
+    # next, so deferred or finished ranges are found again. Only the newest range,
+    # still growing up to yesterday, is cut short (and keyed by its end so far).
+    end = datetime.now().date() - timedelta(days=1)
+    start = end - timedelta(days=days_back - 1)
+    day = date.fromordinal(start.toordinal() // range_days * range_days)
+    while day <= end:
+        range_end = min(day + timedelta(days=range_days - 1), end)
+        units.append({
+            'unit_key': f"dates:{day}:{range_end}", 'kind': 'dates',
+            'league_id': None, 'season': None, 'date_from': day, 'date_to': range_end
+        })
+        day = range_end + timedelta(days=1)
+    return units
+
+
+def register_units(conn, units, reset=False):
+    """Inserts missing units and returns the ones still to run (pending, interrupted or retryable)."""
+    cursor = conn.cursor()
+    create_checkpoint_table(cursor)
+    for u in units:
+        cursor.execute(f"""
+            INSERT INTO {config.HOCKEY_BACKFILL_TABLE} (unit_key, kind, league_id, season, date_from, date_to)
+            VALUES (%s, %s, %s, %s, %s, %s) ON CONFLICT (unit_key) DO NOTHING""",
+            (u['unit_key'], u['kind'], u['league_id'], u['season'], u['date_from'], u['date_to']))
+    if reset:
+        cursor.execute(f"UPDATE {config.HOCKEY_BACKFILL_TABLE} SET status='pending', attempts=0 WHERE unit_key = ANY(%s)",
+                       ([u['unit_key'] for u in units],))
+    cursor.execute(f"""
+        SELECT unit_key FROM {config.HOCKEY_BACKFILL_TABLE}
+        WHERE unit_key = ANY(%s)
+          AND (status IN ('pending', 'running') OR (status = 'failed' AND attempts < %s))""",
+        ([u['unit_key'] for u in units], config.HOCKEY_BACKFILL_MAX_ATTEMPTS))
+    todo = {row[0] for row in cursor.fetchall()}
+    conn.commit()
+    cursor.close()
+    return [u for u in units if u['unit_key'] in todo]
+
+
+def set_status(importer, unit_key, status, games=None, error=None):
+    conn = importer.get_db_connection()
+    if not conn: return
+    cursor = conn.cursor()
+    attempts = "attempts + 1" if status == 'running' else "attempts"
+    cursor.execute(f"""
+        UPDATE {config.HOCKEY_BACKFILL_TABLE}
+        SET status=%s, attempts={attempts}, games=COALESCE(%s, games), last_error=%s, updated_at=CURRENT_TIMESTAMP
+        WHERE unit_key=%s""", (status, games, error, unit_key))
+    conn.commit()
+    cursor.close()
+    conn.close()
+
+
+# --- WORKERS ---
+
+def unit_calls(unit):
+    if unit['kind'] == 'season':
+        return [{'league': unit['league_id'], 'season': unit['season']}]
+    days = (unit['date_to'] - unit['date_from']).days + 1
+    return [{'date': (unit['date_from'] + timedelta(days=i)).strftime('%Y-%m-%d')} for i in range(days)]
+
 
-def smart_backfill():
+def fetch_unit(importer, unit, calls=None):
+    """Games of one unit. Raises when the API gives up, so the unit is retried next run."""
+    games = []
+    for params in calls or unit_calls(unit):
+        data = importer._smart_request("games", params)
+        if data is None:
+            raise RuntimeError(f"API request failed for {params}")
+        games.extend(data.get('response', []) if unit['kind'] == 'season' else importer._league_games(data))
+    return games
+
+
+def run_unit(importer, unit):
+    calls = unit_calls(unit)
+    # Backfill only spends what the daily imports leave; the unit stays pending otherwise
+    with importer.quota.task('hockey.backfill') as budget:
+        if budget.grant(len(calls)) < len(calls):
+            return unit['unit_key'], 'deferred', "daily API quota exhausted"
+        return _run_unit(importer, unit, calls)
+
+
+def _run_unit(importer, unit, calls):
+    set_status(importer, unit['unit_key'], 'running')
+    try:
+        games = fetch_unit(importer, unit, calls)
+        saved = importer.save_to_db(games)
+        if saved is None:
+            raise RuntimeError("Database write failed")
+        set_status(importer, unit['unit_key'], 'done', games=saved)
+        return unit['unit_key'], 'done', saved
+    except Exception as e:
+        set_status(importer, unit['unit_key'], 'failed', error=str(e)[:500])
+        return unit['unit_key'], 'failed', str(e)
+
+
+def print_status(conn):
+    cursor = conn.cursor()
+    create_checkpoint_table(cursor)
+    cursor.execute(f"""
+        SELECT kind, status, COUNT(*), COALESCE(SUM(games), 0)
+        FROM {config.HOCKEY_BACKFILL_TABLE} GROUP BY kind, status ORDER BY kind, status""")
+    print("\n📋 BACKFILL CHECKPOINTS:")
+    for kind, status, units, games in cursor.fetchall():
+        print(f"   {kind:<7} {status:<8} {units:>4} units {games:>7} games")
+    conn.commit()
+    cursor.close()
+
+
+def smart_backfill(seasons=None, days_back=None, workers=None, reset=False):
     importer = HockeyImporter()
-    
-    # SAFETY SETTING: 7 seconds ensures we never exceed 10 req/min
-    COOLDOWN = 7 
-    
-    print(f"🚀 STARTING SMART BACKFILL (Rate Limit Safe: {COOLDOWN}s delay)")
+    seasons = seasons or config.HOCKEY_BACKFILL_SEASONS
+    days_back = days_back or config.HOCKEY_BACKFILL_DAYS
+    workers = workers or config.HOCKEY_BACKFILL_WORKERS
+
+    conn = importer.get_db_connection()
+    if not conn: return
+    units = build_units(seasons, config.HOCKEY_LEAGUES, days_back, config.HOCKEY_BACKFILL_RANGE_DAYS)
+    todo = register_units(conn, units, reset=reset)
+
+    print(f"🚀 STARTING SMART BACKFILL: seasons {seasons} + last {days_back} days")
+    print(f"   {len(units)} units, {len(units) - len(todo)} already done, {len(todo)} to run on {workers} workers")
     print("--------------------------------")
-    
-    # --- PHASE 1: HISTORICAL SEASONS ---
-    historical_seasons = [2022, 2023, 2024]
-    leagues = config.HOCKEY_LEAGUES
-    
-    print(f"\n📚 PHASE 1: Fetching Historical Seasons {historical_seasons}")
-    
-    for league_id in leagues:
-        for season in historical_seasons:
-            games = importer.fetch_season_games(league_id, season)
-            if games:
-                importer.save_to_db(games)
-            
-            # WAIT to respect rate limit
-            time.sleep(COOLDOWN)
-            
-    # --- PHASE 2: CURRENT SEASON (Daily Fetch) ---
-    days_back = 10 # Adjusted to 10 to ensure we finish in one run within limit
-    print(f"\n📅 PHASE 2: Fetching Recent Games (Last {days_back} days)")
-    
-    start_date = datetime.now() - timedelta(days=1)
-    
-    for i in range(days_back):
-        target_date = (start_date - timedelta(days=i)).strftime('%Y-%m-%d')
-        
-        print(f"📅 Processing {target_date}...", end=" ")
-        
-        # Fetch
-        games = importer.fetch_fixtures(target_date)
-        
-        # Save
-        if games:
-            importer.save_to_db(games)
-        else:
-            print("") # New line if no games found
-            
-        # WAIT
-        time.sleep(COOLDOWN)
-        
-    print(f"\n\n✅ SMART BACKFILL COMPLETE.")
+
+    # Workers share the API client, hence one rate limiter for the whole quota
+    results = {'done': 0, 'failed': 0, 'deferred': 0}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(run_unit, importer, unit) for unit in todo]
+        for future in as_completed(futures):
+            unit_key, status, detail = future.result()
+            results[status] += 1
+            icon = {'done': "✅", 'failed': "❌", 'deferred': "⏸️"}[status]
+            print(f"{icon} {unit_key}: {f'{detail} games' if status == 'done' else detail}")
+
+    print_status(conn)
+    conn.close()
+    print(f"\n✅ SMART BACKFILL FINISHED: {results['done']} done, {results['failed']} failed, "
+          f"{results['deferred']} deferred by the daily quota "
+          f"(failed units are retried on the next run, up to {config.HOCKEY_BACKFILL_MAX_ATTEMPTS} attempts).")
 
 if __name__ == "__main__":
-    smart_backfill()
\ No newline at end of file
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--seasons', type=int, nargs='+', help='Defaults to config.HOCKEY_BACKFILL_SEASONS')
+    parser.add_argument('--days', type=int, help='Recent days to fetch by date')
+    parser.add_argument('--workers', type=int)
+    parser.add_argument('--reset', action='store_true', help='Re-run units that are already done')
+    parser.add_argument('--status', action='store_true', help='Only print the checkpoint table')
+    args = parser.parse_args()
+
+    if args.status:
+        conn = HockeyImporter().get_db_connection()
+        if conn:
+            print_status(conn)
+            conn.close()
+    else:
+        smart_backfill(args.seasons, args.days, args.workers, args.reset)
\ No newline at end of file
@@ -0,0 +1,251 @@
+import argparse
+import multiprocessing
+import time
+import sys
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from threadpoolctl import threadpool_limits
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+try:
+    from src import config
+    from src.train_model import recency_weights, load_model_params, fit_model
+    from src.predict_smart import sniper_pick
+    from src.history_store import load_history
+    from src import binned_dataset
+except ImportError:
+    import config
+    from train_model import recency_weights, load_model_params, fit_model
+    from predict_smart import sniper_pick
+    from history_store import load_history
+    import binned_dataset
+
+SIDES = {'HOME': ('home', 2), 'AWAY': ('away', 0)}   # tip -> (odds suffix, winning target)
+
+
+# --- DATA ---
+
+def season_of(dates):
+    """Seasons are labelled by their starting year and start in July."""
+    return dates.dt.year - (dates.dt.month < 7).astype(int)
+
+
+def load_backtest_data(path=None, books=None):
+    """Processed training data joined (on match_id) to the history store's closing odds."""
+    df = pd.read_csv(path or config.PROCESSED_DATA_PATH)
+    if 'target' not in df.columns:
+        df['target'] = np.select(
+            [df['home_goals'] < df['away_goals'], df['home_goals'] == df['away_goals']], [0, 1], 2)
+    df['date'] = pd.to_datetime(df['match_date'], format='mixed')
+    df['csv_row'] = df.index   # Position in the processed CSV (binned dataset order)
+    df = df.sort_values('date').reset_index(drop=True)
+
+    books = books or config.BACKTEST_BOOKS
+    odds_cols = [f"{book}{close}_{side}" for book in books for close in ('', '_close')
+                 for side in ('home', 'draw', 'away')]
+    try:
+        history = load_history(odds_cols)
+        print(f"📚 Closing odds from the history store: {len(history):,} matches")
+    except Exception as e:
+        print(f"⚠️ History store unavailable ({e}). Build it with: python src/history_store.py")
+        history = pd.DataFrame(columns=['match_id'])
+    history = history.reindex(columns=['match_id', *odds_cols]).drop_duplicates('match_id')
+    return df.merge(history, on='match_id', how='left')
+
+
+def build_folds(df, by='season', min_train_seasons=None):
+    """
+    Expanding windows: each test period (season or month) is predicted by a
+    model trained on every match played before it.
+    """
+    min_train_seasons = min_train_seasons or config.BACKTEST_MIN_TRAIN_SEASONS
+    seasons = season_of(df['date'])
+    first_test_season = seasons.min() + min_train_seasons
+    periods = seasons.astype(str) if by == 'season' else df['date'].dt.strftime('%Y-%m')
+
+    folds = []
+    for period in pd.unique(periods[seasons >= first_test_season]):
+        test = np.flatnonzero(periods == period)
+        train = np.flatnonzero(df['date'] < df['date'].iloc[test[0]])
+        if len(train):
+            folds.append({'name': period, 'train': train, 'test': test})
+    return folds
+
+
+# --- FOLDS (one process each) ---
+
+def run_fold(name, X_train, y_train, w_train, dates, X_test, params, threads, binned_dir=None):
+    start = time.perf_counter()
+    binned = binned_dataset.load(binned_dir) if binned_dir else None
+    # Folds run side by side: each process gets its share of the cores
+    with threadpool_limits(limits=threads):
+        # The trainer's fit: early stopping on the last weeks before the fold, not a random split
+        model, record = fit_model(params, X_train, y_train, w_train, dates, binned)
+        probs = model.predict_proba(X_test)
+    fit = {'iterations': int(model.n_iter_), 'early_stopped': 'best_iteration' in record}
+    return name, probs, time.perf_counter() - start, binned['stats'] if binned else None, fit
+
+
+def predict_folds(df, folds, workers=None):
+    """
+    Out-of-sample [p_away, p_draw, p_home] for every test row of every fold.
+    Each fold dict gets the boosting iterations its model used.
+    """
+    workers = workers or config.BACKTEST_WORKERS
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    features = config.MODEL_FEATURES
+    csv_rows = df['csv_row'].to_numpy()
+    X = df[features].fillna(0).set_axis(csv_rows)   # Indexed by CSV row, like the trainer's X
+    y = df['target'].astype(int)
+    params = load_model_params([i for i, col in enumerate(features) if col == 'league_id'])
+    binned_dirs = {}
+    if config.BINNED_CACHE:
+        # One cache per fold boundary: thresholds from the fold's past only, never its test season
+        for fold in folds:
+            binned_dirs[fold['name']] = binned_dataset.prepare(
+                'football', config.PROCESSED_DATA_PATH, features, params['categorical_features'],
+                params.get('max_bins', 255), X, csv_rows[fold['train']])
+
+    probs = np.full((len(df), 3), np.nan)
+    print(f"🔁 {len(folds)} walk-forward folds on {workers} processes ({threads} threads each)...")
+    start = time.perf_counter()
+    # spawn: building the binned caches ran OpenMP in this process, which does not survive a fork
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+        futures = {}
+        for fold in folds:
+            train, test = fold['train'], fold['test']
+            futures[fold['name']] = pool.submit(
+                run_fold, fold['name'], X.iloc[train], y.iloc[train],
+                recency_weights(df['date'].iloc[train]), df['date'].iloc[train], X.iloc[test], params, threads,
+                binned_dirs.get(fold['name']))
+        binned = []
+        for fold in folds:
+            name, fold_probs, seconds, stats, fit = futures[fold['name']].result()
+            probs[fold['test']] = fold_probs
+            fold.update(fit, seconds=round(seconds, 1))
+            how = "early-stopped" if fit['early_stopped'] else f"fixed max_iter={params['max_iter']}"
+            print(f"   {name}: trained on {len(fold['train']):,}, tested on {len(fold['test']):,}, "
+                  f"{fit['iterations']} iterations ({how}) ({seconds:.1f}s)")
+            if stats is not None:
+                binned.append({**binned_dataset.load(binned_dirs[name]), 'stats': stats})
+    print(f"⏱️ Folds done in {time.perf_counter() - start:.1f}s")
+    if binned:
+        binned_dataset.report(binned, "Backtest folds")
+    return probs
+
+
+# --- SETTLEMENT ---
+
+def price(row, side, books, close):
+    """First available price of `side` in book order (Pinnacle before Bet365 by default)."""
+    for book in books:
+        col = f"{book}{'_close' if close else ''}_{side}"
+        if pd.notnull(row.get(col)):
+            return row[col], book
+    return np.nan, None
+
+
+def settle_bets(df, probs, books=None):
+    """
+    Applies the sniper filters to every out-of-sample prediction and settles
+    one unit per tip at the closing price. CLV compares the pre-closing price
+    of the same bookmaker with its closing price (> 0: the line moved our way).
+    """
+    books = books or config.BACKTEST_BOOKS
+    bets = []
+    for i in np.flatnonzero(~np.isnan(probs[:, 0])):
+        row = df.iloc[i]
+        draw_close, _ = price(row, 'draw', books, close=True)
+        tip = sniper_pick(probs[i], draw_close)
+        if tip is None: continue
+
+        side, winning_target = SIDES[tip]
+        odds, book = price(row, side, books, close=True)
+        if book is None: continue   # No closing price: cannot be settled
+        early = row.get(f"{book}_{side}")
+        won = int(row['target']) == winning_target
+        bets.append({
+            'match_id': row['match_id'], 'date': row['date'], 'league_id': row['league_id'],
+            'tip': tip, 'conf': round(float(max(probs[i][0], probs[i][2])), 4),
+            'book': book, 'odds': float(odds), 'won': won,
+            'profit': float(odds) - 1 if won else -1.0,
+            'clv': float(early) / float(odds) - 1 if pd.notnull(early) and odds > 0 else np.nan,
+        })
+    return pd.DataFrame(bets)
+
+
+def max_drawdown(profits):
+    """Largest peak-to-trough fall of the cumulative profit (in units)."""
+    equity = np.concatenate([[0.0], np.cumsum(profits)])
+    return float((np.maximum.accumulate(equity) - equity).max())
+
+
+def summarize(bets):
+    def stats(group):
+        group = group.sort_values('date')
+        return pd.Series({
+            'bets': len(group),
+            'hit_rate': round(group['won'].mean() * 100, 1),
+            'avg_odds': round(group['odds'].mean(), 2),
+            'profit': round(group['profit'].sum(), 2),
+            'roi': round(group['profit'].mean() * 100, 2),
+            'max_drawdown': round(max_drawdown(group['profit'].to_numpy()), 2),
+            'clv': round(group['clv'].mean() * 100, 2),
+        })
+
+    per_league = bets.groupby('league_id').apply(stats, include_groups=False).sort_values('bets', ascending=False)
+    per_league.loc['ALL'] = stats(bets)
+    return per_league.astype({'bets': int})
+
+
+def run_backtest(by=None, min_train_seasons=None, workers=None, books=None):
+    print("🧪 Starting Walk-Forward Backtest (Sniper Mode)...")
+    by = by or config.BACKTEST_FOLD
+    books = books or config.BACKTEST_BOOKS
+    if not config.PROCESSED_DATA_PATH.exists():
+        print(f"❌ Error: Data file not found at {config.PROCESSED_DATA_PATH}")
+        return None
+
+    df = load_backtest_data(books=books)
+    folds = build_folds(df, by, min_train_seasons)
+    if not folds:
+        print("⚠️ Not enough history for a walk-forward backtest.")
+        return None
+
+    probs = predict_folds(df, folds, workers)
+    bets = settle_bets(df, probs, books)
+    if bets.empty:
+        print("No prediction passed the filters with a closing price.")
+        return None
+
+    summary = summarize(bets)
+    print(f"\n📊 BACKTEST ({by} folds, closing odds: {' > '.join(books)}) - units, ROI/CLV in %:")
+    print(summary.to_string())
+    # Folds early-stop like the trainer; without early stopping they boost best_params' fixed max_iter
+    fold_fits = pd.DataFrame([{'fold': f['name'], 'train_rows': len(f['train']), 'test_rows': len(f['test']),
+                               'iterations': f['iterations'], 'early_stopped': f['early_stopped'],
+                               'seconds': f['seconds']} for f in folds]).set_index('fold')
+    print("\n🌲 Boosting iterations per fold:")
+    print(fold_fits.to_string())
+
+    config.BACKTEST_DIR.mkdir(parents=True, exist_ok=True)
+    stamp = datetime.now().strftime('%Y-%m-%d_%H%M%S')
+    bets.to_csv(config.BACKTEST_DIR / f"bets_{stamp}.csv", index=False)
+    summary.to_csv(config.BACKTEST_DIR / f"summary_{stamp}.csv")
+    fold_fits.to_csv(config.BACKTEST_DIR / f"folds_{stamp}.csv")
+    print(f"\n💾 Saved bets, summary and per-fold iterations to {config.BACKTEST_DIR}")
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--by', choices=['season', 'month'], help="Retrain per season or per month")
+    parser.add_argument('--min-train-seasons', type=int)
+    parser.add_argument('--workers', type=int)
+    parser.add_argument('--books', nargs='+', help="Closing-odds bookmakers in order of preference (e.g. ps b365)")
+    args = parser.parse_args()
+    run_backtest(args.by, args.min_train_seasons, args.workers, args.books)
\ No newline at end of file
@@ -0,0 +1,170 @@
+import pandas as pd
+import numpy as np
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+try:
+    from src import config
+    from src.stats_engine import StatsEngine
+except ImportError:
+    import config
+    from stats_engine import StatsEngine
+
+# --- SPORT LAYOUTS ---
+# Column names of the processed history / fixtures tables for each sport.
+# 'stats' maps snapshot column -> (home column, away column) in the history.
+SPORT_LAYOUTS = {
+    'football': {
+        'date': 'match_date',
+        'fixture_date': 'match_date',
+        'home': 'home_team',
+        'away': 'away_team',
+        'home_goals': 'home_goals',
+        'away_goals': 'away_goals',
+        'rest_cap': 30,
+        'stats': {
+            'rolling_goals': ('home_rolling_goals', 'away_rolling_goals'),
+            'rolling_conceded': ('home_rolling_conceded', 'away_rolling_conceded'),
+            'btts_rate': ('home_btts_rate', 'away_btts_rate'),
+            'form': ('home_form', 'away_form'),
+        },
+        # form_diff as built by preprocess.py
+        'form_stat': 'form',
+    },
+    'hockey': {
+        'date': 'date',
+        'fixture_date': 'date',
+        'home': 'home_team_name',
+        'away': 'away_team_name',
+        'home_goals': 'reg_goals_home',
+        'away_goals': 'reg_goals_away',
+        'rest_cap': 7,
+        'stats': {
+            'rolling_goals': ('home_rolling_goals', 'away_rolling_goals'),
+            'rolling_conceded': ('home_rolling_conceded', 'away_rolling_conceded'),
+            'btts_rate': ('home_btts_rate', 'away_btts_rate'),
+        },
+        # form_diff in preprocess_hockey.py is a rolling-goals proxy
+        'form_stat': 'rolling_goals',
+    },
+}
+
+
+def _naive_datetimes(values):
+    """Parses dates and drops any timezone so history and fixtures can be subtracted."""
+    dates = pd.to_datetime(values, format='mixed', errors='coerce')
+    if getattr(dates.dt, 'tz', None) is not None:
+        dates = dates.dt.tz_convert(None)
+    return dates
+
+
+def build_team_snapshot(df_history, sport):
+    """
+    Latest known state of every team (post-match Elo, last match date, rolling stats).
+    Vectorized equivalent of replaying the history row by row: the Elo update is
+    computed for all games at once and each team keeps its most recent appearance.
+
+    Returns a DataFrame indexed by team name.
+    """
+    layout = SPORT_LAYOUTS[sport]
+    df = df_history.copy()
+    df[layout['date']] = _naive_datetimes(df[layout['date']])
+    df = df.dropna(subset=[layout['date']]).sort_values(layout['date'])
+
+    delta = StatsEngine.calculate_elo_change_batch(
+        df['home_elo'].to_numpy(), df['away_elo'].to_numpy(),
+        df[layout['home_goals']].to_numpy(), df[layout['away_goals']].to_numpy()
+    )
+
+    order = np.arange(len(df))
+    sides = []
+    for side, sign, col in ((0, 1, layout['home']), (1, -1, layout['away'])):
+        part = pd.DataFrame({
+            'team': df[col].to_numpy(),
+            'elo': df[f"{'home' if side == 0 else 'away'}_elo"].to_numpy() + sign * delta,
+            'last_date': df[layout['date']].to_numpy(),
+            # Home rows come before away rows of the same game (replay order)
+            '_order': order * 2 + side,
+        })
+        for stat, (home_col, away_col) in layout['stats'].items():
+            source = home_col if side == 0 else away_col
+            part[stat] = df[source].to_numpy() if source in df.columns else 0
+        sides.append(part)
+
+    snapshot = (
+        pd.concat(sides, ignore_index=True)
+        .sort_values('_order')
+        .drop_duplicates('team', keep='last')
+        .drop(columns='_order')
+        .set_index('team')
+    )
+    return snapshot
+
+
+def build_feature_matrix(df_fixtures, snapshot, sport):
+    """
+    Builds the model matrix for all fixtures in one pass.
+    Fixtures with an unknown team or an unparseable date are dropped.
+
+    Returns (X_pred with config.MODEL_FEATURES columns, matching fixture rows).
+    """
+    layout = SPORT_LAYOUTS[sport]
+    fixtures = df_fixtures.copy()
+    fixtures['_date'] = _naive_datetimes(fixtures[layout['fixture_date']])
+
+    known = (
+        fixtures[layout['home']].isin(snapshot.index)
+        & fixtures[layout['away']].isin(snapshot.index)
+        & fixtures['_date'].notna()
+    )
+    fixtures = fixtures[known]
+    if fixtures.empty:
+        return pd.DataFrame(columns=config.MODEL_FEATURES), fixtures.drop(columns='_date')
+
+    h = snapshot.loc[fixtures[layout['home']]].reset_index(drop=True)
+    a = snapshot.loc[fixtures[layout['away']]].reset_index(drop=True)
+    dates = fixtures['_date'].reset_index(drop=True)
+
+    cap = layout['rest_cap']
+    h_rest = (dates - h['last_date']).dt.days.clip(lower=0, upper=cap)
+    a_rest = (dates - a['last_date']).dt.days.clip(lower=0, upper=cap)
+    form = layout['form_stat']
+
+    features = pd.DataFrame({
+        'league_id': fixtures['league_id'].to_numpy(),
+        'home_elo': h['elo'],
+        'away_elo': a['elo'],
+        'elo_diff': h['elo'] - a['elo'],
+        'home_rolling_goals': h['rolling_goals'],
+        'away_rolling_goals': a['rolling_goals'],
+        'home_rolling_conceded': h['rolling_conceded'],
+        'away_rolling_conceded': a['rolling_conceded'],
+        'form_diff': h[form] - a[form],
+        'defensive_diff': h['rolling_conceded'] - a['rolling_conceded'],
+        'home_btts_rate': h['btts_rate'],
+        'away_btts_rate': a['btts_rate'],
+        'btts_interaction': h['btts_rate'] * a['btts_rate'],
+        'home_rest_days': h_rest,
+        'away_rest_days': a_rest,
+        'rest_diff': h_rest - a_rest,
+    })
+    for col in config.MODEL_FEATURES:
+        if col not in features.columns:
+            features[col] = 0
+
+    return features[config.MODEL_FEATURES], fixtures.drop(columns='_date')
+
+
+def implied_prob(odds):
+    """Vectorized StatsEngine.calculate_implied_prob (NaN odds stay NaN)."""
+    odds = np.asarray(odds, dtype=float)
+    with np.errstate(divide='ignore'):
+        return np.where(odds <= 1.0, 0.0, 1.0 / odds)
+
+
+def value_labels(edge, min_edge=0.05):
+    """'💎 +X.X%' where the edge beats min_edge, '' elsewhere (NaN edges included)."""
+    edge = pd.Series(edge)
+    labels = "💎 +" + (edge * 100).round(1).astype(str) + "%"
+    return labels.where(edge > min_edge, "").to_numpy()
@@ -0,0 +1,189 @@
+# Throughput benchmark: row-by-row hockey scoring (pre-vectorization) vs the
+# batch path, on the shipped training_data_hockey.csv.
+#
+#     python src/benchmark_hockey_predict.py --fixtures 2000 --repeat 3
+
+import argparse
+import time
+import sys
+import os
+import pandas as pd
+import numpy as np
+import joblib
+from sklearn.ensemble import HistGradientBoostingClassifier
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+try:
+    from src import config
+    from src.stats_engine import StatsEngine
+    from src.batch_scoring import build_team_snapshot, build_feature_matrix
+    from src.predict_smart_hockey import build_hockey_predictions
+except ImportError:
+    import config
+    from stats_engine import StatsEngine
+    from batch_scoring import build_team_snapshot, build_feature_matrix
+    from predict_smart_hockey import build_hockey_predictions
+
+# --- LEGACY IMPLEMENTATION (reference for timing & parity) ---
+
+def legacy_latest_hockey_stats(df_history):
+    stats_db = {}
+    df_history['date'] = pd.to_datetime(df_history['date'], format='mixed', errors='coerce')
+    df_history = df_history.dropna(subset=['date']).sort_values('date')
+
+    for _, row in df_history.iterrows():
+        delta = StatsEngine.calculate_elo_change(
+            elo_home=row['home_elo'], elo_away=row['away_elo'],
+            home_goals=row['reg_goals_home'], away_goals=row['reg_goals_away']
+        )
+        stats_db[row['home_team_name']] = {
+            'elo': row['home_elo'] + delta,
+            'last_date': row['date'],
+            'rolling_goals': row.get('home_rolling_goals', 0),
+            'rolling_conceded': row.get('home_rolling_conceded', 0),
+            'btts_rate': row.get('home_btts_rate', 0)
+        }
+        stats_db[row['away_team_name']] = {
+            'elo': row['away_elo'] - delta,
+            'last_date': row['date'],
+            'rolling_goals': row.get('away_rolling_goals', 0),
+            'rolling_conceded': row.get('away_rolling_conceded', 0),
+            'btts_rate': row.get('away_btts_rate', 0)
+        }
+    return stats_db
+
+
+def legacy_score(model, df_fixtures, stats_db):
+    feature_rows = []
+    valid_indices = []
+    for index, row in df_fixtures.iterrows():
+        home, away = row['home_team_name'], row['away_team_name']
+        if home not in stats_db or away not in stats_db:
+            continue
+        h_stats, a_stats = stats_db[home], stats_db[away]
+        date = pd.to_datetime(row['date'])
+        h_rest = max(0, min((date - h_stats['last_date']).days, 7))
+        a_rest = max(0, min((date - a_stats['last_date']).days, 7))
+        features = {
+            'league_id': row['league_id'],
+            'home_elo': h_stats['elo'], 'away_elo': a_stats['elo'],
+            'elo_diff': h_stats['elo'] - a_stats['elo'],
+            'home_rolling_goals': h_stats['rolling_goals'], 'away_rolling_goals': a_stats['rolling_goals'],
+            'home_rolling_conceded': h_stats['rolling_conceded'], 'away_rolling_conceded': a_stats['rolling_conceded'],
+            'form_diff': 0,
+            'defensive_diff': h_stats['rolling_conceded'] - a_stats['rolling_conceded'],
+            'home_btts_rate': h_stats['btts_rate'], 'away_btts_rate': a_stats['btts_rate'],
+            'btts_interaction': h_stats['btts_rate'] * a_stats['btts_rate'],
+            'home_rest_days': h_rest, 'away_rest_days': a_rest, 'rest_diff': h_rest - a_rest
+        }
+        feature_rows.append([features.get(col, 0) for col in config.MODEL_FEATURES])
+        valid_indices.append(index)
+
+    X_pred = pd.DataFrame(feature_rows, columns=config.MODEL_FEATURES)
+    df_valid = df_fixtures.loc[valid_indices]
+    probs = model.predict_proba(X_pred)
+
+    predictions = []
+    for i, (index, row) in enumerate(df_valid.iterrows()):
+        p_away, p_draw, p_home = probs[i]
+        if p_home > p_away and p_home > p_draw:
+            tip, conf, odd_col = "HOME", p_home, 'home_odd'
+        elif p_away > p_home and p_away > p_draw:
+            tip, conf, odd_col = "AWAY", p_away, 'away_odd'
+        else:
+            tip, conf, odd_col = "DRAW", p_draw, 'draw_odd'
+        value_msg = ""
+        if pd.notnull(row[odd_col]):
+            edge = conf - StatsEngine.calculate_implied_prob(row[odd_col])
+            if edge > 0.05: value_msg = f"💎 +{round(edge*100,1)}%"
+        predictions.append({
+            'Match': f"{row['home_team_name']} vs {row['away_team_name']}",
+            'Tip': tip, 'Conf': round(conf * 100, 1),
+            'H_Win%': round(p_home * 100, 0), 'D_Win%': round(p_draw * 100, 0), 'A_Win%': round(p_away * 100, 0),
+            'Odds': row[odd_col], 'Value': value_msg, 'Status': "✅ PREDICTED"
+        })
+    return X_pred, pd.DataFrame(predictions)
+
+
+# --- BENCHMARK ---
+
+def make_fixtures(df_history, n_fixtures, seed=42):
+    """Synthetic upcoming slate: random pairs of known teams the day after the history ends."""
+    rng = np.random.default_rng(seed)
+    recent = df_history.sort_values('date').tail(2000)
+    pairs = recent[['home_team_name', 'away_team_name', 'league_id']].sample(
+        n_fixtures, replace=True, random_state=seed
+    ).reset_index(drop=True)
+    last_date = pd.to_datetime(df_history['date'], format='mixed').max()
+    odds = rng.uniform(1.3, 6.0, size=(n_fixtures, 3))
+    odds[rng.random(n_fixtures) < 0.2] = np.nan  # Some fixtures without odds
+    pairs['date'] = last_date + pd.to_timedelta(rng.integers(1, 4, n_fixtures), unit='D')
+    pairs[['home_odd', 'draw_odd', 'away_odd']] = odds
+    return pairs
+
+
+def load_model(df_history):
+    if config.HOCKEY_MODEL_PATH.exists():
+        return joblib.load(config.HOCKEY_MODEL_PATH)
+    print("ℹ️ No trained hockey model found. Fitting a small one for the benchmark...")
+    model = HistGradientBoostingClassifier(max_iter=50, random_state=42)
+    model.fit(df_history[config.MODEL_FEATURES].fillna(0), df_history['target'].astype(int))
+    return model
+
+
+def best_of(fn, repeat):
+    times = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def run_benchmark(n_fixtures=2000, repeat=3):
+    print(f"📂 Loading {config.HOCKEY_PROCESSED_PATH}...")
+    df_history = pd.read_csv(config.HOCKEY_PROCESSED_PATH)
+    model = load_model(df_history)
+    df_fixtures = make_fixtures(df_history, n_fixtures)
+    print(f"   {len(df_history)} history rows | {len(df_fixtures)} fixtures | best of {repeat}")
+
+    # 1. Snapshot
+    t_legacy_snap, legacy_db = best_of(lambda: legacy_latest_hockey_stats(df_history.copy()), repeat)
+    t_batch_snap, snapshot = best_of(lambda: build_team_snapshot(df_history, 'hockey'), repeat)
+
+    # 2. Scoring (features + predict + tips)
+    def batch_score():
+        X_pred, df_valid = build_feature_matrix(df_fixtures, snapshot, 'hockey')
+        return X_pred, build_hockey_predictions(model.predict_proba(X_pred), df_valid)
+
+    t_legacy_score, (X_legacy, pred_legacy) = best_of(lambda: legacy_score(model, df_fixtures, legacy_db), repeat)
+    t_batch_score, (X_batch, pred_batch) = best_of(batch_score, repeat)
+
+    # 3. Parity (form_diff is the intended difference: legacy hardcoded 0)
+    legacy_elo = pd.Series({team: s['elo'] for team, s in legacy_db.items()})
+    elo_ok = np.allclose(legacy_elo.sort_index(), snapshot['elo'].sort_index())
+    same_cols = [c for c in config.MODEL_FEATURES if c != 'form_diff']
+    features_ok = np.allclose(X_legacy[same_cols].to_numpy(float), X_batch[same_cols].to_numpy(float))
+    # Same probabilities in -> same tips/confidence/value out
+    replay = build_hockey_predictions(model.predict_proba(X_legacy), df_fixtures)
+    tips_ok = replay[['Tip', 'Conf', 'Value']].equals(pred_legacy[['Tip', 'Conf', 'Value']])
+
+    print("\n📊 RESULTS")
+    print(f"   {'stage':<10} {'legacy s':>10} {'batch s':>10} {'speedup':>9} {'batch rows/s':>14}")
+    print(f"   {'snapshot':<10} {t_legacy_snap:>10.4f} {t_batch_snap:>10.4f} "
+          f"{t_legacy_snap / t_batch_snap:>8.1f}x {len(df_history) / t_batch_snap:>14,.0f}")
+    print(f"   {'scoring':<10} {t_legacy_score:>10.4f} {t_batch_score:>10.4f} "
+          f"{t_legacy_score / t_batch_score:>8.1f}x {len(df_fixtures) / t_batch_score:>14,.0f}")
+    print(f"\n   Elo snapshot identical: {'✅' if elo_ok else '❌'} ({len(snapshot)} teams)")
+    print(f"   Features identical (excl. form_diff): {'✅' if features_ok else '❌'}")
+    print(f"   Tip/Conf/Value identical on the same probabilities: {'✅' if tips_ok else '❌'}")
+    print(f"   Predictions: legacy {len(pred_legacy)} rows | batch {len(pred_batch)} rows")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--fixtures', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    run_benchmark(args.fixtures, args.repeat)
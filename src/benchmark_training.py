@@ -0,0 +1,274 @@
+# Scalability benchmark of the training step: fit/predict time, peak RSS and
+# holdout metrics of train_model.fit_model as history grows, per OpenMP thread
+# count and max_depth, with early stopping (the trainer's path) and without it
+# per fixed max_iter, with and without the binned dataset cache on the real subsets. Results are appended to
+# pipeline_runs/benchmark_training.jsonl, keyed by git commit.
+#
+#     python src/benchmark_training.py --sizes 10000 50000 179000 1000000 --threads 1 2 4
+#     python src/benchmark_training.py --compare <old commit> <new commit>
+
+import argparse
+import json
+import subprocess
+import time
+import sys
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from itertools import product
+import multiprocessing
+import numpy as np
+import pandas as pd
+from sklearn.metrics import accuracy_score, log_loss
+from threadpoolctl import threadpool_limits
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+try:
+    from src import config
+    from src.profiler import RssSampler, current_rss_mb
+    from src.train_model import recency_weights, load_model_params, fit_model, load_binned
+except ImportError:
+    import config
+    from profiler import RssSampler, current_rss_mb
+    from train_model import recency_weights, load_model_params, fit_model, load_binned
+
+CASE_KEYS = ['source', 'rows', 'threads', 'early_stopping', 'max_iter', 'max_depth', 'binned']
+
+
+# --- DATA ---
+
+def load_real(n_rows, path=None):
+    """
+    The newest n_rows of the processed training data (None if there are fewer),
+    indexed by CSV row like the trainer's X (the binned cache's order).
+    """
+    df = pd.read_csv(path or config.PROCESSED_DATA_PATH)
+    if len(df) < n_rows:
+        return None
+    if 'target' not in df.columns:
+        df['target'] = np.select(
+            [df['home_goals'] < df['away_goals'], df['home_goals'] == df['away_goals']], [0, 1], 2)
+    df['date'] = pd.to_datetime(df['match_date'], format='mixed')
+    df = df.sort_values('date').tail(n_rows)
+    return df[config.MODEL_FEATURES].fillna(0), df['target'].astype(int), recency_weights(df['date']), df['date']
+
+
+def make_synthetic(n_rows, seed=42):
+    """
+    Rows shaped like MODEL_FEATURES (Elo, rolling form, rest days, 40 leagues)
+    with outcomes drawn from an Elo-driven multinomial, so the model has real signal to fit.
+    Matches are spread evenly over ten seasons of dates, for the early-stopping weeks.
+    """
+    rng = np.random.default_rng(seed)
+    home_elo = rng.normal(1500, 120, n_rows)
+    away_elo = rng.normal(1500, 120, n_rows)
+    home_goals, away_goals = rng.gamma(6, 0.25, n_rows), rng.gamma(6, 0.22, n_rows)
+    home_conc, away_conc = rng.gamma(6, 0.22, n_rows), rng.gamma(6, 0.25, n_rows)
+    home_btts, away_btts = rng.beta(5, 5, n_rows), rng.beta(5, 5, n_rows)
+    home_rest, away_rest = rng.integers(2, 15, n_rows), rng.integers(2, 15, n_rows)
+    X = pd.DataFrame({
+        'league_id': rng.integers(0, 40, n_rows),
+        'home_elo': home_elo, 'away_elo': away_elo, 'elo_diff': home_elo - away_elo,
+        'home_rolling_goals': home_goals, 'away_rolling_goals': away_goals,
+        'home_rolling_conceded': home_conc, 'away_rolling_conceded': away_conc,
+        'form_diff': (home_goals - home_conc) - (away_goals - away_conc),
+        'defensive_diff': away_conc - home_conc,
+        'home_btts_rate': home_btts, 'away_btts_rate': away_btts, 'btts_interaction': home_btts * away_btts,
+        'home_rest_days': home_rest, 'away_rest_days': away_rest, 'rest_diff': home_rest - away_rest,
+    })[config.MODEL_FEATURES]
+
+    strength = (X['elo_diff'] + 60) / 200 + 0.3 * X['form_diff']
+    logits = np.column_stack([-strength, np.full(n_rows, -0.25), strength])
+    probs = np.exp(logits) / np.exp(logits).sum(axis=1, keepdims=True)
+    y = (probs.cumsum(axis=1) < rng.random((n_rows, 1))).sum(axis=1)
+    dates = pd.Series(pd.Timestamp('2015-08-01') + pd.to_timedelta(np.linspace(0, 3650, n_rows), unit='D'))
+    return X, pd.Series(y), pd.Series(np.linspace(1, 3, n_rows)), dates.dt.normalize()
+
+
+# --- ONE CASE (fresh process, so peak RSS belongs to this case only) ---
+
+def run_case(case, params, data_path):
+    if case['source'] == 'real':
+        X, y, weights, dates = load_real(case['rows'], data_path)
+    else:
+        X, y, weights, dates = make_synthetic(case['rows'])
+    split_idx = int(len(X) * 0.85)
+    X_train, X_test = X.iloc[:split_idx], X.iloc[split_idx:]
+    y_train, y_test = y.iloc[:split_idx], y.iloc[split_idx:]
+    params = {**params, 'max_depth': case['max_depth']}
+    fit_dates = dates.iloc[:split_idx]
+    if not case['early_stopping']:
+        # Fixed max_iter: no time-ordered window, and no random split by sklearn either
+        params.update(max_iter=case['max_iter'], early_stopping=False)
+        fit_dates = None
+
+    sampler = RssSampler()
+    rss_start = current_rss_mb()
+    sampler.start()
+    with threadpool_limits(limits=case['threads']):
+        # The trainer's own path: cache lookup (built on the first binned case of a subset), then fit_model
+        start = time.perf_counter()
+        binned = load_binned('benchmark', data_path, X, params, X_train.index) if case['binned'] else None
+        cache_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        model, _ = fit_model(params, X_train, y_train, weights.iloc[:split_idx], fit_dates, binned)
+        fit_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        y_prob = model.predict_proba(X_test)
+        predict_seconds = time.perf_counter() - start
+    rss_peak = sampler.stop()
+
+    return {
+        **case,
+        'fit_seconds': round(fit_seconds, 3),
+        'cache_seconds': round(cache_seconds, 3),
+        'predict_seconds': round(predict_seconds, 4),
+        'predict_rows_per_s': round(len(X_test) / predict_seconds),
+        'rss_start_mb': round(rss_start, 1) if rss_start is not None else None,
+        'rss_peak_mb': round(rss_peak, 1) if rss_peak is not None else None,
+        'n_iter': int(model.n_iter_),
+        'log_loss': round(float(log_loss(y_test, y_prob, labels=[0, 1, 2])), 5),
+        'accuracy': round(float(accuracy_score(y_test, y_prob.argmax(axis=1))), 4),
+    }
+
+
+def git_commit():
+    """(short commit, dirty) of the working tree, ('unknown', False) outside git."""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=config.BASE_DIR, check=True).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], capture_output=True,
+                               text=True, cwd=config.BASE_DIR, check=True).stdout.strip() != ""
+        return commit, dirty
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown', False
+
+
+def run_benchmark(sizes=None, threads=None, sources=None, max_iters=None, max_depths=None, log_path=None,
+                  binned=None, early_stopping=None):
+    """
+    Every case in a fresh process. Real subsets run with and without the binned
+    cache (binned=None: with it when BINNED_CACHE is on); synthetic data has no
+    processed CSV to cache, so it always bins per fit. `early_stopping` [True, False]
+    (default both): early-stopped cases pick their own iterations (max_iter None),
+    the others run once per max_iter.
+    """
+    binned = config.BINNED_CACHE if binned is None else binned
+    sizes = sizes or config.BENCHMARK_SIZES
+    threads = threads or config.BENCHMARK_THREADS
+    sources = sources or ['real', 'synthetic']
+    log_path = log_path or config.BENCHMARK_LOG_PATH
+    params = load_model_params([i for i, col in enumerate(config.MODEL_FEATURES) if col == 'league_id'])
+    max_iters = max_iters or [params['max_iter']]
+    max_depths = max_depths or [params['max_depth']]
+    early_stopping = [True, False] if early_stopping is None else early_stopping
+    fits = ([(True, None)] if True in early_stopping else []) + \
+        ([(False, max_iter) for max_iter in max_iters] if False in early_stopping else [])
+
+    real_rows = sum(1 for _ in open(config.PROCESSED_DATA_PATH)) - 1 if config.PROCESSED_DATA_PATH.exists() else 0
+    cases = []
+    for source, rows, n_threads, (stops, max_iter), max_depth in product(sources, sizes, threads, fits, max_depths):
+        if source == 'real' and rows > real_rows:
+            continue
+        for use_cache in ([False, True] if binned and source == 'real' else [False]):
+            cases.append({'source': source, 'rows': rows, 'threads': n_threads, 'early_stopping': stops,
+                          'max_iter': max_iter, 'max_depth': max_depth, 'binned': use_cache})
+
+    commit, dirty = git_commit()
+    print(f"🏋️ Training benchmark @ {commit}{' (dirty)' if dirty else ''}: {len(cases)} cases "
+          f"({real_rows:,} real rows available, larger real sizes skipped)")
+    log_path.parent.mkdir(parents=True, exist_ok=True)
+    print(f"   {'source':<10} {'rows':>9} {'thr':>4} {'iter':>5} {'depth':>5} {'bins':>6} {'fit s':>8} "
+          f"{'pred s':>8} {'peak MB':>8} {'n_iter':>6} {'logloss':>8}")
+
+    # spawn + one task per worker: every case starts from a clean interpreter
+    pool = ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn'), max_tasks_per_child=1)
+    results = []
+    with pool:
+        for case in cases:
+            result = pool.submit(run_case, case, params, config.PROCESSED_DATA_PATH).result()
+            result.update({'commit': commit, 'dirty': dirty, 'timestamp': datetime.now().isoformat(timespec='seconds')})
+            results.append(result)
+            with open(log_path, 'a') as f:
+                f.write(json.dumps(result) + "\n")
+            print(f"   {case['source']:<10} {case['rows']:>9,} {case['threads']:>4} {case['max_iter'] or 'early':>5} "
+                  f"{case['max_depth']:>5} {'cached' if case['binned'] else 'fit':>6} {result['fit_seconds']:>8} {result['predict_seconds']:>8} "
+                  f"{str(result['rss_peak_mb']):>8} {result['n_iter']:>6} {result['log_loss']:>8}")
+    print(f"💾 Results appended to {log_path}")
+    return pd.DataFrame(results)
+
+
+# --- COMPARISON ---
+
+def load_results(commit, log_path=None):
+    """Median of every repeated case recorded for `commit` (prefix match)."""
+    log_path = log_path or config.BENCHMARK_LOG_PATH
+    with open(log_path, 'r') as f:
+        rows = [json.loads(line) for line in f if line.strip()]
+    df = pd.DataFrame([r for r in rows if r['commit'].startswith(commit) or commit.startswith(r['commit'])])
+    if df.empty:
+        return df
+    df['binned'] = df['binned'].fillna(False) if 'binned' in df.columns else False   # Cases logged before the cache
+    if 'early_stopping' not in df.columns:   # Cases logged before the key: fit_model early-stopped, max_iter unused
+        df['early_stopping'], df['max_iter'] = True, None
+    df['early_stopping'] = df['early_stopping'].fillna(True).astype(bool)
+    df.loc[df['early_stopping'], 'max_iter'] = None
+    return df.groupby(CASE_KEYS, as_index=False, dropna=False)[['fit_seconds', 'predict_seconds', 'rss_peak_mb', 'log_loss']].median()
+
+
+def compare(old, new, log_path=None):
+    """
+    Flags cases of `new` that got slower, bigger or less accurate than `old`
+    beyond BENCHMARK_TOLERANCES. Returns the number of regressions.
+    """
+    a, b = load_results(old, log_path), load_results(new, log_path)
+    if a.empty or b.empty:
+        print(f"⚠️ No results for {old if a.empty else new}. Run the benchmark on that commit first.")
+        return 0
+    merged = a.merge(b, on=CASE_KEYS, suffixes=('_old', '_new'))
+    tol = config.BENCHMARK_TOLERANCES
+    checks = {
+        'fit_seconds': lambda o, n: n > o * (1 + tol['fit_seconds']),
+        'predict_seconds': lambda o, n: n > o * (1 + tol['predict_seconds']),
+        'rss_peak_mb': lambda o, n: n > o * (1 + tol['rss_peak_mb']),
+        'log_loss': lambda o, n: n > o + tol['log_loss'],
+    }
+
+    print(f"\n📊 {old} -> {new}: {len(merged)} common cases")
+    regressions = 0
+    for _, row in merged.iterrows():
+        flags = [f"{metric} {row[f'{metric}_old']} -> {row[f'{metric}_new']}"
+                 for metric, worse in checks.items()
+                 if pd.notnull(row[f'{metric}_old']) and pd.notnull(row[f'{metric}_new'])
+                 and worse(row[f'{metric}_old'], row[f'{metric}_new'])]
+        label = ' '.join(f"{k}={row[k]}" for k in CASE_KEYS)
+        speedup = row['fit_seconds_old'] / row['fit_seconds_new'] if row['fit_seconds_new'] else float('nan')
+        if flags:
+            regressions += 1
+            print(f"   ❌ {label}: {'; '.join(flags)}")
+        else:
+            print(f"   ✅ {label}: fit {speedup:.2f}x, log loss {row['log_loss_new'] - row['log_loss_old']:+.4f}")
+    print(f"\n{'❌' if regressions else '✅'} {regressions} regression(s)")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', type=int, nargs='+', help="Row counts (default: config.BENCHMARK_SIZES)")
+    parser.add_argument('--threads', type=int, nargs='+', help="OpenMP thread counts")
+    parser.add_argument('--sources', nargs='+', choices=['real', 'synthetic'])
+    parser.add_argument('--max-iter', type=int, nargs='+', help="Override best_params max_iter (cases without early stopping)")
+    parser.add_argument('--early-stopping', nargs='+', choices=['on', 'off'],
+                        help="Run early-stopped and/or fixed max_iter cases (default: both)")
+    parser.add_argument('--max-depth', type=int, nargs='+', help="Override best_params max_depth")
+    parser.add_argument('--no-binned', dest='binned', action='store_false', default=None,
+                        help="Skip the binned-cache cases of the real subsets")
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'), help="Flag regressions between two commits")
+    args = parser.parse_args()
+
+    if args.compare:
+        sys.exit(1 if compare(*args.compare) else 0)
+    run_benchmark(args.sizes, args.threads, args.sources, args.max_iter, args.max_depth, binned=args.binned,
+                  early_stopping=args.early_stopping and [mode == 'on' for mode in args.early_stopping])
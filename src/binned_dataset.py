@@ -0,0 +1,261 @@
+import hashlib
+import json
+import shutil
+import time
+import sys
+import os
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import HistGradientBoostingClassifier
+from sklearn.ensemble._hist_gradient_boosting.binning import _BinMapper
+from sklearn.utils._openmp_helpers import _openmp_effective_n_threads
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+try:
+    from src import config
+    from src import model_registry
+except ImportError:
+    import config
+    import model_registry
+
+# --- LAYOUT ---
+# cache/binned/<name>/<fit rows>/  X_binned.npy  uint8 bins of every CSV row (CSV order, categorical features first)
+#                                  binning.joblib fitted _BinMapper + one raw row per category
+#                                  meta.json      data sha256, features, fit rows, max_bins, timings
+# HistGradientBoosting bins X on every fit; fits whose rows come from the same
+# processed CSV take their rows of this matrix instead (see fit_binned).
+# Thresholds and category codes are learned from the "fit rows" only (a training
+# split, a walk-forward fold's past), never from the rows a fit is evaluated on:
+# one entry per fold boundary, all rows binned with it.
+
+X_FILE = "X_binned.npy"
+BINNING_FILE = "binning.joblib"
+META_FILE = "meta.json"
+SPOT_CHECK_ROWS = 64                # Rows re-binned per fit to verify they line up with the cache
+
+
+def _atomic_save(path, write, mode='wb'):
+    # Readers may hold the old file memory-mapped: replace it, never overwrite in place
+    tmp = f"{path}.tmp{os.getpid()}"
+    with open(tmp, mode) as f:
+        write(f)
+    os.replace(tmp, path)
+
+
+def _rows_key(fit_rows):
+    if fit_rows is None:
+        return "all"
+    fit_rows = np.sort(np.asarray(fit_rows, dtype=np.int64))
+    return f"{len(fit_rows)}-{hashlib.sha256(fit_rows.tobytes()).hexdigest()[:12]}"
+
+
+def _prune(name_dir, sha256):
+    """Entries of older data versions go: their row positions no longer mean anything."""
+    for meta_path in name_dir.glob(f"*/{META_FILE}"):
+        with open(meta_path, 'r') as f:
+            stale = json.load(f).get('sha256') != sha256
+        if stale:
+            shutil.rmtree(meta_path.parent, ignore_errors=True)
+
+
+# --- BUILD (once per processed-data version and fold boundary) ---
+
+def prepare(name, data_path, features, categorical_features, max_bins=255, X=None, fit_rows=None):
+    """
+    Bins every row of the processed CSV with the category codes and thresholds
+    HistGradientBoosting would fit on `fit_rows` (CSV positions, default all rows),
+    rebuilt only when the CSV content (sha256), the features, the fit rows or the
+    binning params change. `X` may be passed when the caller already holds
+    df[features].fillna(0) with the CSV's row index. Returns the cache directory.
+    """
+    out_dir = config.BINNED_DIR / name / _rows_key(fit_rows)
+    meta = {
+        'source': str(data_path), 'sha256': model_registry.file_sha256(data_path),
+        'features': list(features), 'categorical_features': list(categorical_features), 'max_bins': max_bins,
+        'fit_rows': _rows_key(fit_rows),
+    }
+    meta_path = out_dir / META_FILE
+    if meta_path.exists():
+        with open(meta_path, 'r') as f:
+            stored = json.load(f)
+        if {k: stored.get(k) for k in meta} == meta:
+            print(f"🧱 Reusing binned dataset {out_dir} ({stored['rows']:,} rows, binned once in {stored['bin_seconds']}s)")
+            return out_dir
+
+    start = time.perf_counter()
+    if X is not None:
+        X = X.sort_index()
+    if X is None or not X.index.equals(pd.RangeIndex(len(X))):
+        X = pd.read_csv(data_path, usecols=list(features))[list(features)].fillna(0)
+    X_fit = X if fit_rows is None else X.iloc[np.sort(np.asarray(fit_rows))]
+
+    bin_start = time.perf_counter()
+    template = HistGradientBoostingClassifier(categorical_features=list(categorical_features) or None,
+                                              max_bins=max_bins)
+    X_pre, known_categories = template._preprocess_X(X_fit, reset=True)
+    mapper = _BinMapper(n_bins=max_bins + 1, is_categorical=template._is_categorical_remapped,
+                        known_categories=known_categories, random_state=42,
+                        n_threads=_openmp_effective_n_threads())
+    mapper.fit(X_pre)
+    # Rows outside the fit rows are binned like a normal fit bins new data (unseen category -> missing)
+    X_binned = mapper.transform(template._preprocess_X(X, reset=False))
+    bin_seconds = time.perf_counter() - bin_start
+
+    # First fit row of every category: enough to refit the same category encoding on any subset
+    categorical = [features[i] for i in categorical_features]
+    first_rows = sorted({int(X_fit.index[0]),
+                         *(int(i) for col in categorical for i in X_fit.groupby(col, sort=False).head(1).index)})
+    category_rows = X.loc[first_rows].reset_index(drop=True)
+
+    if out_dir.parent.exists():
+        _prune(out_dir.parent, meta['sha256'])
+    out_dir.mkdir(parents=True, exist_ok=True)
+    meta_path.unlink(missing_ok=True)
+    _atomic_save(out_dir / X_FILE, lambda f: np.save(f, X_binned))
+    _atomic_save(out_dir / BINNING_FILE, lambda f: joblib.dump({'mapper': mapper, 'category_rows': category_rows}, f))
+    meta.update(rows=len(X), fit_row_count=len(X_fit), bin_seconds=round(bin_seconds, 3),
+                built_at=pd.Timestamp.now().isoformat(timespec='seconds'))
+    _atomic_save(meta_path, lambda f: json.dump(meta, f, indent=2), mode='w')
+    print(f"🧱 Binned {len(X):,} x {len(features)} rows (thresholds from {len(X_fit):,}) -> uint8 {out_dir} "
+          f"(binning {bin_seconds:.2f}s, total {time.perf_counter() - start:.2f}s)")
+    return out_dir
+
+
+def load(out_dir):
+    """The cached dataset: memory-mapped bins, mapper, category rows, meta and per-process timings."""
+    with open(out_dir / META_FILE, 'r') as f:
+        meta = json.load(f)
+    binning = joblib.load(out_dir / BINNING_FILE)
+    return {
+        'X': np.load(out_dir / X_FILE, mmap_mode='r'), 'meta': meta, **binning,
+        'stats': {'fits': 0, 'rows': 0, 'slice_seconds': 0.0, 'fit_seconds': 0.0, 'fallbacks': 0},
+    }
+
+
+# --- FIT ---
+
+def usable(model, binned, X=None):
+    """The cache holds these bins: same features, categorical features and max_bins as the model."""
+    meta = binned['meta']
+    categorical = model.categorical_features
+    categorical = [] if categorical is None else list(categorical)
+    if model.max_bins != meta['max_bins'] or (X is not None and X.shape[1] != len(meta['features'])):
+        return False
+    if isinstance(X, pd.DataFrame) and list(X.columns) != meta['features']:
+        return False
+    return categorical == meta['categorical_features']
+
+
+def holds_out_validation(model, n_samples):
+    """
+    sklearn's own early stopping is on for this fit ('auto': above 10k rows): it splits
+    off a random validation set first and bins the remaining rows only, so bins cached
+    from all fit rows would give a different model.
+    """
+    on = n_samples > 10000 if model.early_stopping == 'auto' else bool(model.early_stopping)
+    return on and model.validation_fraction is not None
+
+
+def fit_binned(model, binned, X, y, sample_weight=None, rows=None):
+    """
+    model.fit(X, y, sample_weight) taking the rows' bins from the cache instead of
+    re-binning X. `rows` are CSV row positions of X (default: X.index). The category
+    encoding is refit on the cached category rows and the model keeps the cached
+    mapper, so it predicts on raw X exactly like a normal fit when X is the cache's fit
+    rows. A subset of them would keep the thresholds of the whole set and give a
+    different model than a normal fit: pass the fit rows only. Falls back to a normal
+    fit when the cache does not match or sklearn's own early stopping is on (holds_out_validation).
+    Fit time and row slicing time are accumulated in binned['stats'].
+
+    X=None fits on the cached rows alone (tuning: its float32 copy of the data would
+    not fall in the same bins at every threshold); score them with predict_proba_binned.
+    """
+    start = time.perf_counter()
+    if binned is None or not usable(model, binned, X) or holds_out_validation(model, len(y)):
+        if X is None:
+            raise ValueError("X is required when the binned cache cannot serve this fit")
+        model.fit(X, y, sample_weight=sample_weight)
+        if binned is not None:
+            binned['stats']['fallbacks'] += 1
+        return model
+
+    stats = binned['stats']
+    preprocess = model._preprocess_X
+    rows = X.index.to_numpy() if rows is None else np.asarray(rows)
+    state = {}
+
+    def _preprocess_X(X_fit, *, reset):
+        if not reset:
+            return preprocess(X_fit, reset=False)
+        sample = binned['category_rows']
+        if X_fit is not None and not isinstance(X_fit, pd.DataFrame):
+            sample = sample.to_numpy(dtype=np.asarray(X_fit[:1]).dtype)
+        _, known_categories = preprocess(sample, reset=True)
+
+        slice_start = time.perf_counter()
+        X_binned = binned['X'][rows]
+        if X_fit is None:
+            stats['slice_seconds'] += time.perf_counter() - slice_start
+            return X_binned, known_categories
+        head = slice(0, min(SPOT_CHECK_ROWS, len(rows)))
+        check = binned['mapper'].transform(preprocess(X_fit[head], reset=False))
+        stats['slice_seconds'] += time.perf_counter() - slice_start
+        if not np.array_equal(check, X_binned[head]):
+            print("⚠️ Rows do not line up with the binned cache (index reset?). Binning this fit normally.")
+            state['fallback'] = True
+            return preprocess(X_fit, reset=True)
+        return X_binned, known_categories
+
+    def _bin_data(X_fit, is_training_data):
+        if state.get('fallback'):
+            return type(model)._bin_data(model, X_fit, is_training_data)
+        model._bin_mapper = binned['mapper']
+        return np.asfortranarray(X_fit) if is_training_data else np.ascontiguousarray(X_fit)
+
+    model._preprocess_X, model._bin_data = _preprocess_X, _bin_data
+    try:
+        model.fit(X, y, sample_weight=sample_weight)
+    finally:
+        del model._preprocess_X, model._bin_data
+
+    stats['fits'] += 1
+    stats['rows'] += len(rows)
+    stats['fallbacks'] += bool(state.get('fallback'))
+    stats['fit_seconds'] += time.perf_counter() - start
+    return model
+
+
+def predict_proba_binned(model, binned, rows):
+    """predict_proba of cached rows, on their bins (no raw X, no re-binning)."""
+    model._in_fit = True   # sklearn's own flag for "X is already binned"
+    try:
+        return model.predict_proba(np.ascontiguousarray(binned['X'][rows]))
+    finally:
+        del model._in_fit
+
+
+def report(binned, label="Fits"):
+    """
+    Prints binning vs boosting time of the fits so far (`binned` may be a list, e.g.
+    one cache per fold). Returns the record stored with the model.
+    """
+    caches = binned if isinstance(binned, list) else [binned]
+    fits = sum(b['stats']['fits'] for b in caches)
+    if not fits:
+        return {}
+    # Binning scales with rows: what the same fits would have spent binning their rows themselves
+    uncached = sum(b['meta']['bin_seconds'] * b['stats']['rows'] / b['meta']['rows'] for b in caches)
+    sliced = sum(b['stats']['slice_seconds'] for b in caches)
+    boosting = sum(b['stats']['fit_seconds'] for b in caches) - sliced
+    built = sum(b['meta']['bin_seconds'] for b in caches)
+    fallbacks = sum(b['stats']['fallbacks'] for b in caches)
+    fallbacks = f" | {fallbacks} fits binned normally" if fallbacks else ""
+    print(f"🧱 {label}: {fits} fits, binning {sliced:.2f}s from the cache "
+          f"(~{uncached:.2f}s if each fit re-binned; {len(caches)} cache(s) built once in {built:.2f}s) "
+          f"| boosting {boosting:.2f}s{fallbacks}")
+    return {
+        'binned_fits': fits, 'binning_seconds': round(sliced, 3),
+        'binning_uncached_seconds': round(uncached, 3), 'boosting_seconds': round(boosting, 3),
+    }
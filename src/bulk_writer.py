@@ -0,0 +1,105 @@
+import csv
+import io
+import time
+import sys
+import os
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+try:
+    from src import config
+except ImportError:
+    import config
+
+NULL = r'\N'
+
+
+def _copy_batch(cursor, stage, columns, batch, start_ord):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for i, row in enumerate(batch):
+        writer.writerow([NULL if v is None else v for v in row] + [start_ord + i])
+    buffer.seek(0)
+    cursor.copy_expert(
+        f"COPY {stage} ({', '.join(columns)}, _ord) FROM STDIN WITH (FORMAT csv, NULL '{NULL}')", buffer
+    )
+
+
+def _merge(cursor, stage, columns, batch, start_ord, insert):
+    _copy_batch(cursor, stage, columns, batch, start_ord)
+    cursor.execute(insert)
+    written = cursor.rowcount
+    cursor.execute(f"TRUNCATE {stage}")
+    return written
+
+
+def bulk_upsert(conn, table, columns, rows, conflict_cols=None, update_cols=None,
+                batch_size=None, label=None, verbose=True):
+    """
+    Writes rows (tuples in `columns` order) with COPY instead of INSERT ... VALUES.
+
+    Each batch is streamed into a temporary staging table (temp tables are never
+    WAL-logged) and merged into `table` with ONE INSERT ... SELECT:
+    - conflict_cols=None: plain append
+    - conflict_cols + update_cols=None: ON CONFLICT DO NOTHING
+    - conflict_cols + update_cols: ON CONFLICT DO UPDATE SET col = EXCLUDED.col
+    Duplicate keys inside a batch collapse the way row-by-row inserts would:
+    the first occurrence is kept for DO NOTHING, the last one for DO UPDATE.
+
+    The caller owns the transaction (nothing is committed here).
+    Returns {'rows', 'written', 'seconds', 'rows_per_sec'}.
+    """
+    batch_size = batch_size or config.BULK_BATCH_SIZE
+    label = label or table
+    stage = f"_bulk_stage_{table}"
+    cols = ', '.join(columns)
+
+    insert = f"INSERT INTO {table} ({cols}) "
+    if conflict_cols:
+        key = ', '.join(conflict_cols)
+        keep = "DESC" if update_cols else "ASC"
+        insert += f"SELECT DISTINCT ON ({key}) {cols} FROM {stage} ORDER BY {key}, _ord {keep}"
+        if update_cols:
+            updates = ', '.join(f"{c} = EXCLUDED.{c}" for c in update_cols)
+            insert += f" ON CONFLICT ({key}) DO UPDATE SET {updates}"
+        else:
+            insert += f" ON CONFLICT ({key}) DO NOTHING"
+    else:
+        insert += f"SELECT {cols} FROM {stage} ORDER BY _ord"
+
+    start = time.perf_counter()
+    total, written = 0, 0
+    cursor = conn.cursor()
+    # Same column types as the target, without its constraints, defaults or indexes.
+    # ON COMMIT DROP: if a batch fails, the caller's rollback removes it (no cleanup
+    # statement in an aborted transaction that would mask the real error)
+    cursor.execute(f"DROP TABLE IF EXISTS {stage}")
+    cursor.execute(f"CREATE TEMP TABLE {stage} ON COMMIT DROP AS "
+                   f"SELECT {cols}, 0::bigint AS _ord FROM {table} WITH NO DATA")
+    try:
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= batch_size:
+                written += _merge(cursor, stage, columns, batch, total, insert)
+                total += len(batch)
+                batch = []
+        if batch:
+            written += _merge(cursor, stage, columns, batch, total, insert)
+            total += len(batch)
+        # Success: free the name now, the same transaction may write this table again
+        cursor.execute(f"DROP TABLE {stage}")
+    finally:
+        cursor.close()
+
+    seconds = time.perf_counter() - start
+    result = {
+        'rows': total,
+        'written': written,
+        'seconds': round(seconds, 3),
+        'rows_per_sec': round(total / seconds) if seconds > 0 else None,
+    }
+    if verbose and total:
+        print(f"🚚 {label}: {total:,} rows -> {written:,} written in {seconds:.2f}s "
+              f"({result['rows_per_sec']:,} rows/s)")
+    return result
\ No newline at end of file
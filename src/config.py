@@ -21,7 +21,6 @@ MODELS_DIR = BASE_DIR / "models"
 MODELS_DIR.mkdir(exist_ok=True)
 
 MODEL_PATH = MODELS_DIR / "no_draw_model.pkl"
-SHAP_EXPLAINER_PATH = MODELS_DIR / "shap_explainer.pkl"
 FEATURE_COLUMNS_PATH = MODELS_DIR / "feature_columns.json"
 
 # --- DATABASE CONFIG ---
@@ -54,7 +53,7 @@ MODEL_FEATURES = [
 # ... (Your existing code) ...
 
 # --- HOCKEY CONFIGURATION (NEW) ---
-HOCKEY_API_URL = "https://v1.hockey.api-sports.io"
+HOCKEY_API_URL = os.getenv("HOCKEY_API_URL", "https://v1.hockey.api-sports.io")
 HOCKEY_TABLE = "hockey_fixtures"
 HOCKEY_PROCESSED_PATH = BASE_DIR / "training_data_hockey.csv"
 HOCKEY_MODEL_PATH = MODELS_DIR / "hockey_regulation_model.pkl"
@@ -73,4 +72,137 @@ HOCKEY_LEAGUES = [
     6,    # Champions Hockey League
     1,    # World Championships
     2     # Olympics
-]
\ No newline at end of file
+]
+
+# --- PIPELINE ORCHESTRATOR ---
+# Budget shared by every step the orchestrator runs concurrently.
+PIPELINE_MAX_WORKERS = 4                             # Max steps running at the same time
+PIPELINE_CPU_BUDGET = os.cpu_count() or 2            # Cores the whole run may occupy
+PIPELINE_TRAIN_CPUS = max(1, PIPELINE_CPU_BUDGET // 2)  # Cores claimed by one training step
+PIPELINE_STEP_RETRIES = 2                            # Extra attempts after a failed step
+PIPELINE_RETRY_DELAY = 30                            # Seconds, multiplied by the attempt number
+PIPELINE_RUNS_DIR = BASE_DIR / "pipeline_runs"       # Machine-readable run summaries
+
+# --- STEP CACHE ---
+# Pipeline steps skip work when their input fingerprint was already built.
+STEP_CACHE_DIR = BASE_DIR / "cache" / "steps"
+STEP_CACHE_KEEP = 3                                  # Entries kept per step
+
+# --- PROFILING (opt-in: --profile) ---
+PROFILE_LOG_PATH = PIPELINE_RUNS_DIR / "profile.jsonl"   # One JSON line per profiled run
+PROFILE_PSTATS_DIR = PIPELINE_RUNS_DIR / "pstats"        # cProfile dumps (--pstats)
+
+# --- INCREMENTAL PREDICTIONS (predict_smart --incremental) ---
+PREDICTION_STATE_PATH = BASE_DIR / "cache" / "prediction_state.json"   # Last emitted numbers per fixture
+
+# --- API CLIENT ---
+# Both importers share one token bucket per API key (src/api_client.py).
+# The URLs can point at src/mock_api_server.py for offline testing.
+FOOTBALL_API_URL = os.getenv("FOOTBALL_API_URL", "https://v3.football.api-sports.io")
+API_REQUESTS_PER_MINUTE = 10     # Starting bucket size, re-synced from x-ratelimit-* headers
+API_MAX_CONCURRENCY = 4          # Requests in flight at the same time
+API_MAX_RETRIES = 5              # Rate-limit retries before giving up on a call
+API_BACKOFF_MAX = 65             # Seconds, cap of the adaptive backoff
+API_REQUESTS_PER_DAY = 100       # Daily quota of the key (re-synced from x-ratelimit-requests-* headers)
+API_QUOTA_RESERVE = 5            # Requests never planned, kept for manual runs / debugging
+API_QUOTA_LEDGER = BASE_DIR / "cache" / "api_quota.json"   # Usage ledger (src/quota_planner.py)
+
+# --- HTTP SESSION ---
+# One keep-alive session for every importer (src/http_session.py).
+HTTP_TIMEOUT = (5, 30)           # Seconds: (connect, read)
+HTTP_POOL_SIZE = 10              # Kept-alive connections per host
+HTTP_RETRIES = 3                 # Retries on 5xx / network errors
+HTTP_BACKOFF_FACTOR = 0.5        # Seconds, doubled per retry (jittered)
+
+# --- API RESPONSE CACHE ---
+# Successful API payloads are kept on disk (src/response_cache.py).
+# API_REPLAY=1 serves recorded responses only, so imports run fully offline.
+API_CACHE_DIR = BASE_DIR / "cache" / "api"
+API_CACHE_ENABLED = os.getenv("API_CACHE", "1") != "0"
+API_REPLAY = os.getenv("API_REPLAY", "0") == "1"
+API_CACHE_TTL = {            # Seconds; finished seasons / old dates never expire
+    'live': 5 * 60,          # Today & upcoming fixtures, injuries
+    'odds': 15 * 60,
+    'recent': 60 * 60,       # Yesterday (late results)
+    'default': 60 * 60,
+}
+
+# --- HOCKEY BACKFILL (src/backfill_hockey.py) ---
+HOCKEY_BACKFILL_SEASONS = [2022, 2023, 2024]    # Full seasons fetched per league
+HOCKEY_BACKFILL_DAYS = 10                        # Recent days fetched by date
+HOCKEY_BACKFILL_RANGE_DAYS = 5                   # Days per date-range work unit
+HOCKEY_BACKFILL_WORKERS = 3                      # Units in flight (quota is shared)
+HOCKEY_BACKFILL_MAX_ATTEMPTS = 3                 # Failed units are retried up to this many runs
+HOCKEY_BACKFILL_TABLE = "hockey_backfill_checkpoints"
+
+# --- ODDS HISTORY (src/odds_store.py) ---
+ODDS_HISTORY_TABLE = "odds_history"              # Append-only, partitioned by kickoff month
+ODDS_MOVEMENT_VIEW = "odds_line_movement"        # Opening / latest / closing per line
+ODDS_PRIMARY_BOOKMAKER = 1                       # Bookmaker used for model odds (legacy 'odds' table)
+ODDS_BOOKMAKERS = []                             # Bookmakers to keep in the history ([] = all)
+ODDS_MARKETS = [1, 5, 8]                         # Match Winner, Goals Over/Under, Both Teams Score
+ODDS_MAX_PAGES_PER_DAY = 10                      # Quota guard for /odds pagination
+
+# --- BULK WRITES (src/bulk_writer.py) ---
+BULK_BATCH_SIZE = 50000                          # Rows per COPY + merge round trip
+
+# --- HISTORY STORE (src/history_store.py) ---
+HISTORY_STORE_DIR = BASE_DIR / "history_store"   # One parquet file per season (all football-data columns)
+
+# --- BACKTEST (src/backtest.py) ---
+BACKTEST_FOLD = "season"                         # Retrain per "season" or "month" (expanding window, fit like train_model incl. early stopping)
+BACKTEST_MIN_TRAIN_SEASONS = 3                   # Seasons of history before the first test fold
+BACKTEST_WORKERS = max(1, min(4, os.cpu_count() or 1))   # Folds trained in parallel
+BACKTEST_BOOKS = ["ps", "b365"]                  # Closing odds used to settle (Pinnacle, then Bet365)
+BACKTEST_DIR = BASE_DIR / "backtests"
+
+# --- HYPERPARAMETER TUNING (src/tuning.py) ---
+TUNING_DIR = BASE_DIR / "cache" / "tuning"       # float32 .npy datasets + optuna.db (resumable studies)
+TUNING_TRIALS = 50                               # Total trials per study
+TUNING_WORKERS = max(1, min(4, os.cpu_count() or 1))   # Processes running trials in parallel
+TUNING_STARTUP_TRIALS = 5                        # Trials completed before the median pruner kicks in
+
+# --- MODEL REGISTRY (src/model_registry.py) ---
+MODEL_REGISTRY_DIR = MODELS_DIR / "registry"     # <sport>/<version>/ + CURRENT pointer
+MODEL_PROMOTION_TOLERANCE = 0.01                 # New model may be at most 1% worse in holdout log loss
+MODEL_REGISTRY_KEEP = 5                          # Versions kept per sport (the current one is never removed)
+
+# --- INCREMENTAL TRAINING (src/train_model.py) ---
+INCREMENTAL_TRAINING = True                      # Daily runs continue boosting the current model (warm_start)
+INCREMENTAL_EXTRA_ITER = 10                      # Boosting iterations added per incremental run
+INCREMENTAL_WINDOW_DAYS = 365                    # Recent history the added trees are fit on (new rows always included)
+INCREMENTAL_MAX_DRIFT = 0.01                     # Full refit when the update is >1% worse than the served model on the same holdout
+INCREMENTAL_FULL_REFIT_DAYS = 7                  # Full refit at least weekly
+
+# --- LEAGUE SHARDS (src/league_shards.py) ---
+LEAGUE_SHARDS = False                            # Also train per-league models next to the global one
+LEAGUE_SHARD_CLUSTERS = {}                       # Optional groups sharing one shard, e.g. {'top5': [39, 140, 135, 78, 61]}
+LEAGUE_SHARD_MIN_ROWS = 3000                     # Training rows below which a league stays on the global model
+LEAGUE_SHARD_VALID_WEEKS = 26                    # Shards are picked on the last N weeks of the training rows (not the holdout)
+LEAGUE_SHARD_MIN_VALID_ROWS = 200                # Rows in those weeks needed to compare a shard with the global model
+LEAGUE_SHARD_WORKERS = max(1, min(4, os.cpu_count() or 1))   # Shards trained in parallel
+
+# --- TRAINING BENCHMARK (src/benchmark_training.py) ---
+BENCHMARK_LOG_PATH = PIPELINE_RUNS_DIR / "benchmark_training.jsonl"   # One JSON line per case, keyed by commit
+BENCHMARK_SIZES = [10_000, 50_000, 179_000, 1_000_000]   # Rows (real subsets where available, synthetic always)
+BENCHMARK_THREADS = sorted({1, 2, os.cpu_count() or 1})  # OpenMP threads per fit
+BENCHMARK_TOLERANCES = {                         # --compare: worse than this is a regression
+    'fit_seconds': 0.10, 'predict_seconds': 0.20, 'rss_peak_mb': 0.10,   # relative
+    'log_loss': 0.002,                                                    # absolute
+}
+
+# --- EARLY STOPPING (train_model.fit_model, both sports) ---
+EARLY_STOPPING = True                            # Stop boosting on a time-ordered validation window
+EARLY_STOPPING_WEEKS = 6                         # Validation = the last N weeks of the training rows
+EARLY_STOPPING_MIN_ROWS = 300                    # Fewer validation rows: fixed max_iter instead
+EARLY_STOPPING_CHUNK = 10                        # Iterations boosted between validation checks
+EARLY_STOPPING_PATIENCE = 30                     # Stop after this many iterations without improvement
+EARLY_STOPPING_MAX_ITER = 1000                   # Cap (max_iter from best_params.json no longer limits it)
+
+# --- TRAINING RUNNER (src/training_runner.py) ---
+TRAINING_RUNNER_CPUS = os.cpu_count() or 1       # Threads split between concurrent training jobs (by training rows)
+TRAINING_RUNS_LOG_PATH = PIPELINE_RUNS_DIR / "training_runs.jsonl"   # Concurrent vs sequential wall times
+
+# --- BINNED DATASET (src/binned_dataset.py) ---
+BINNED_CACHE = True                              # Fits reuse the uint8 bins of the processed CSV (training, tuning, backtests)
+BINNED_DIR = BASE_DIR / "cache" / "binned"       # <sport>/<fit rows>/ bins + mapper per training window
\ No newline at end of file
@@ -0,0 +1,190 @@
+import argparse
+import re
+import time
+import sys
+import os
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+try:
+    from src import config
+except ImportError:
+    import config
+from import_history_csv import find_history_files, match_keys, WORKERS
+
+# --- SCHEMA ---
+# football-data.co.uk headers changed over the seasons (Betbrain 'BbMx'/'BbAv'
+# became 'Max'/'Avg', Pinnacle is 'PS' in 1X2 and 'P' in other markets).
+# Everything is mapped to one snake_case name per quantity.
+
+KEY_COLUMNS = {
+    'match_id': pa.int64(), 'season': pa.string(), 'league_id': pa.int32(), 'match_date': pa.date32(),
+    'home_team': pa.string(), 'away_team': pa.string(),
+    'home_team_id': pa.int32(), 'away_team_id': pa.int32(),
+    'home_goals': pa.int16(), 'away_goals': pa.int16(),
+}
+
+TEXT_COLUMNS = {
+    'Div': 'division', 'Time': 'kickoff_time', 'FTR': 'result', 'HTR': 'ht_result', 'Referee': 'referee',
+}
+
+STAT_COLUMNS = {
+    'HTHG': 'ht_home_goals', 'HTAG': 'ht_away_goals',
+    'HS': 'home_shots', 'AS': 'away_shots',
+    'HST': 'home_shots_on_target', 'AST': 'away_shots_on_target',
+    'HHW': 'home_woodwork', 'AHW': 'away_woodwork',
+    'HC': 'home_corners', 'AC': 'away_corners',
+    'HF': 'home_fouls', 'AF': 'away_fouls',
+    'HFKC': 'home_free_kicks_conceded', 'AFKC': 'away_free_kicks_conceded',
+    'HO': 'home_offsides', 'AO': 'away_offsides',
+    'HY': 'home_yellow', 'AY': 'away_yellow',
+    'HR': 'home_red', 'AR': 'away_red',
+    'HBP': 'home_booking_points', 'ABP': 'away_booking_points',
+    'Bb1X2': 'bb_count_1x2', 'BbOU': 'bb_count_ou', 'BbAH': 'bb_count_ah',
+}
+
+BOOKMAKERS = {
+    '1XB': '1xb', 'B365': 'b365', 'BF': 'bf', 'BFD': 'bfd', 'BFE': 'bfe', 'BMGM': 'bmgm', 'BS': 'bs',
+    'BV': 'bv', 'BW': 'bw', 'CL': 'cl', 'GB': 'gb', 'IW': 'iw', 'LB': 'lb', 'PS': 'ps', 'P': 'ps',
+    'SB': 'sb', 'SJ': 'sj', 'VC': 'vc', 'WH': 'wh', 'Max': 'max', 'Avg': 'avg', 'BbMx': 'max', 'BbAv': 'avg',
+}
+# Longest codes first so 'BFDH' is Betfred home, 'BFD' Betfair draw
+_BK = '|'.join(sorted(map(re.escape, BOOKMAKERS), key=len, reverse=True))
+ODDS_PATTERNS = [
+    (re.compile(rf'^({_BK})(C?)([HDA])$'), {'H': 'home', 'D': 'draw', 'A': 'away'}),
+    (re.compile(rf'^({_BK})(C?)([<>])2\.5$'), {'>': 'over25', '<': 'under25'}),
+    (re.compile(rf'^({_BK})(C?)AH([HA])$'), {'H': 'ah_home', 'A': 'ah_away'}),
+]
+AH_LINE_COLUMNS = {'AHh': 'ah_line', 'BbAHh': 'ah_line', 'AHCh': 'ah_line_close'}
+
+
+def normalize_column(name):
+    """Raw header -> (store name, kind) with kind in text/stat/odds, or (None, None) to drop."""
+    name = name.replace('﻿', '').replace('ï»¿', '').strip()
+    if name in TEXT_COLUMNS:
+        return TEXT_COLUMNS[name], 'text'
+    if name in STAT_COLUMNS:
+        return STAT_COLUMNS[name], 'stat'
+    if name in AH_LINE_COLUMNS:
+        return AH_LINE_COLUMNS[name], 'odds'
+    for pattern, selections in ODDS_PATTERNS:
+        m = pattern.match(name)
+        if m:
+            bookmaker, closing, selection = m.groups()
+            return f"{BOOKMAKERS[bookmaker]}{'_close' if closing else ''}_{selections[selection]}", 'odds'
+    return None, None
+
+
+def season_of(path):
+    """'datahistory_10_11.csv/E0.csv' -> '10_11'."""
+    m = re.search(r'datahistory_(\d+_\d+)', path)
+    return m.group(1) if m else None
+
+
+def normalize_history_file(path, league_id):
+    """One CSV -> typed frame keyed by our match ids (same rows as import_history_csv)."""
+    try:
+        df = pd.read_csv(path, encoding='latin-1', low_memory=False)
+        df.columns = [c.replace('ï»¿', '') for c in df.columns]
+        if not {'FTHG', 'FTAG', 'Date', 'HomeTeam', 'AwayTeam'}.issubset(df.columns): return None
+
+        keys = match_keys(df, league_id)
+        out = {col: keys[col] for col in keys.columns}
+        out['season'] = season_of(path)
+        for raw in df.columns:
+            name, kind = normalize_column(raw)
+            if name is None: continue
+            values = df.loc[keys.index, raw]
+            if kind == 'text':
+                values = values.astype('string').str.strip()
+            else:
+                values = pd.to_numeric(values, errors='coerce')
+                if kind == 'stat':
+                    # A few files have shifted cells (odds under a count header)
+                    values = values.where(values == values.round())
+            # Old and new header of the same quantity in one file: keep the first non-null
+            out[name] = out[name].fillna(values) if name in out else values
+        return pd.DataFrame(out).reset_index(drop=True)
+    except Exception as e:
+        print(f"    Error reading {path}: {e}")
+        return None
+
+
+def build_schema(frames):
+    fields = [pa.field(name, dtype) for name, dtype in KEY_COLUMNS.items()]
+    present = set().union(*(f.columns for f in frames))
+    fields += [pa.field(name, pa.string()) for name in TEXT_COLUMNS.values() if name in present]
+    fields += [pa.field(name, pa.int16()) for name in dict.fromkeys(STAT_COLUMNS.values()) if name in present]
+    known = {f.name for f in fields}
+    fields += [pa.field(name, pa.float32()) for name in sorted(present - known)]
+    return pa.schema(fields)
+
+
+def build_history_store(root_dir=None, out_dir=None, workers=None):
+    """
+    Parses every datahistory_* CSV (in parallel) into one parquet file per season
+    with a shared schema. Later files win on duplicate match ids, like the DB import.
+    """
+    root_dir = root_dir or config.BASE_DIR
+    out_dir = out_dir or config.HISTORY_STORE_DIR
+    files = find_history_files(str(root_dir))
+    print(f"📚 Normalizing {len(files)} league files into {out_dir}...")
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers or WORKERS) as pool:
+        frames = [f for f in pool.map(normalize_history_file, *zip(*files)) if f is not None]
+    if not frames:
+        print("⚠️ No history files found.")
+        return None
+
+    schema = build_schema(frames)
+    history = pd.concat(frames, ignore_index=True).drop_duplicates('match_id', keep='last')
+    history['match_date'] = pd.to_datetime(history['match_date']).dt.date
+    for field in schema:
+        if field.name not in history.columns:
+            history[field.name] = None
+    history = history[schema.names]
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    for season, part in history.groupby('season', sort=True):
+        table = pa.Table.from_pandas(part, schema=schema, preserve_index=False)
+        path = out_dir / f"season_{season}.parquet"
+        tmp = path.with_suffix('.parquet.tmp')
+        pq.write_table(table, tmp, compression='zstd')
+        os.replace(tmp, path)
+
+    size = sum(p.stat().st_size for p in out_dir.glob('*.parquet'))
+    print(f"✅ History store: {len(history):,} matches x {len(schema)} columns, "
+          f"{history['season'].nunique()} seasons, {size / 1e6:.1f} MB in {time.perf_counter() - start:.1f}s")
+    return history
+
+
+def load_history(columns=None, leagues=None, seasons=None, store_dir=None):
+    """
+    Column scan of the store: only the requested columns are read from disk.
+    match_id is always included. Example:
+        load_history(['match_date', 'home_shots', 'ps_close_home'], leagues=[39])
+    """
+    dataset = ds.dataset(store_dir or config.HISTORY_STORE_DIR, format='parquet')
+    filters = None
+    if leagues:
+        filters = ds.field('league_id').isin(list(leagues))
+    if seasons:
+        season_filter = ds.field('season').isin(list(seasons))
+        filters = season_filter if filters is None else filters & season_filter
+    if columns is not None:
+        columns = list(dict.fromkeys(['match_id', *columns]))
+    return dataset.to_table(columns=columns, filter=filters).to_pandas(date_as_object=False)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--root', help="Folder containing the datahistory_* season folders")
+    parser.add_argument('--workers', type=int)
+    args = parser.parse_args()
+    build_history_store(args.root, workers=args.workers)
\ No newline at end of file
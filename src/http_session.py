@@ -0,0 +1,132 @@
+import random
+import threading
+import sys
+import os
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.util.retry import Retry
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+try:
+    from src import config
+except ImportError:
+    import config
+
+
+class JitteredRetry(Retry):
+    """Exponential backoff with +/-50% jitter so parallel retries don't hit the server in lockstep."""
+
+    def get_backoff_time(self):
+        backoff = super().get_backoff_time()
+        return backoff * random.uniform(0.5, 1.5) if backoff else 0
+
+
+class ConnectionStats:
+    """Counts HTTP exchanges vs. newly opened connections (the rest reused a kept-alive socket)."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.requests = 0
+        self.new_connections = 0
+
+    def add(self, field):
+        with self.lock:
+            setattr(self, field, getattr(self, field) + 1)
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                'requests': self.requests,
+                'new_connections': self.new_connections,
+                'reused': max(self.requests - self.new_connections, 0),
+            }
+
+
+def _counting_pool(base, stats):
+    class CountingPool(base):
+        def _new_conn(self):
+            stats.add('new_connections')
+            return super()._new_conn()
+
+        def _make_request(self, *args, **kwargs):
+            stats.add('requests')
+            return super()._make_request(*args, **kwargs)
+
+    return CountingPool
+
+
+class PooledAdapter(HTTPAdapter):
+    """HTTPAdapter with a default timeout and connection accounting."""
+
+    def __init__(self, stats, timeout, **kwargs):
+        self.stats = stats
+        self.timeout = timeout
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': _counting_pool(HTTPConnectionPool, self.stats),
+            'https': _counting_pool(HTTPSConnectionPool, self.stats),
+        }
+
+    def send(self, request, **kwargs):
+        if kwargs.get('timeout') is None:
+            kwargs['timeout'] = self.timeout
+        return super().send(request, **kwargs)
+
+
+def build_session(stats=None):
+    """
+    requests.Session shared by the importers:
+    - keep-alive pool sized for config.API_MAX_CONCURRENCY
+    - (connect, read) timeout on every call
+    - jittered exponential retries on 5xx and connection/read errors
+      (429 is left to the rate limiter in api_client.py)
+    - gzip responses
+    """
+    retry = JitteredRetry(
+        total=config.HTTP_RETRIES,
+        connect=config.HTTP_RETRIES,
+        read=config.HTTP_RETRIES,
+        status=config.HTTP_RETRIES,
+        status_forcelist=(500, 502, 503, 504),
+        allowed_methods=frozenset(['GET']),
+        backoff_factor=config.HTTP_BACKOFF_FACTOR,
+        respect_retry_after_header=False,
+        raise_on_status=False,
+    )
+    adapter = PooledAdapter(
+        stats or ConnectionStats(), config.HTTP_TIMEOUT,
+        pool_connections=2, pool_maxsize=config.HTTP_POOL_SIZE, max_retries=retry,
+    )
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.headers.update({'Accept-Encoding': 'gzip, deflate'})
+    session.stats = adapter.stats
+    return session
+
+
+_SESSION = None
+_SESSION_LOCK = threading.Lock()
+
+def get_session():
+    """Process-wide session, so every importer reuses the same connections."""
+    global _SESSION
+    with _SESSION_LOCK:
+        if _SESSION is None:
+            _SESSION = build_session()
+        return _SESSION
+
+
+def print_connection_stats(label="HTTP"):
+    s = get_session().stats.snapshot()
+    print(f"🔌 {label}: {s['requests']} requests over {s['new_connections']} connections "
+          f"({s['reused']} reused)")
+    return s
\ No newline at end of file
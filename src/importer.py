@@ -1,6 +1,4 @@
-import requests
 import psycopg2
-from psycopg2.extras import execute_values
 from datetime import datetime, timedelta
 import sys
 import os
@@ -10,14 +8,25 @@ import math
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 try:
     from src import config
+    from src.api_client import ApiClient
+    from src.http_session import print_connection_stats
+    from src.odds_store import parse_odds_response, append_odds_history, refresh_line_movement
+    from src.bulk_writer import bulk_upsert
+    from src.quota_planner import get_quota_planner
 except ImportError:
     import config
+    from api_client import ApiClient
+    from http_session import print_connection_stats
+    from odds_store import parse_odds_response, append_odds_history, refresh_line_movement
+    from bulk_writer import bulk_upsert
+    from quota_planner import get_quota_planner
 
 # --- CONFIGURATION ---
 if not config.API_KEY:
     raise ValueError("API_KEY not set. Please define it in your .env file.")
-BASE_URL = "https://v3.football.api-sports.io"
-HEADERS = {'x-apisports-key': config.API_KEY}
+BASE_URL = config.FOOTBALL_API_URL
+CLIENT = ApiClient(BASE_URL)  # Rate limiter shared with the hockey importer
+QUOTA = get_quota_planner()   # Daily budget shared with the hockey importer
 
 def get_db_connection():
     try:
@@ -44,20 +53,20 @@ def create_tables_if_not_exist(cursor):
             league_id INT, team_id INT, rank INT, form VARCHAR(10), 
             points INT, goals_diff INT, updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
             PRIMARY KEY (league_id, team_id)
-        );"""
+        );""",
+        # API fixture id, so odds history / injuries can be joined to fixtures
+        "ALTER TABLE fixtures ADD COLUMN IF NOT EXISTS api_fixture_id INT;"
     ]
     for q in queries:
         cursor.execute(q)
 
 def fetch_api(endpoint, params):
-    try:
-        r = requests.get(f"{BASE_URL}/{endpoint}", headers=HEADERS, params=params)
-        if r.status_code == 200: return r.json().get('response', [])
-        print(f"⚠️ API Error {r.status_code}: {r.text}")
-        return []
-    except Exception as e:
-        print(f"❌ Network Error: {e}")
-        return []
+    data = CLIENT.get(endpoint, params)
+    return data.get('response', []) if data else []
+
+def fetch_api_many(calls, budget=None):
+    """Concurrent fetch_api for [(endpoint, params), ...], results in the same order."""
+    return [data.get('response', []) if data else [] for data in CLIENT.fetch_many(calls, budget=budget)]
 
 # --- CORE IMPORTERS ---
 
@@ -74,9 +83,16 @@ def import_matches_and_fixtures():
         'tomorrow': (datetime.now() + timedelta(days=1)).strftime('%Y-%m-%d')
     }
 
+    # Results are claimed from the daily quota before fixtures (Cost: 1 + 2 Requests)
+    with QUOTA.task('football.results') as budget:
+        responses = {dates['yesterday']: fetch_api_many([("fixtures", {"date": dates['yesterday']})], budget)[0]}
+    days = [dates['today'], dates['tomorrow']]
+    with QUOTA.task('football.fixtures') as budget:
+        responses.update(zip(days, fetch_api_many([("fixtures", {"date": day}) for day in days], budget)))
+
     # 1. PROCESS YESTERDAY (Results)
     print(f"📥 Processing Results for {dates['yesterday']}...")
-    data = fetch_api("fixtures", {"date": dates['yesterday']})
+    data = responses[dates['yesterday']]
     
     history_matches = []
     teams = {}
@@ -92,11 +108,11 @@ def import_matches_and_fixtures():
             teams[m['teams']['away']['id']] = m['teams']['away']['name']
 
     if teams:
-        execute_values(cursor, "INSERT INTO teams (team_id, name) VALUES %s ON CONFLICT (team_id) DO NOTHING", list(teams.items()))
+        bulk_upsert(conn, "teams", ['team_id', 'name'], list(teams.items()), conflict_cols=['team_id'])
     if history_matches:
-        q = """INSERT INTO matches (match_id, league_id, match_date, home_team_id, away_team_id, home_goals, away_goals, status)
-               VALUES %s ON CONFLICT (match_id) DO UPDATE SET status='FT', home_goals=EXCLUDED.home_goals, away_goals=EXCLUDED.away_goals"""
-        execute_values(cursor, q, history_matches)
+        bulk_upsert(conn, "matches",
+                    ['match_id', 'league_id', 'match_date', 'home_team_id', 'away_team_id', 'home_goals', 'away_goals', 'status'],
+                    history_matches, conflict_cols=['match_id'], update_cols=['status', 'home_goals', 'away_goals'])
         print(f"✅ Updated {len(history_matches)} finished matches.")
 
     # 2. PROCESS TODAY & TOMORROW (Fixtures)
@@ -105,53 +121,78 @@ def import_matches_and_fixtures():
     fixture_ids = [] # Collect IDs for Odds/Injuries
     
     for day in [dates['today'], dates['tomorrow']]:
-        data = fetch_api("fixtures", {"date": day})
+        data = responses[day]
         for m in data:
             if m['fixture']['status']['short'] in ['NS', 'TBD']:
                 fixtures_data.append((
                     m['fixture']['date'], m['teams']['home']['name'], m['teams']['away']['name'],
-                    m['league']['id'], 'SCHEDULED'
+                    m['league']['id'], 'SCHEDULED', m['fixture']['id']
                 ))
                 fixture_ids.append(m['fixture']['id'])
 
     cursor.execute("TRUNCATE TABLE fixtures")
     if fixtures_data:
-        execute_values(cursor, "INSERT INTO fixtures (match_date, home_team, away_team, league_id, status) VALUES %s", fixtures_data)
+        bulk_upsert(conn, "fixtures", ['match_date', 'home_team', 'away_team', 'league_id', 'status', 'api_fixture_id'], fixtures_data)
         print(f"✅ Scheduled {len(fixtures_data)} upcoming matches.")
 
     conn.commit()
     conn.close()
     return fixture_ids
 
+def fetch_odds_items(days, budget=None):
+    """Every page of /odds (all bookmakers) for the given dates. Page 1 tells how many follow."""
+    first_pages = CLIENT.fetch_many([("odds", {"date": day}) for day in days], budget=budget)
+    items, calls = [], []
+    for day, first in zip(days, first_pages):
+        if not first: continue
+        items.extend(first.get('response', []))
+        total = first.get('paging', {}).get('total', 1)
+        if total > config.ODDS_MAX_PAGES_PER_DAY:
+            print(f"⚠️ {day}: {total} odds pages, only the first {config.ODDS_MAX_PAGES_PER_DAY} are fetched.")
+        last_page = min(total, config.ODDS_MAX_PAGES_PER_DAY)
+        calls.extend(("odds", {"date": day, "page": page}) for page in range(2, last_page + 1))
+    for page_items in fetch_api_many(calls, budget):
+        items.extend(page_items)
+    return items
+
 def import_odds(fixture_ids):
-    """Fetches Odds using Date filtering to save requests."""
+    """Appends today's & tomorrow's prices (all bookmakers/markets) to the odds history."""
     if not fixture_ids: return
     conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    print("💰 Fetching Market Odds...")
-    # Strategy: Call odds by DATE (tomorrow) instead of ID to save requests
-    tomorrow = (datetime.now() + timedelta(days=1)).strftime('%Y-%m-%d')
-    data = fetch_api("odds", {"date": tomorrow, "bookmaker": 1}) # 1 = Bet365
-    
+    if not conn: return
+
+    print("💰 Fetching Market Odds (paginated, all bookmakers)...")
+    days = [datetime.now().strftime('%Y-%m-%d'), (datetime.now() + timedelta(days=1)).strftime('%Y-%m-%d')]
+    with QUOTA.task('football.odds') as budget:
+        items = fetch_odds_items(days, budget)
+
+    # 1. Append-only history (deduplicated on fixture/bookmaker/market/update time)
+    rows = parse_odds_response(items, config.ODDS_BOOKMAKERS, config.ODDS_MARKETS)
+    added = append_odds_history(conn, rows)
+    refresh_line_movement(conn)
+    print(f"✅ Odds history: {len(rows)} prices fetched, {added} new.")
+
+    # 2. Legacy snapshot: primary bookmaker's latest 1X2 for upcoming fixtures
     odds_data = []
-    for item in data:
+    for item in items:
         if item['fixture']['id'] in fixture_ids:
             try:
+                bookmaker = next(b for b in item['bookmakers'] if b['id'] == config.ODDS_PRIMARY_BOOKMAKER)
                 # Find Match Winner odds
-                markets = [m for m in item['bookmakers'][0]['bets'] if m['id'] == 1]
+                markets = [m for m in bookmaker['bets'] if m['id'] == 1]
                 if markets:
                     vals = {v['value']: v['odd'] for v in markets[0]['values']}
                     odds_data.append((
-                        item['fixture']['id'], 1, 
+                        item['fixture']['id'], config.ODDS_PRIMARY_BOOKMAKER,
                         vals.get('Home'), vals.get('Draw'), vals.get('Away')
                     ))
             except: continue
 
+    cursor = conn.cursor()
     if odds_data:
         # Clear old odds to keep DB light
         cursor.execute("TRUNCATE TABLE odds")
-        execute_values(cursor, "INSERT INTO odds (fixture_id, bookmaker_id, home_odd, draw_odd, away_odd) VALUES %s", odds_data)
+        bulk_upsert(conn, "odds", ['fixture_id', 'bookmaker_id', 'home_odd', 'draw_odd', 'away_odd'], odds_data)
         print(f"✅ Updated Odds for {len(odds_data)} matches.")
     
     conn.commit()
@@ -169,11 +210,15 @@ def import_injuries(fixture_ids):
     chunk_size = 20
     injury_records = []
     
+    calls = []
     for i in range(0, len(fixture_ids), chunk_size):
         chunk = fixture_ids[i:i + chunk_size]
         ids_str = "-".join(map(str, chunk))
-        
-        data = fetch_api("injuries", {"ids": ids_str})
+        calls.append(("injuries", {"ids": ids_str}))
+
+    with QUOTA.task('football.injuries') as budget:
+        responses = fetch_api_many(calls, budget)
+    for data in responses:
         for item in data:
             injury_records.append((
                 item['fixture']['id'], item['player']['name'], 
@@ -182,7 +227,7 @@ def import_injuries(fixture_ids):
             
     if injury_records:
         cursor.execute("TRUNCATE TABLE injuries")
-        execute_values(cursor, "INSERT INTO injuries (fixture_id, player_name, team_id, type, reason) VALUES %s", injury_records)
+        bulk_upsert(conn, "injuries", ['fixture_id', 'player_name', 'team_id', 'type', 'reason'], injury_records)
         print(f"✅ Found {len(injury_records)} injury reports.")
     
     conn.commit()
@@ -191,18 +236,22 @@ def import_injuries(fixture_ids):
 def run_importer():
     print("🚀 Starting Daily Data Import (Phase 5)...")
     
-    # 1. Matches & Fixtures (Cost: ~3 Requests)
+    # Each step spends only what the shared daily quota leaves after the more
+    # valuable steps of both sports (results > fixtures > odds > injuries).
+    # 1. Matches & Fixtures (Cost: 3 Requests)
     fixture_ids = import_matches_and_fixtures()
     
-    # 2. Odds (Cost: ~2-4 Requests)
+    # 2. Odds (Cost: 2 Requests + 1 per extra page, capped by ODDS_MAX_PAGES_PER_DAY)
     if fixture_ids:
         import_odds(fixture_ids)
         
-    # 3. Injuries (Cost: ~3-5 Requests depending on volume)
+    # 3. Injuries (Cost: 1 Request per 20 fixtures)
     if fixture_ids:
         import_injuries(fixture_ids)
         
     print("🏁 Data Import Complete.")
+    QUOTA.print_plan()
+    print_connection_stats("Football API")
 
 if __name__ == "__main__":
     run_importer()
\ No newline at end of file
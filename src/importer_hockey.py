@@ -1,21 +1,44 @@
-import requests
 import psycopg2
-from psycopg2.extras import execute_values
 from datetime import datetime, timedelta
 import sys
 import os
-import time
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 try:
     from src import config
+    from src.api_client import ApiClient
+    from src.http_session import print_connection_stats
+    from src.bulk_writer import bulk_upsert
+    from src.quota_planner import get_quota_planner
 except ImportError:
     import config
+    from api_client import ApiClient
+    from http_session import print_connection_stats
+    from bulk_writer import bulk_upsert
+    from quota_planner import get_quota_planner
+
+# Column order of parse_game() tuples
+GAME_COLUMNS = [
+    'fixture_id', 'league_id', 'season', 'date',
+    'home_team_id', 'away_team_id', 'home_team_name', 'away_team_name',
+    'goals_home', 'goals_away',
+    'score_p1_home', 'score_p1_away', 'score_p2_home', 'score_p2_away',
+    'score_p3_home', 'score_p3_away', 'score_ot_home', 'score_ot_away',
+    'score_pen_home', 'score_pen_away', 'status_short'
+]
+# Refreshed when a known game is imported again (scores and status move, the rest is fixed)
+GAME_UPDATE_COLUMNS = [
+    'goals_home', 'goals_away',
+    'score_p1_home', 'score_p1_away', 'score_p2_home', 'score_p2_away',
+    'score_p3_home', 'score_p3_away', 'score_ot_home', 'score_ot_away',
+    'score_pen_home', 'score_pen_away', 'status_short'
+]
 
 class HockeyImporter:
     def __init__(self):
         self.base_url = config.HOCKEY_API_URL
-        self.headers = {'x-apisports-key': config.API_KEY}
+        self.client = ApiClient(self.base_url)  # Rate limiter shared with the football importer
+        self.quota = get_quota_planner()         # Daily budget shared with the football importer
         self.leagues = config.HOCKEY_LEAGUES
         self.table = config.HOCKEY_TABLE
 
@@ -29,59 +52,26 @@ class HockeyImporter:
             print(f"❌ Database Connection Error: {e}")
             return None
     
-    def _smart_request(self, url, params):
-        retries = 3
-        while retries > 0:
-            try:
-                response = requests.get(url, headers=self.headers, params=params)
-                
-                # --- NEW: Quota Tracking ---
-                remaining = response.headers.get('x-ratelimit-remaining')
-                limit = response.headers.get('x-ratelimit-limit')
-                if remaining and limit:
-                    print(f"   [API Quota: {remaining}/{limit} left]")
-                # ---------------------------
-
-                if response.status_code == 429:
-                    print("⏳ Rate Limit Hit. Cooling down for 65s...")
-                    time.sleep(65)
-                    retries -= 1
-                    continue
-                
-                data = response.json()
-                errors = data.get('errors', {})
-                if isinstance(errors, list) and errors: errors = errors[0]
-                
-                if errors:
-                    error_text = str(errors).lower()
-                    if 'rate limit' in error_text or 'requests per minute' in error_text:
-                        print("⏳ API Limit Reached. Cooling down for 65s...")
-                        time.sleep(65)
-                        retries -= 1
-                        continue
-                    else:
-                        print(f"❌ API Error: {errors}")
-                        return None
-                        
-                return data
-            except Exception as e:
-                print(f"❌ Request Exception: {e}")
-                return None
-        return None
-    
-    def fetch_fixtures(self, date_str):
-        url = f"{self.base_url}/games"
-        params = {'date': date_str}
-        data = self._smart_request(url, params)
+    def _smart_request(self, endpoint, params):
+        """Rate-limited GET (adaptive backoff on 429 / quota errors). Returns the payload or None."""
+        return self.client.get(endpoint, params)
+
+    def _league_games(self, data):
         if not data: return []
-        all_games = data.get('response', [])
-        return [g for g in all_games if g['league']['id'] in self.leagues]
+        return [g for g in data.get('response', []) if g['league']['id'] in self.leagues]
+
+    def fetch_fixtures(self, date_str):
+        return self._league_games(self._smart_request("games", {'date': date_str}))
+
+    def fetch_fixtures_many(self, date_strs, budget=None):
+        """Fetches several dates concurrently. Returns one game list per date, in order."""
+        payloads = self.client.fetch_many([("games", {'date': d}) for d in date_strs], budget=budget)
+        return [self._league_games(data) for data in payloads]
 
     def fetch_season_games(self, league_id, season):
-        url = f"{self.base_url}/games"
         params = {'league': league_id, 'season': season}
         print(f"🏒 Fetching Season {season} for League {league_id}...")
-        data = self._smart_request(url, params)
+        data = self._smart_request("games", params)
         if not data: return []
         return data.get('response', [])
 
@@ -127,46 +117,24 @@ class HockeyImporter:
         )
 
     def save_to_db(self, games_data):
-        if not games_data: return
+        """Upserts games. Returns the number saved, or None if the database write failed."""
+        if not games_data: return 0
         conn = self.get_db_connection()
-        if not conn: return
-        cursor = conn.cursor()
+        if not conn: return None
         
         parsed_data = [self.parse_game(g) for g in games_data]
         
-        query = f"""
-            INSERT INTO {self.table} (
-                fixture_id, league_id, season, date, 
-                home_team_id, away_team_id, home_team_name, away_team_name,
-                goals_home, goals_away, 
-                score_p1_home, score_p1_away, score_p2_home, score_p2_away, 
-                score_p3_home, score_p3_away, score_ot_home, score_ot_away, 
-                score_pen_home, score_pen_away, status_short
-            ) VALUES %s
-            ON CONFLICT (fixture_id) DO UPDATE SET
-                goals_home = EXCLUDED.goals_home,
-                goals_away = EXCLUDED.goals_away,
-                score_p1_home = EXCLUDED.score_p1_home,
-                score_p1_away = EXCLUDED.score_p1_away,
-                score_p2_home = EXCLUDED.score_p2_home,
-                score_p2_away = EXCLUDED.score_p2_away,
-                score_p3_home = EXCLUDED.score_p3_home,
-                score_p3_away = EXCLUDED.score_p3_away,
-                score_ot_home = EXCLUDED.score_ot_home,
-                score_ot_away = EXCLUDED.score_ot_away,
-                score_pen_home = EXCLUDED.score_pen_home,
-                score_pen_away = EXCLUDED.score_pen_away,
-                status_short = EXCLUDED.status_short;
-        """
         try:
-            execute_values(cursor, query, parsed_data)
+            bulk_upsert(conn, self.table, GAME_COLUMNS, parsed_data,
+                        conflict_cols=['fixture_id'], update_cols=GAME_UPDATE_COLUMNS, label="hockey games")
             conn.commit()
             print(f"💾 Saved {len(parsed_data)} games to DB.")
+            return len(parsed_data)
         except Exception as e:
             print(f"Database Error: {e}")
             conn.rollback()
+            return None
         finally:
-            cursor.close()
             conn.close()
 
 def run_importer():
@@ -179,10 +147,14 @@ def run_importer():
         ("Upcoming", (datetime.now() + timedelta(days=1)).strftime('%Y-%m-%d'))
     ]
 
-    for label, date_str in dates_to_fetch:
-        print(f"   Fetching {label} for {date_str}...", end=" ")
-        games = importer.fetch_fixtures(date_str)
-        
+    # Results are claimed from the shared daily quota before fixtures
+    with importer.quota.task('hockey.results') as budget:
+        results = importer.fetch_fixtures_many([dates_to_fetch[0][1]], budget)
+    with importer.quota.task('hockey.fixtures') as budget:
+        results += importer.fetch_fixtures_many([date_str for _, date_str in dates_to_fetch[1:]], budget)
+
+    for (label, date_str), games in zip(dates_to_fetch, results):
+        print(f"   {label} for {date_str}...", end=" ")
         if games:
             print(f"✅ Found {len(games)} games.")
             importer.save_to_db(games)
@@ -190,6 +162,8 @@ def run_importer():
             print("⚠️ No games found (or API Limit Hit).")
     
     print("✅ Hockey Import Complete.")
+    importer.quota.print_plan()
+    print_connection_stats("Hockey API")
 
 if __name__ == "__main__":
     run_importer()
\ No newline at end of file
@@ -0,0 +1,215 @@
+import multiprocessing
+import threading
+import time
+import sys
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from sklearn.metrics import log_loss
+from threadpoolctl import threadpool_limits
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+try:
+    from src import config
+    from src import model_registry
+    from src import train_model
+    from src.attributions import tree_attributions
+    from src.training_runner import thread_budget
+except ImportError:
+    import config
+    import model_registry
+    import train_model
+    from attributions import tree_attributions
+    from training_runner import thread_budget
+
+# --- LAYOUT ---
+# Shards are extra artifacts of a registry version: shard_<name>.joblib per league
+# (or cluster) plus shard_routes.joblib ({league_id: shard file}). Leagues without
+# a route are served by the global model.
+
+ROUTES_FILE = "shard_routes.joblib"
+
+
+def shard_of(league_ids, clusters=None):
+    """league_id -> shard name: its cluster in LEAGUE_SHARD_CLUSTERS, else the league alone."""
+    clusters = config.LEAGUE_SHARD_CLUSTERS if clusters is None else clusters
+    lookup = {int(league): name for name, leagues in clusters.items() for league in leagues}
+    return league_ids.astype(int).map(lambda league: lookup.get(league, f"league_{league}"))
+
+
+# --- TRAINING (one process per shard) ---
+
+def fit_shard(name, X_train, y_train, w_train, dates, params, threads):
+    start = time.perf_counter()
+    with threadpool_limits(limits=threads):
+        # The global model's fit: early stopping on the shard's last weeks of training rows
+        model, _ = train_model.fit_model(params, X_train, y_train, w_train, dates)
+    return name, model, time.perf_counter() - start
+
+
+def fit_shards(jobs, workers, threads):
+    """{name: (model, seconds)} of fit_shard(*job) for every job, `workers` processes at a time."""
+    # spawn: the caller has just fit the global model with OpenMP, which does not survive a fork
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+        futures = [pool.submit(fit_shard, *job, threads) for job in jobs]
+        return {name: (model, seconds) for name, model, seconds in (future.result() for future in futures)}
+
+
+def train_shards(X, y, weights, split_idx, params, global_model, dates=None, workers=None, min_rows=None):
+    """
+    Fits one model per league shard on the same time split (and `dates`, for early
+    stopping) as the global model. Shards are picked on the last LEAGUE_SHARD_VALID_WEEKS
+    weeks of the training rows, never on the holdout: candidates and a global reference
+    are fit on the rows before those weeks, and a shard is kept only if it beats the
+    reference on its league's rows of them. Kept shards are then refit on all their
+    training rows; sparse or losing shards fall back to the global model.
+    Returns (artifacts for model_registry.register, routed holdout probabilities).
+    """
+    min_rows = min_rows or config.LEAGUE_SHARD_MIN_ROWS
+    # Inside training_runner the job's thread share is the budget, not every core
+    budget = thread_budget()
+    workers = min(workers or config.LEAGUE_SHARD_WORKERS, budget)
+    threads = max(1, budget // workers)
+    # Too few validation rows in a shard's last weeks: the global model's early-stopped
+    # iteration count (params['max_iter']), never sklearn's random validation split
+    params = {**params, 'early_stopping': False}
+    shards = shard_of(X['league_id']).to_numpy()
+    if dates is None:
+        valid = np.arange(split_idx) >= int(split_idx * 0.85)
+    else:
+        valid = train_model.validation_mask(dates.iloc[:split_idx], config.LEAGUE_SHARD_VALID_WEEKS)
+    fit_rows, valid_rows = np.flatnonzero(~valid), np.flatnonzero(valid)
+
+    candidates, skipped = {}, []
+    for name in pd.unique(shards):
+        fit, check = fit_rows[shards[fit_rows] == name], valid_rows[shards[valid_rows] == name]
+        if len(fit) < min_rows or y.iloc[fit].nunique() < 3 or len(check) < config.LEAGUE_SHARD_MIN_VALID_ROWS:
+            skipped.append(name)
+        else:
+            candidates[name] = fit, check
+
+    def job(name, rows, job_params, early_stopping=True):
+        return (name, X.iloc[rows], y.iloc[rows], weights.iloc[rows],
+                dates.iloc[rows] if early_stopping and dates is not None else None, job_params)
+
+    print(f"🧩 Training {len(candidates)} league shards on {workers} processes ({threads} threads each), "
+          f"picked on the last {valid.sum():,} training rows; {len(skipped)} sparse shards use the global model...")
+    start = time.perf_counter()
+    # The global reference (key None) sees the same rows as the candidates
+    fitted = fit_shards([job(None, fit_rows, params)] + [job(name, fit, params) for name, (fit, _) in candidates.items()],
+                        workers, threads)
+    reference = fitted.pop(None)[0]
+
+    kept = {}
+    for name, (fit, check) in candidates.items():
+        model, seconds = fitted[name]
+        shard_loss = log_loss(y.iloc[check], model.predict_proba(X.iloc[check]), labels=[0, 1, 2])
+        global_loss = log_loss(y.iloc[check], reference.predict_proba(X.iloc[check]), labels=[0, 1, 2])
+        keep = shard_loss < global_loss
+        print(f"   {name}: {len(fit):,} rows, validation log loss {shard_loss:.4f} vs global {global_loss:.4f} "
+              f"({seconds:.1f}s) -> {'shard' if keep else 'global'}")
+        if keep:
+            kept[name] = model.n_iter_
+
+    # Kept shards: all their training rows, with the iterations they were picked with
+    is_train = np.arange(len(X)) < split_idx
+    train_rows = {name: np.flatnonzero((shards == name) & is_train) for name in kept}
+    refits = fit_shards([job(name, train_rows[name], {**params, 'max_iter': n_iter}, early_stopping=False)
+                         for name, n_iter in kept.items()], workers, threads) if kept else {}
+    print(f"⏱️ Shards trained in {time.perf_counter() - start:.1f}s")
+
+    X_test = X.iloc[split_idx:]
+    probs = global_model.predict_proba(X_test)
+    test_shards = shards[split_idx:]
+    artifacts, routes = {}, {}
+    for name, (model, _) in refits.items():
+        filename = f"shard_{name}.joblib"
+        artifacts[filename] = model
+        test = np.flatnonzero(test_shards == name)
+        if len(test):
+            probs[test] = model.predict_proba(X_test.iloc[test])
+        routes.update({int(league): filename for league in X['league_id'].iloc[train_rows[name]].unique()})
+
+    artifacts[ROUTES_FILE] = routes
+    return artifacts, probs
+
+
+def score_current(name, X_test, y_test):
+    """
+    model_registry.score_current plus 'routed_log_loss' when the served version has
+    league shards: what predictions are actually made with, on the same holdout rows.
+    """
+    metrics = model_registry.score_current(name, X_test, y_test)
+    if metrics is None:
+        return None
+    routes = model_registry.load_artifact(name, ROUTES_FILE, version=metrics['version'])
+    if routes:
+        router = ShardRouter(name, model_registry.load_model(name), routes, metrics['version'])
+        loss = log_loss(y_test, router.predict_proba(X_test), labels=[0, 1, 2])
+        metrics['routed_log_loss'] = round(float(loss), 5)
+    return metrics
+
+
+# --- PREDICTION ---
+
+class ShardRouter:
+    """
+    Drop-in for the served model: predict_proba(X) sends each league's rows,
+    in one batch per shard, to its shard model and the rest to the global model.
+    Shard files are loaded on first use and pinned to the version that was
+    current when the router was created.
+    """
+
+    def __init__(self, name, fallback, routes=None, version=None):
+        self.name = name
+        self.fallback = fallback
+        self.routes = routes or {}
+        self.version = version
+        self.models = {}
+        self.lock = threading.Lock()
+
+    def model_for(self, filename):
+        if not filename:
+            return self.fallback
+        with self.lock:
+            if filename not in self.models:
+                self.models[filename] = model_registry.load_artifact(
+                    self.name, filename, version=self.version, mmap=True) or self.fallback
+            return self.models[filename]
+
+    def predict_proba(self, X):
+        if not self.routes:
+            return self.fallback.predict_proba(X)
+        targets = X['league_id'].astype(int).map(self.routes).fillna('').to_numpy()
+        probs = np.empty((len(X), 3))
+        for filename in pd.unique(targets):
+            rows = np.flatnonzero(targets == filename)
+            probs[rows] = self.model_for(filename).predict_proba(X.iloc[rows])
+        return probs
+
+    def attributions(self, X):
+        """Per-class tree attributions, each row explained by the model that predicts it."""
+        if not self.routes:
+            return tree_attributions(self.fallback, X)
+        targets = X['league_id'].astype(int).map(self.routes).fillna('').to_numpy()
+        contributions = np.empty((len(X), X.shape[1], 3))
+        bias = np.empty((len(X), 3))
+        for filename in pd.unique(targets):
+            rows = np.flatnonzero(targets == filename)
+            contributions[rows], bias[rows] = tree_attributions(self.model_for(filename), X.iloc[rows])
+        return contributions, bias
+
+    def predict(self, X):
+        return self.fallback.classes_[self.predict_proba(X).argmax(axis=1)]
+
+
+def load_router(name, legacy_path=None):
+    """Promoted model plus its league shards (if it was trained with them)."""
+    version = model_registry.current_version(name)
+    model = model_registry.load_model(name, legacy_path)
+    routes = model_registry.load_artifact(name, ROUTES_FILE, version=version) if version else None
+    if routes:
+        print(f"🧩 {name}: {len(set(routes.values()))} league shards for {len(routes)} leagues, global model for the rest")
+    return ShardRouter(name, model, routes, version)
@@ -1,6 +1,5 @@
 from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel
-import joblib
 import pandas as pd
 import numpy as np
 from datetime import datetime, date
@@ -8,12 +7,13 @@ import psycopg2
 from psycopg2.extras import RealDictCursor
 from src import config
 from src.predict_utils import stats_cache # Import our new helper
+from src import league_shards
 
 app = FastAPI()
 
 # --- Load Artifacts ---
-model = joblib.load(config.MODEL_PATH)
-shap_explainer = joblib.load(config.SHAP_EXPLAINER_PATH)
+# Promoted registry version, memory-mapped (API workers share one copy); league shards load on first use
+model = league_shards.load_router('football', config.MODEL_PATH)
 
 # --- Database Connection ---
 def get_db_connection():
@@ -0,0 +1,146 @@
+# Local stand-in for the API-Sports endpoints, used to exercise the rate
+# limiter without spending real quota.
+#
+#     python src/mock_api_server.py --port 8765 --per-minute 10 --error-rate 0.05
+#     FOOTBALL_API_URL=http://127.0.0.1:8765 HOCKEY_API_URL=http://127.0.0.1:8765 python src/run_pipeline.py
+
+import argparse
+import json
+import random
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+
+class MockApiServer(ThreadingHTTPServer):
+    """
+    Simulates the API-Sports quota model:
+    - a sliding per-minute window (x-ratelimit-limit / x-ratelimit-remaining)
+    - a daily cap (x-ratelimit-requests-limit / x-ratelimit-requests-remaining)
+    - random 429s, and the HTTP 200 + 'errors' style rate-limit answer
+    - random 503s (transient server errors)
+    """
+    daemon_threads = True
+
+    def __init__(self, address, per_minute=10, per_day=100, error_rate=0.0, server_error_rate=0.0, window=60.0):
+        super().__init__(address, MockHandler)
+        self.per_minute = per_minute
+        self.per_day = per_day
+        self.error_rate = error_rate
+        self.server_error_rate = server_error_rate
+        self.window = window
+        self.calls = []
+        self.day_count = 0
+        self.lock = threading.Lock()
+        self.stats = {'requests': 0, 'served': 0, 'throttled': 0, 'server_errors': 0}
+
+    def admit(self):
+        """Returns (status, minute_remaining, day_remaining) for an incoming request."""
+        with self.lock:
+            now = time.monotonic()
+            self.calls = [t for t in self.calls if now - t < self.window]
+            self.stats['requests'] += 1
+
+            if random.random() < self.server_error_rate:
+                self.stats['server_errors'] += 1
+                return 'unavailable', self.per_minute - len(self.calls), self.per_day - self.day_count
+            if self.day_count >= self.per_day:
+                self.stats['throttled'] += 1
+                return 'daily', 0, 0
+            if len(self.calls) >= self.per_minute:
+                self.stats['throttled'] += 1
+                return 'minute', 0, self.per_day - self.day_count
+            if random.random() < self.error_rate:
+                self.stats['throttled'] += 1
+                return 'random', self.per_minute - len(self.calls), self.per_day - self.day_count
+
+            self.calls.append(now)
+            self.day_count += 1
+            self.stats['served'] += 1
+            return 'ok', self.per_minute - len(self.calls), self.per_day - self.day_count
+
+
+def fake_payload(endpoint, params):
+    """Minimal responses shaped like the real endpoints (empty slates are valid)."""
+    date = params.get('date', datetime.now().strftime('%Y-%m-%d'))
+    if endpoint == 'fixtures':
+        response = [{
+            'fixture': {'id': 900000 + i, 'date': f"{date}T18:00:00+00:00", 'status': {'short': 'NS'}},
+            'league': {'id': 39},
+            'teams': {'home': {'id': 1000 + i, 'name': f"Home {i}"}, 'away': {'id': 2000 + i, 'name': f"Away {i}"}},
+            'goals': {'home': None, 'away': None},
+        } for i in range(3)]
+    else:
+        response = []
+    return {'get': endpoint, 'parameters': params, 'errors': [], 'results': len(response),
+            'paging': {'current': 1, 'total': 1}, 'response': response}
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # Keep-alive, like the real API
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        endpoint = url.path.strip('/')
+        params = {k: v[0] for k, v in parse_qs(url.query).items()}
+        status, minute_left, day_left = self.server.admit()
+
+        headers = {
+            'x-ratelimit-limit': self.server.per_minute,
+            'x-ratelimit-remaining': minute_left,
+            'x-ratelimit-requests-limit': self.server.per_day,
+            'x-ratelimit-requests-remaining': day_left,
+        }
+        if status == 'minute':
+            # API-Sports style: HTTP 200 with a rate-limit message in 'errors'
+            self._reply(200, {'errors': {'rateLimit': 'Too many requests. Your rate limit is '
+                                                      f'{self.server.per_minute} requests per minute.'},
+                              'response': []}, headers)
+        elif status in ('random', 'daily'):
+            self._reply(429, {'message': 'Too many requests'}, headers)
+        elif status == 'unavailable':
+            self._reply(503, {'message': 'Service Unavailable'}, headers)
+        else:
+            self._reply(200, fake_payload(endpoint, params), headers)
+
+    def _reply(self, code, body, headers):
+        payload = json.dumps(body).encode()
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        for key, value in headers.items():
+            self.send_header(key, str(value))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass  # Keep test output readable
+
+
+def start_in_thread(host='127.0.0.1', port=0, **kwargs):
+    """Starts the server on a free port. Returns (server, base_url)."""
+    server = MockApiServer((host, port), **kwargs)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--per-minute', type=int, default=10)
+    parser.add_argument('--per-day', type=int, default=100)
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Share of requests answered with a random 429')
+    parser.add_argument('--server-error-rate', type=float, default=0.0, help='Share of requests answered with a 503')
+    args = parser.parse_args()
+
+    server = MockApiServer(('127.0.0.1', args.port), args.per_minute, args.per_day,
+                           args.error_rate, args.server_error_rate)
+    print(f"🧪 Mock API-Sports server on http://127.0.0.1:{args.port} "
+          f"({args.per_minute}/min, {args.per_day}/day, {args.error_rate:.0%} random 429s, "
+          f"{args.server_error_rate:.0%} 503s)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print(f"\n📊 {server.stats}")
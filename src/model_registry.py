@@ -0,0 +1,241 @@
+import argparse
+import hashlib
+import json
+import shutil
+import sys
+import os
+from datetime import datetime
+import joblib
+import pandas as pd
+from sklearn.metrics import log_loss
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+try:
+    from src import config
+except ImportError:
+    import config
+
+# --- LAYOUT ---
+# models/registry/<name>/<version>/  model.joblib, feature_columns.json, manifest.json (+ extra artifacts)
+# models/registry/<name>/CURRENT     version served to predictions, swapped atomically
+
+MODEL_FILE = "model.joblib"
+FEATURES_FILE = "feature_columns.json"
+MANIFEST_FILE = "manifest.json"
+
+
+def _model_dir(name):
+    return config.MODEL_REGISTRY_DIR / name
+
+
+def _atomic_write(path, text):
+    tmp = f"{path}.tmp{os.getpid()}"
+    with open(tmp, 'w') as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+def _atomic_copy(src, dst):
+    tmp = f"{dst}.tmp{os.getpid()}"
+    shutil.copy2(src, tmp)
+    os.replace(tmp, dst)
+
+
+def features_hash(features):
+    return hashlib.sha256(json.dumps(list(features)).encode('utf-8')).hexdigest()[:16]
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def data_high_water(path, date_col):
+    """What a model was trained on: rows, newest match and content hash of the processed CSV."""
+    dates = pd.read_csv(path, usecols=[date_col])[date_col]
+    return {
+        'path': str(path), 'rows': len(dates),
+        'max_date': str(pd.to_datetime(dates, format='mixed').max()),
+        'sha256': file_sha256(path),
+    }
+
+
+# --- WRITE ---
+
+def register(name, model, features, params, metrics, data, train_seconds, artifacts=None, training=None):
+    """
+    Writes a new immutable version. Everything lands in a temporary directory
+    first and is renamed into place, so a crash never leaves a half-written model.
+    `artifacts` maps file names to objects dumped next to the model (e.g. an explainer),
+    `training` records how it was fit (full refit or incremental, and from which version).
+    Returns the version id.
+    """
+    version = f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{data.get('sha256', '')[:8]}"
+    while (_model_dir(name) / version).exists():
+        version += "b"
+    final = _model_dir(name) / version
+    tmp = _model_dir(name) / f".{version}.tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+
+    # Uncompressed dumps: required for joblib memory-mapped loading
+    joblib.dump(model, tmp / MODEL_FILE)
+    with open(tmp / FEATURES_FILE, 'w') as f:
+        json.dump(list(features), f)
+    for filename, obj in (artifacts or {}).items():
+        joblib.dump(obj, tmp / filename)
+
+    manifest = {
+        'name': name, 'version': version,
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'features': list(features), 'features_hash': features_hash(features),
+        'data': data,
+        'params': {k: v for k, v in params.items()},
+        'metrics': metrics,
+        'train_seconds': round(train_seconds, 2),
+        'artifacts': sorted(artifacts or {}),
+        'training': training or {'mode': 'full'},
+    }
+    with open(tmp / MANIFEST_FILE, 'w') as f:
+        json.dump(manifest, f, indent=2, default=str)
+    os.rename(tmp, final)
+    print(f"🗃️ Registered {name} model {version}")
+    return version
+
+
+# --- READ ---
+
+def current_version(name):
+    try:
+        with open(_model_dir(name) / "CURRENT", 'r') as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+
+def load_manifest(name, version):
+    with open(_model_dir(name) / version / MANIFEST_FILE, 'r') as f:
+        return json.load(f)
+
+
+def list_versions(name):
+    root = _model_dir(name)
+    if not root.exists():
+        return []
+    return sorted(p.name for p in root.iterdir() if p.is_dir() and not p.name.startswith('.'))
+
+
+def load_model(name, legacy_path=None, mmap=True):
+    """
+    The promoted model, memory-mapped read-only: processes loading the same
+    version share its arrays through the page cache instead of each holding a copy.
+    Falls back to the legacy pickle while the registry is empty.
+    """
+    version = current_version(name)
+    if version is None:
+        return joblib.load(legacy_path) if legacy_path else None
+    return joblib.load(_model_dir(name) / version / MODEL_FILE, mmap_mode='r' if mmap else None)
+
+
+def load_artifact(name, filename, legacy_path=None, version=None, mmap=False):
+    version = version or current_version(name)
+    path = _model_dir(name) / version / filename if version else legacy_path
+    if not path or not os.path.exists(path):
+        return None
+    return joblib.load(path, mmap_mode='r' if mmap else None)
+
+
+# --- PROMOTION ---
+
+def score_current(name, X_test, y_test):
+    """
+    {'log_loss', 'version'} of the served model on a new model's holdout rows, so the
+    promotion gate compares both on the same window. None when there is no current
+    model or it was trained on other features.
+    """
+    version = current_version(name)
+    if version is None or load_manifest(name, version)['features'] != list(X_test.columns):
+        return None
+    model = load_model(name)
+    loss = log_loss(y_test, model.predict_proba(X_test), labels=[0, 1, 2])
+    return {'log_loss': round(float(loss), 5), 'version': version}
+
+
+def served_log_loss(metrics):
+    """Holdout log loss of what predictions use: the league-shard router when there is one."""
+    metrics = metrics or {}
+    return metrics.get('routed_log_loss', metrics.get('log_loss'))
+
+
+def passes_gate(new_metrics, current_metrics, tolerance=None):
+    """A new model may not lose more than `tolerance` (relative) holdout log loss, shards included."""
+    tolerance = config.MODEL_PROMOTION_TOLERANCE if tolerance is None else tolerance
+    new_loss, old_loss = served_log_loss(new_metrics), served_log_loss(current_metrics)
+    if new_loss is None:
+        return False, "no holdout log loss"
+    if old_loss is None:
+        return True, "no comparable current model"
+    if new_loss <= old_loss * (1 + tolerance):
+        return True, f"log loss {new_loss:.4f} vs current {old_loss:.4f}"
+    return False, f"log loss {new_loss:.4f} worse than current {old_loss:.4f} (+{tolerance:.0%} allowed)"
+
+
+def promote(name, version, force=False, legacy=None, current_metrics=None):
+    """
+    Points CURRENT at `version` with one atomic rename, if its metrics pass the gate.
+    `current_metrics` are the served model's metrics on the new version's holdout rows
+    (league_shards.score_current); without them the stored ones are used, measured on an older window.
+    `legacy` maps registry files to the old fixed paths (models/no_draw_model.pkl, ...)
+    that are refreshed for scripts still reading them. Returns True when promoted.
+    """
+    manifest = load_manifest(name, version)
+    current = current_version(name)
+    if current_metrics is None and current:
+        current_metrics = load_manifest(name, current)['metrics']
+    ok, reason = passes_gate(manifest['metrics'], current_metrics)
+    if not ok and not force:
+        print(f"⛔ {name} {version} NOT promoted: {reason}. Current stays {current}.")
+        return False
+
+    for filename, path in (legacy or {}).items():
+        src = _model_dir(name) / version / filename
+        if src.exists():
+            _atomic_copy(src, path)
+    _atomic_write(_model_dir(name) / "CURRENT", version)
+    print(f"🚀 Promoted {name} {version} ({reason}{', forced' if force and not ok else ''})")
+    prune(name)
+    return True
+
+
+def prune(name, keep=None):
+    """Keeps the newest versions (and always the current one)."""
+    keep = keep or config.MODEL_REGISTRY_KEEP
+    current = current_version(name)
+    for version in list_versions(name)[:-keep]:
+        if version != current:
+            shutil.rmtree(_model_dir(name) / version, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('name', choices=['football', 'hockey'])
+    parser.add_argument('--promote', metavar='VERSION', help="Point CURRENT at this version (e.g. rollback)")
+    parser.add_argument('--force', action='store_true', help="Skip the metrics gate")
+    args = parser.parse_args()
+
+    if args.promote:
+        legacy = {MODEL_FILE: config.MODEL_PATH if args.name == 'football' else config.HOCKEY_MODEL_PATH}
+        promote(args.name, args.promote, force=args.force, legacy=legacy)
+
+    current = current_version(args.name)
+    print(f"\n🗃️ {args.name} models in {_model_dir(args.name)}:")
+    for version in list_versions(args.name):
+        m = load_manifest(args.name, version)
+        metrics = ' '.join(f"{k}={v}" for k, v in m['metrics'].items())
+        print(f"   {'*' if version == current else ' '} {version}  {metrics}  "
+              f"rows={m['data'].get('rows')} train={m['train_seconds']}s "
+              f"({m.get('training', {}).get('mode', 'full')}, iterations={m['params'].get('max_iter')})")
\ No newline at end of file
@@ -0,0 +1,128 @@
+from datetime import date
+import sys
+import os
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+try:
+    from src import config
+    from src.bulk_writer import bulk_upsert
+except ImportError:
+    import config
+    from bulk_writer import bulk_upsert
+
+# --- ODDS HISTORY ---
+# Append-only: every (fixture, bookmaker, market, selection, API update time)
+# is stored once. Partitioned by kickoff month so a fixture's whole price
+# history lives in one partition.
+
+HISTORY_COLUMNS = [
+    'fixture_id', 'league_id', 'kickoff', 'kickoff_date',
+    'bookmaker_id', 'market_id', 'selection', 'odd', 'source_updated_at'
+]
+DEDUP_KEY = ['fixture_id', 'bookmaker_id', 'market_id', 'selection', 'source_updated_at', 'kickoff_date']
+
+
+def create_odds_history(cursor):
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {config.ODDS_HISTORY_TABLE} (
+            fixture_id INT NOT NULL, league_id INT,
+            kickoff TIMESTAMPTZ, kickoff_date DATE NOT NULL,
+            bookmaker_id INT NOT NULL, market_id INT NOT NULL,
+            selection VARCHAR(40) NOT NULL, odd NUMERIC(8, 3) NOT NULL,
+            source_updated_at TIMESTAMPTZ NOT NULL,
+            fetched_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+            PRIMARY KEY ({', '.join(DEDUP_KEY)})
+        ) PARTITION BY RANGE (kickoff_date);""")
+
+
+def ensure_partitions(cursor, kickoff_dates):
+    """One partition per kickoff month, created on first use."""
+    months = {(d.year, d.month) for d in kickoff_dates}
+    for year, month in sorted(months):
+        start = date(year, month, 1)
+        end = date(year + (month == 12), month % 12 + 1, 1)
+        cursor.execute(f"""
+            CREATE TABLE IF NOT EXISTS {config.ODDS_HISTORY_TABLE}_{year}_{month:02d}
+            PARTITION OF {config.ODDS_HISTORY_TABLE} FOR VALUES FROM ('{start}') TO ('{end}');""")
+
+
+def create_line_movement_view(cursor):
+    """Opening / latest / closing price per line, refreshed after every ingest."""
+    cursor.execute(f"""
+        CREATE MATERIALIZED VIEW IF NOT EXISTS {config.ODDS_MOVEMENT_VIEW} AS
+        SELECT fixture_id, bookmaker_id, market_id, selection,
+               MIN(kickoff) AS kickoff,
+               (array_agg(odd ORDER BY source_updated_at ASC))[1] AS opening_odd,
+               (array_agg(odd ORDER BY source_updated_at DESC))[1] AS latest_odd,
+               (array_agg(odd ORDER BY source_updated_at DESC)
+                    FILTER (WHERE source_updated_at <= kickoff))[1] AS closing_odd,
+               MIN(source_updated_at) AS opened_at,
+               MAX(source_updated_at) AS latest_at,
+               COUNT(*) AS updates
+        FROM {config.ODDS_HISTORY_TABLE}
+        GROUP BY fixture_id, bookmaker_id, market_id, selection;""")
+    # Unique index: required by REFRESH ... CONCURRENTLY and used by predict_smart lookups
+    cursor.execute(f"""
+        CREATE UNIQUE INDEX IF NOT EXISTS {config.ODDS_MOVEMENT_VIEW}_key
+        ON {config.ODDS_MOVEMENT_VIEW} (fixture_id, bookmaker_id, market_id, selection);""")
+
+
+def parse_odds_response(items, bookmakers=None, markets=None):
+    """Flattens /odds items into HISTORY_COLUMNS tuples (one per selection price)."""
+    rows = []
+    for item in items:
+        fixture = item.get('fixture', {})
+        kickoff = fixture.get('date')
+        updated = item.get('update')
+        if not fixture.get('id') or not kickoff or not updated:
+            continue
+        kickoff_date = date.fromisoformat(kickoff[:10])
+        for bookmaker in item.get('bookmakers', []):
+            if bookmakers and bookmaker['id'] not in bookmakers:
+                continue
+            for bet in bookmaker.get('bets', []):
+                if markets and bet['id'] not in markets:
+                    continue
+                for value in bet.get('values', []):
+                    try:
+                        odd = float(value['odd'])
+                    except (KeyError, TypeError, ValueError):
+                        continue
+                    rows.append((
+                        fixture['id'], item.get('league', {}).get('id'), kickoff, kickoff_date,
+                        bookmaker['id'], bet['id'], str(value.get('value'))[:40], odd, updated
+                    ))
+    return rows
+
+
+def append_odds_history(conn, rows):
+    """
+    Bulk-appends rows (COPY + one merge); duplicates of a known price update are ignored.
+    Returns the number of rows actually added.
+    """
+    if not rows:
+        return 0
+    cursor = conn.cursor()
+    create_odds_history(cursor)
+    ensure_partitions(cursor, {r[3] for r in rows})
+    cursor.close()
+
+    result = bulk_upsert(conn, config.ODDS_HISTORY_TABLE, HISTORY_COLUMNS, rows,
+                         conflict_cols=DEDUP_KEY, label="odds history")
+    conn.commit()
+    return result['written']
+
+
+def refresh_line_movement(conn):
+    cursor = conn.cursor()
+    cursor.execute(
+        "SELECT 1 FROM pg_matviews WHERE matviewname = %s", (config.ODDS_MOVEMENT_VIEW,)
+    )
+    exists = cursor.fetchone() is not None
+    create_line_movement_view(cursor)
+    if exists:
+        # Readers (predict_smart) are not blocked during the refresh
+        cursor.execute(f"REFRESH MATERIALIZED VIEW CONCURRENTLY {config.ODDS_MOVEMENT_VIEW};")
+    conn.commit()
+    cursor.close()
\ No newline at end of file
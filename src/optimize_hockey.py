@@ -1,29 +1,19 @@
-import optuna
-import pandas as pd
+import argparse
 import numpy as np
-import joblib
-import json
 import sys
 import os
-from sklearn.ensemble import HistGradientBoostingClassifier
-from sklearn.model_selection import TimeSeriesSplit, cross_val_score
 
 # Add project root to path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 try:
     from src import config
+    from src.tuning import run_study, recorded_iterations
 except ImportError:
     import config
+    from tuning import run_study, recorded_iterations
 
-def objective(trial):
-    # 1. Load HOCKEY Data
-    try:
-        df = pd.read_csv(config.HOCKEY_PROCESSED_PATH)
-    except Exception as e:
-        print(f"❌ Error loading data: {e}")
-        return -9999
-
-    # 2. Ensure Target (Regulation Result)
+def ensure_target(df):
+    # Regulation Result
     if 'target' not in df.columns:
         conditions = [
             (df['reg_goals_home'] < df['reg_goals_away']),
@@ -31,22 +21,18 @@ def objective(trial):
             (df['reg_goals_home'] > df['reg_goals_away'])
         ]
         df['target'] = np.select(conditions, [0, 1, 2])
-    
-    # 3. Handle Date
-    if 'date' in df.columns:
-        df['date'] = pd.to_datetime(df['date'], format='mixed')
-        df = df.sort_values('date')
-
-    features = config.MODEL_FEATURES
-    X = df[features].fillna(0)
-    y = df['target'].astype(int)
-
-    categorical_indices = [i for i, col in enumerate(features) if col == 'league_id']
-
-    # 4. Suggest Hyperparameters (Tuned for Hockey's Higher Variance)
-    param = {
-        'learning_rate': trial.suggest_float('learning_rate', 0.01, 0.2, log=True),
-        'max_iter': trial.suggest_int('max_iter', 100, 1000),
+    return df
+
+def suggest_params(trial):
+    # Tuned for Hockey's Higher Variance
+    categorical_indices = [i for i, col in enumerate(config.MODEL_FEATURES) if col == 'league_id']
+    learning_rate = trial.suggest_float('learning_rate', 0.01, 0.2, log=True)
+    # Iterations picked by the trainer's time-ordered early stopping (searched until one is recorded)
+    max_iter = recorded_iterations('hockey', learning_rate)
+    return {
+        'learning_rate': learning_rate,
+        'max_iter': max_iter or trial.suggest_int('max_iter', 100, 1000),
+        'early_stopping': 'auto' if max_iter is None else False,
         'max_depth': trial.suggest_int('max_depth', 3, 25), # Hockey might need deeper trees
         'min_samples_leaf': trial.suggest_int('min_samples_leaf', 20, 200),
         'l2_regularization': trial.suggest_float('l2_regularization', 0.0, 10.0),
@@ -57,33 +43,16 @@ def objective(trial):
         'scoring': 'neg_log_loss'
     }
 
-    # 5. Cross Validation
-    tscv = TimeSeriesSplit(n_splits=3)
-    model = HistGradientBoostingClassifier(**param)
-    
-    try:
-        scores = cross_val_score(model, X, y, cv=tscv, scoring='neg_log_loss', n_jobs=-1)
-        return scores.mean()
-    except Exception as e:
-        return -9999
-
-if __name__ == "__main__":
+def optimize_hockey(n_trials=None, workers=None):
     print("🧠 Starting HOCKEY Hyperparameter Optimization...")
     print(f"📂 Data: {config.HOCKEY_PROCESSED_PATH}")
-    
-    study = optuna.create_study(direction="maximize") 
-    study.optimize(objective, n_trials=50) # 50 trials is usually enough for a quick tune
+    # Best params saved specifically for Hockey
+    return run_study("hockey", config.HOCKEY_PROCESSED_PATH, ensure_target, 'date', suggest_params,
+                     config.MODELS_DIR / "best_params_hockey.json", n_trials=n_trials, workers=workers)
 
-    print("\n🏆 Best Hockey Trial:")
-    trial = study.best_trial
-    print(f"   Value: {trial.value}")
-    print("   Params: ")
-    for key, value in trial.params.items():
-        print(f"    {key}: {value}")
-
-    # Save Best Params specifically for Hockey
-    best_params_path = config.MODELS_DIR / "best_params_hockey.json"
-    with open(best_params_path, "w") as f:
-        json.dump(trial.params, f, indent=4)
-    
-    print(f"\n✅ Optimization Complete. Saved to {best_params_path}")
\ No newline at end of file
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--trials', type=int, help="Total trials of the study (stored trials count)")
+    parser.add_argument('--workers', type=int)
+    args = parser.parse_args()
+    optimize_hockey(args.trials, args.workers)
@@ -0,0 +1,360 @@
+import argparse
+import importlib
+import json
+import sys
+import os
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from contextlib import nullcontext
+from datetime import datetime
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+try:
+    from src import config
+    from src import step_cache
+    from src import training_runner
+    from src.profiler import StageProfiler, count_csv_rows, latest_predictions_rows
+except ImportError:
+    import config
+    import step_cache
+    import training_runner
+    from profiler import StageProfiler, count_csv_rows, latest_predictions_rows
+
+# --- PIPELINE DEFINITION ---
+# Each sport is a chain of stages: (stage, module, function).
+# A stage depends on the previous stage of the SAME sport only, so the
+# football and hockey branches are independent and can run side by side.
+SPORT_STAGES = {
+    'football': [
+        ('import', 'importer', 'run_importer'),
+        ('preprocess', 'preprocess', 'feature_engineering_main'),
+        ('train', 'train_model', 'train_model'),
+        ('predict', 'predict_smart', 'smart_daily_predict'),
+    ],
+    'hockey': [
+        ('import', 'importer_hockey', 'run_importer'),
+        ('preprocess', 'preprocess_hockey', 'feature_engineering_hockey'),
+        ('train', 'train_model_hockey', 'train_model_hockey'),
+        ('predict', 'predict_smart_hockey', 'smart_daily_predict_hockey'),
+    ],
+}
+
+# Row counts recorded per step when profiling
+ROW_COUNTERS = {
+    'football.import': lambda: step_cache.football_high_water()['matches'],
+    'football.preprocess': lambda: count_csv_rows(config.PROCESSED_DATA_PATH),
+    'football.train': lambda: count_csv_rows(config.PROCESSED_DATA_PATH),
+    'football.predict': lambda: latest_predictions_rows("predictions_"),
+    'hockey.import': lambda: step_cache.hockey_high_water()['games'],
+    'hockey.preprocess': lambda: count_csv_rows(config.HOCKEY_PROCESSED_PATH),
+    'hockey.train': lambda: count_csv_rows(config.HOCKEY_PROCESSED_PATH),
+    'hockey.predict': lambda: latest_predictions_rows("hockey_predictions_"),
+}
+
+
+def load_module(name):
+    """Imports a pipeline module as 'src.<name>', falling back to the bare name (script mode)."""
+    try:
+        return importlib.import_module(f"src.{name}")
+    except ModuleNotFoundError as e:
+        if e.name not in ('src', f"src.{name}"):
+            raise
+        return importlib.import_module(name)
+
+
+def build_dag(sports, train_cpus=None):
+    """
+    Returns {step_name: step} for the requested sports.
+    step = {'sport', 'stage', 'module', 'func', 'deps', 'cpus'}
+    """
+    train_cpus = train_cpus or config.PIPELINE_TRAIN_CPUS
+    dag = {}
+    for sport in sports:
+        if sport not in SPORT_STAGES:
+            raise ValueError(f"Unknown sport '{sport}'. Choose from {list(SPORT_STAGES)}")
+        previous = None
+        for stage, module, func in SPORT_STAGES[sport]:
+            name = f"{sport}.{stage}"
+            dag[name] = {
+                'sport': sport,
+                'stage': stage,
+                'module': module,
+                'func': func,
+                'deps': [previous] if previous else [],
+                # Training is the only stage that saturates cores (OpenMP)
+                'cpus': train_cpus if stage == 'train' else 1,
+            }
+            previous = name
+    return dag
+
+
+# --- STEP EXECUTION ---
+
+def check_cache(name):
+    """
+    Returns (fingerprint, inputs, manifest) for a cacheable step.
+    manifest is None on a miss. Any error (e.g. DB down) is treated as a miss.
+    """
+    try:
+        fp, inputs = step_cache.fingerprint(name)
+        return fp, inputs, step_cache.lookup(name, fp)
+    except Exception as e:
+        print(f"⚠️ [{name}] Cache check failed ({e}). Step will run.")
+        return None, None, None
+
+
+def run_step(name, step, retries, retry_delay, use_cache=True, profiler=None):
+    """Runs one step with retries. Never raises: returns its result record."""
+    stage_ctx = profiler.stage(name) if profiler else nullcontext()
+    with stage_ctx:
+        # Profiled steps stay in-process so their CPU time and memory are measured
+        record = _execute_step(name, step, retries, retry_delay, use_cache, isolate=profiler is None)
+
+    if profiler:
+        try:
+            profiler.stages[name]['rows'] = ROW_COUNTERS[name]()
+        except Exception as e:
+            profiler.stages[name]['rows'] = None
+            print(f"⚠️ [{name}] Could not count rows: {e}")
+        record['profile'] = profiler.stages[name]
+    return record
+
+
+def _execute_step(name, step, retries, retry_delay, use_cache, isolate=True):
+    record = {
+        'status': 'failed',
+        'attempts': 0,
+        'cached': False,
+        'started_at': datetime.now().isoformat(timespec='seconds'),
+        'wall_time': 0.0,
+        'error': None,
+    }
+    start = time.perf_counter()
+
+    # 1. Skip the step if identical inputs were already built
+    fp = inputs = None
+    if use_cache and step_cache.is_cacheable(name):
+        fp, inputs, manifest = check_cache(name)
+        record['fingerprint'] = fp
+        if manifest:
+            restored = step_cache.restore(name, fp, manifest)
+            record.update(status='success', cached=True)
+            record['wall_time'] = round(time.perf_counter() - start, 3)
+            record['finished_at'] = datetime.now().isoformat(timespec='seconds')
+            registered = f", version {manifest['version']} already trained on them" if step['stage'] == 'train' else ''
+            print(f"♻️  [{name}] Inputs unchanged ({fp}){registered}. Skipped"
+                  f"{f', restored {restored} artifact(s)' if restored else ''}.")
+            return record
+
+    # 2. Run with retries
+    for attempt in range(1, retries + 2):
+        record['attempts'] = attempt
+        print(f"\n>>> [{name}] Attempt {attempt}/{retries + 1}")
+        try:
+            if isolate and step['stage'] == 'train':
+                # Own process capped at the step's cores: side-by-side trainings split the machine
+                training_runner.run_isolated(step['module'], step['func'], step['cpus'])
+            else:
+                module = load_module(step['module'])
+                getattr(module, step['func'])()
+            record['status'] = 'success'
+            record['error'] = None
+            break
+        except Exception as e:
+            record['error'] = f"{type(e).__name__}: {e}"
+            print(f"❌ [{name}] Failed: {record['error']}")
+            traceback.print_exc()
+            if attempt <= retries:
+                delay = retry_delay * attempt
+                print(f"⏳ [{name}] Retrying in {delay}s...")
+                time.sleep(delay)
+
+    # 3. Cache the outputs for the next run
+    if record['status'] == 'success' and fp:
+        try:
+            step_cache.store(name, fp, inputs)
+        except Exception as e:
+            print(f"⚠️ [{name}] Could not cache outputs: {e}")
+
+    record['wall_time'] = round(time.perf_counter() - start, 3)
+    record['finished_at'] = datetime.now().isoformat(timespec='seconds')
+    if record['status'] == 'success':
+        print(f"✅ [{name}] Done in {record['wall_time']}s")
+    return record
+
+
+def plan_run(sports=None, use_cache=True):
+    """
+    Dry run: reports which steps would run and why, without executing anything.
+    Fingerprints are evaluated against the CURRENT inputs, so a preprocess step
+    reported as cached will still run if today's import adds new rows.
+    """
+    sports = sports or list(SPORT_STAGES)
+    dag = build_dag(sports)
+    plan = {}
+
+    for name, step in dag.items():  # Insertion order is topological per sport
+        upstream = [d for d in step['deps'] if plan[d]['action'] == 'run' and dag[d]['stage'] != 'import']
+        if not step_cache.is_cacheable(name):
+            plan[name] = {'action': 'run', 'reason': 'not cacheable (depends on API/clock)'}
+        elif not use_cache:
+            plan[name] = {'action': 'run', 'reason': 'cache disabled'}
+        elif upstream:
+            plan[name] = {'action': 'run', 'reason': f"{upstream[0]} will produce new inputs"}
+        else:
+            fp, _, manifest = check_cache(name)
+            if manifest:
+                hit = f"version {manifest['version']} already trained on" if step['stage'] == 'train' else "cache hit"
+                plan[name] = {'action': 'skip', 'reason': f"{hit} ({fp})"}
+            else:
+                plan[name] = {'action': 'run', 'reason': f"inputs changed ({fp or 'unknown'})"}
+
+    print("\n🧪 DRY RUN (nothing will be executed)")
+    print("=" * 60)
+    for name, p in plan.items():
+        print(f"   {name:<22} {p['action'].upper():<5} {p['reason']}")
+    return plan
+
+
+def run_pipeline(sports=None, max_workers=None, cpu_budget=None, retries=None,
+                 retry_delay=None, train_cpus=None, use_cache=True, save_summary=True,
+                 profile=False, pstats=False):
+    """
+    Executes the DAG. A step starts once all its dependencies succeeded and
+    there is room in the worker/CPU budget. If a step fails (after retries),
+    its dependents are skipped but independent branches keep running.
+    Cacheable steps whose inputs did not change are skipped (see step_cache).
+
+    profile=True records wall/CPU time, peak memory and row counts per step
+    (pstats=True also dumps cProfile stats) and appends a line to PROFILE_LOG_PATH.
+    Profiled runs are serial so each step's memory peak is attributable.
+
+    Returns the run summary dict (also written to PIPELINE_RUNS_DIR).
+    """
+    sports = sports or list(SPORT_STAGES)
+    max_workers = max_workers or config.PIPELINE_MAX_WORKERS
+    cpu_budget = cpu_budget or config.PIPELINE_CPU_BUDGET
+    retries = config.PIPELINE_STEP_RETRIES if retries is None else retries
+    retry_delay = config.PIPELINE_RETRY_DELAY if retry_delay is None else retry_delay
+
+    dag = build_dag(sports, train_cpus=min(train_cpus or config.PIPELINE_TRAIN_CPUS, cpu_budget))
+    run_id = datetime.now().strftime('%Y%m%d_%H%M%S')
+    start = time.perf_counter()
+
+    profiler = None
+    if profile or pstats:
+        profiler = StageProfiler(run_id, pstats=pstats)
+        max_workers = 1
+
+    print(f"\n⚡ STARTING PIPELINE RUN {run_id}: {', '.join(sports)}")
+    print(f"   Budget: {max_workers} workers / {cpu_budget} CPUs | Retries: {retries}")
+    if profiler:
+        print("   ⏱️  Profiling ON (steps run one at a time)")
+    print("=" * 60)
+
+    results = {}
+    pending = dict(dag)
+    running = {}  # future -> step name
+    cpus_in_use = 0
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        while pending or running:
+            # 1. Skip steps whose dependencies failed
+            for name, step in list(pending.items()):
+                failed = [d for d in step['deps'] if d in results and results[d]['status'] != 'success']
+                if failed:
+                    results[name] = {'status': 'skipped', 'attempts': 0, 'cached': False, 'wall_time': 0.0,
+                                     'error': f"Dependency failed: {', '.join(failed)}"}
+                    print(f"⏭️  [{name}] Skipped ({results[name]['error']})")
+                    del pending[name]
+
+            # 2. Launch ready steps while the budget allows
+            for name, step in list(pending.items()):
+                if len(running) >= max_workers:
+                    break
+                if not all(results.get(d, {}).get('status') == 'success' for d in step['deps']):
+                    continue
+                # Always allow one step, even if it alone exceeds the budget
+                if running and cpus_in_use + step['cpus'] > cpu_budget:
+                    continue
+                future = pool.submit(run_step, name, step, retries, retry_delay, use_cache, profiler)
+                running[future] = name
+                cpus_in_use += step['cpus']
+                del pending[name]
+
+            if not running:
+                break
+
+            # 3. Wait for any step to finish
+            done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                cpus_in_use -= dag[name]['cpus']
+                results[name] = future.result()
+
+    elapsed = round(time.perf_counter() - start, 3)
+    statuses = [r['status'] for r in results.values()]
+    summary = {
+        'run_id': run_id,
+        'sports': sports,
+        'status': 'success' if all(s == 'success' for s in statuses) else 'failed',
+        'wall_time': elapsed,
+        'max_workers': max_workers,
+        'cpu_budget': cpu_budget,
+        'steps': {name: dict(results[name], deps=dag[name]['deps'], cpus=dag[name]['cpus'])
+                  for name in dag},
+    }
+
+    print("=" * 60)
+    for name in dag:
+        r = results[name]
+        status = 'cached' if r.get('cached') else r['status']
+        print(f"   {name:<22} {status:<8} {r['wall_time']:>8}s  (attempts: {r['attempts']})")
+    icon = "✅" if summary['status'] == 'success' else "⚠️"
+    print(f"{icon} PIPELINE {summary['status'].upper()} in {elapsed} seconds.")
+
+    if profiler:
+        profiler.report()
+        profiler.append_log(extra={'sports': sports, 'status': summary['status'], 'wall_time': elapsed})
+
+    if save_summary:
+        config.PIPELINE_RUNS_DIR.mkdir(exist_ok=True)
+        summary_path = config.PIPELINE_RUNS_DIR / f"run_{run_id}.json"
+        with open(summary_path, 'w') as f:
+            json.dump(summary, f, indent=2)
+        print(f"💾 Run summary saved to {summary_path}")
+
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Multi-sport daily pipeline (DAG orchestrator)")
+    parser.add_argument('--sports', nargs='+', default=list(SPORT_STAGES), choices=list(SPORT_STAGES))
+    parser.add_argument('--workers', type=int, default=None, help="Max concurrent steps")
+    parser.add_argument('--cpu-budget', type=int, default=None, help="Cores the run may occupy")
+    parser.add_argument('--train-cpus', type=int, default=None, help="Cores claimed by each training step")
+    parser.add_argument('--retries', type=int, default=None, help="Extra attempts per failed step")
+    parser.add_argument('--retry-delay', type=float, default=None, help="Base seconds between attempts")
+    parser.add_argument('--no-cache', action='store_true', help="Run every step even if inputs are unchanged")
+    parser.add_argument('--dry-run', action='store_true', help="Only report which steps would run")
+    parser.add_argument('--profile', action='store_true', help="Record time/memory/rows per step (serial run)")
+    parser.add_argument('--pstats', action='store_true', help="Also dump cProfile stats per step")
+    parser.add_argument('--json', action='store_true', help="Print the run summary as JSON")
+    args = parser.parse_args()
+
+    if args.dry_run:
+        plan = plan_run(sports=args.sports, use_cache=not args.no_cache)
+        if args.json:
+            print(json.dumps(plan, indent=2))
+        sys.exit(0)
+
+    result = run_pipeline(
+        sports=args.sports, max_workers=args.workers, cpu_budget=args.cpu_budget,
+        retries=args.retries, retry_delay=args.retry_delay, train_cpus=args.train_cpus,
+        use_cache=not args.no_cache, profile=args.profile, pstats=args.pstats
+    )
+    if args.json:
+        print(json.dumps(result, indent=2))
+    sys.exit(0 if result['status'] == 'success' else 1)
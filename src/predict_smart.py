@@ -1,6 +1,8 @@
 import pandas as pd
 import numpy as np
-import joblib
+import argparse
+import hashlib
+import json
 import sys
 import os
 from datetime import datetime
@@ -11,51 +13,68 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 try:
     from src import config
     from src.stats_engine import StatsEngine
+    from src.batch_scoring import build_team_snapshot, build_feature_matrix
+    from src import model_registry
+    from src import league_shards
+    from src import attributions
 except ImportError:
     import config
     from stats_engine import StatsEngine
+    from batch_scoring import build_team_snapshot, build_feature_matrix
+    import model_registry
+    import league_shards
+    import attributions
 
 # --- CONSTANTS ---
 DRAW_THRESHOLD = 0.25       
 CONFIDENCE_THRESHOLD = 0.60 
 ELO_DIFF_MIN = 25           
 
+# Card column order (readable)
+CARD_COLUMNS = [
+    'Match', 'Tip', 'Conf',
+    'H_Win%', 'D_Win%', 'A_Win%',
+    'H_GF', 'A_GF', 'H_GA', 'A_GA',
+    'Odds', 'Move', 'Value', 'Injuries', 'Status'
+]
+
 def get_db_engine():
     url = f"postgresql://{config.DB_USER}:{config.DB_PASS}@{config.DB_HOST}:{config.DB_PORT}/{config.DB_NAME}"
     return create_engine(url)
 
 def get_latest_team_stats(df_history):
     print("🕵️  Building Team Stats Knowledge Base...")
-    stats_db = {}
-    df_history['match_date'] = pd.to_datetime(df_history['match_date'], format='mixed', errors='coerce')
-    df_history = df_history.dropna(subset=['match_date']).sort_values('match_date')
-    
-    for _, row in df_history.iterrows():
-        delta = StatsEngine.calculate_elo_change(
-            elo_home=row['home_elo'], elo_away=row['away_elo'],
-            home_goals=row['home_goals'], away_goals=row['away_goals']
-        )
-        stats_db[row['home_team']] = {
-            'elo': row['home_elo'] + delta, 
-            'last_date': row['match_date'],
-            'rolling_goals': row['home_rolling_goals'],
-            'rolling_conceded': row['home_rolling_conceded'],
-            'btts_rate': row['home_btts_rate'],
-            'form': row['home_form']
-        }
-        stats_db[row['away_team']] = {
-            'elo': row['away_elo'] - delta,
-            'last_date': row['match_date'],
-            'rolling_goals': row['away_rolling_goals'],
-            'rolling_conceded': row['away_rolling_conceded'],
-            'btts_rate': row['away_btts_rate'],
-            'form': row['away_form']
-        }
-    return stats_db
+    # Vectorized replay of the history (shared with hockey)
+    return build_team_snapshot(df_history, 'football')
 
 def load_upcoming_fixtures():
+    """
+    Upcoming fixtures with the primary bookmaker's latest 1X2 and opening prices,
+    read from the odds line-movement view in one query.
+    Falls back to the legacy odds snapshot while the view does not exist yet.
+    """
     engine = get_db_engine()
-    query = """
+    query = text(f"""
+        SELECT COALESCE(f.api_fixture_id, f.id) as fixture_id, f.match_date, f.home_team, f.away_team, f.league_id,
+               lm.home_odd, lm.draw_odd, lm.away_odd,
+               lm.home_open_odd, lm.draw_open_odd, lm.away_open_odd
+        FROM fixtures f
+        LEFT JOIN (
+            SELECT fixture_id,
+                   MAX(latest_odd) FILTER (WHERE selection = 'Home') AS home_odd,
+                   MAX(latest_odd) FILTER (WHERE selection = 'Draw') AS draw_odd,
+                   MAX(latest_odd) FILTER (WHERE selection = 'Away') AS away_odd,
+                   MAX(opening_odd) FILTER (WHERE selection = 'Home') AS home_open_odd,
+                   MAX(opening_odd) FILTER (WHERE selection = 'Draw') AS draw_open_odd,
+                   MAX(opening_odd) FILTER (WHERE selection = 'Away') AS away_open_odd
+            FROM {config.ODDS_MOVEMENT_VIEW}
+            WHERE bookmaker_id = :bookmaker AND market_id = 1
+            GROUP BY fixture_id
+        ) lm ON lm.fixture_id = f.api_fixture_id
+        WHERE f.match_date >= CURRENT_DATE 
+        ORDER BY f.match_date ASC
+    """)
+    legacy_query = """
         SELECT f.id as fixture_id, f.match_date, f.home_team, f.away_team, f.league_id,
                o.home_odd, o.draw_odd, o.away_odd
         FROM fixtures f
@@ -64,67 +83,113 @@ def load_upcoming_fixtures():
         ORDER BY f.match_date ASC
     """
     try:
-        df = pd.read_sql(query, engine)
+        df = pd.read_sql(query, engine, params={'bookmaker': config.ODDS_PRIMARY_BOOKMAKER})
+        for col in ('home_odd', 'draw_odd', 'away_odd', 'home_open_odd', 'draw_open_odd', 'away_open_odd'):
+            df[col] = df[col].astype(float)
+        return df
+    except Exception as e:
+        print(f"ℹ️ Odds line movement unavailable ({type(e).__name__}), using the odds snapshot.")
+    try:
+        df = pd.read_sql(legacy_query, engine)
         return df
     except Exception as e:
         print(f"⚠️ Could not load fixtures: {e}")
         return pd.DataFrame()
 
-def check_injuries(fixture_id, engine):
-    query = text("SELECT count(*) FROM injuries WHERE fixture_id = :fid")
+def line_movement(open_odd, odd):
+    """'📉 -8.0%' when the price shortened since opening (market agrees), '📈 +x%' when it drifted."""
+    if pd.isnull(open_odd) or pd.isnull(odd) or open_odd <= 0:
+        return ""
+    move = (odd / open_odd - 1) * 100
+    if abs(move) < 0.05:
+        return ""
+    return f"{'📉' if move < 0 else '📈'} {move:+.1f}%"
+
+def load_injury_counts(engine):
+    """Injury rows per fixture in ONE query (instead of one query per fixture)."""
+    query = text("SELECT fixture_id, count(*) FROM injuries GROUP BY fixture_id")
     try:
         with engine.connect() as conn:
-            result = conn.execute(query, {"fid": fixture_id}).fetchone()
-        return result[0] if result else 0
-    except:
-        return 0
+            return {fid: count for fid, count in conn.execute(query).fetchall()}
+    except Exception as e:
+        print(f"⚠️ Could not load injuries: {e}")
+        return {}
 
 def prepare_features(df_fixtures, stats_db):
-    feature_rows = []
-    valid_indices = []
-
-    for index, row in df_fixtures.iterrows():
-        home = row['home_team']
-        away = row['away_team']
-        try: date = pd.to_datetime(row['match_date'])
-        except: continue
-        
-        if home not in stats_db or away not in stats_db: continue 
-            
-        h_stats = stats_db[home]
-        a_stats = stats_db[away]
-        
-        h_rest = max(0, min((date - h_stats['last_date']).days, 30))
-        a_rest = max(0, min((date - a_stats['last_date']).days, 30))
-        
-        features = {
-            'league_id': row['league_id'],
-            'home_elo': h_stats['elo'],
-            'away_elo': a_stats['elo'],
-            'elo_diff': h_stats['elo'] - a_stats['elo'],
-            'home_rolling_goals': h_stats['rolling_goals'],
-            'away_rolling_goals': a_stats['rolling_goals'],
-            'home_rolling_conceded': h_stats['rolling_conceded'],
-            'away_rolling_conceded': a_stats['rolling_conceded'],
-            'form_diff': h_stats['form'] - a_stats['form'],
-            'defensive_diff': h_stats['rolling_conceded'] - a_stats['rolling_conceded'],
-            'home_btts_rate': h_stats['btts_rate'],
-            'away_btts_rate': a_stats['btts_rate'],
-            'btts_interaction': h_stats['btts_rate'] * a_stats['btts_rate'],
-            'home_rest_days': h_rest,
-            'away_rest_days': a_rest,
-            'rest_diff': h_rest - a_rest
-        }
-        row_data = [features.get(col, 0) for col in config.MODEL_FEATURES]
-        feature_rows.append(row_data)
-        valid_indices.append(index)
-
-    if not feature_rows: return pd.DataFrame(), pd.DataFrame()
-    return pd.DataFrame(feature_rows, columns=config.MODEL_FEATURES), df_fixtures.loc[valid_indices]
+    X_pred, df_valid = build_feature_matrix(df_fixtures, stats_db, 'football')
+    if X_pred.empty: return pd.DataFrame(), pd.DataFrame()
+    return X_pred, df_valid
+
+def sniper_pick(fixture_probs, draw_odd=None):
+    """
+    The sniper filters (shared with src/backtest.py).
+    Returns the tip ('HOME' / 'AWAY'), or None if the fixture is filtered out.
+    """
+    p_away, p_draw, p_home = fixture_probs
+
+    # --- FILTERS ---
+    if p_draw > DRAW_THRESHOLD: return None
+    if p_draw > p_home and p_draw > p_away: return None
+    if p_home < CONFIDENCE_THRESHOLD and p_away < CONFIDENCE_THRESHOLD: return None
+
+    # --- SNIPER LOGIC ---
+    if pd.notnull(draw_odd):
+        market_draw_prob = StatsEngine.calculate_implied_prob(draw_odd)
+        if market_draw_prob > config.SNIPER_THRESHOLDS['MAX_DRAW_ODDS_IMPLIED']: return None
+    return "HOME" if p_home > p_away else "AWAY"
+
+def score_fixture(fixture_probs, row, x_row, injuries):
+    """
+    Applies the sniper filters to one fixture.
+    Returns its card row, or None if the fixture is filtered out.
+    """
+    if sniper_pick(fixture_probs, row['draw_odd']) is None: return None
+    p_away, p_draw, p_home = fixture_probs
+
+    value_msg = ""
+    if pd.notnull(row['draw_odd']):
+        my_prob = p_home if p_home > p_away else p_away
+        implied_win = StatsEngine.calculate_implied_prob(row['home_odd'] if p_home > p_away else row['away_odd'])
+        edge = my_prob - implied_win
+        if edge > 0.05: value_msg = f"💎 +{round(edge*100,1)}%"
+
+    # --- EXTRACT STATS ---
+    h_avg_goals = x_row['home_rolling_goals']
+    a_avg_goals = x_row['away_rolling_goals']
+    h_conceded = x_row['home_rolling_conceded']
+    a_conceded = x_row['away_rolling_conceded']
+
+    injury_msg = f"🚑 {injuries}" if injuries > 0 else ""
+
+    # Poisson Check
+    pois_draw = StatsEngine.calculate_poisson_draw_chance((h_avg_goals + a_conceded)/2, (a_avg_goals + h_conceded)/2)
+    status = "✅ BET"
+    if pois_draw > 0.25: status = "⚠️ RISK (Poisson)"
+
+    return {
+        'Match': f"{row['home_team']} vs {row['away_team']}",
+        'Tip': "HOME" if p_home > p_away else "AWAY",
+        'Conf': round(max(p_home, p_away) * 100, 1),
+        # NEW COLUMNS START HERE
+        'H_Win%': round(p_home * 100, 0),
+        'D_Win%': round(p_draw * 100, 0),
+        'A_Win%': round(p_away * 100, 0),
+        'H_GF': round(h_avg_goals, 2), # Home Goals For
+        'A_GF': round(a_avg_goals, 2), # Away Goals For
+        'H_GA': round(h_conceded, 2),  # Home Goals Against
+        'A_GA': round(a_conceded, 2),  # Away Goals Against
+        # END NEW COLUMNS
+        'Odds': row['home_odd'] if p_home > p_away else row['away_odd'],
+        'Move': line_movement(row.get('home_open_odd' if p_home > p_away else 'away_open_odd'),
+                              row['home_odd'] if p_home > p_away else row['away_odd']),
+        'Value': value_msg,
+        'Injuries': injury_msg,
+        'Status': status
+    }
 
 def smart_daily_predict():
     print("🔮 Starting Professional Daily Prediction (Sniper Mode)...")
-    model = joblib.load(config.MODEL_PATH)
+    model = league_shards.load_router('football', config.MODEL_PATH)
     df_history = pd.read_csv(config.PROCESSED_DATA_PATH)
     stats_db = get_latest_team_stats(df_history)
     
@@ -137,82 +202,188 @@ def smart_daily_predict():
     if X_pred.empty: return
 
     probs = model.predict_proba(X_pred)
-    engine = get_db_engine()
+    # Why: per-class feature attributions of every fixture, one vectorized pass over the trees
+    attribution_table, contributions = attributions.explain(
+        model, X_pred, df_valid[['fixture_id', 'match_date', 'home_team', 'away_team']])
+    factors = {tip: attributions.top_factors(contributions, list(X_pred.columns), k)
+               for tip, k in (('AWAY', 0), ('HOME', 2))}
+    injury_counts = load_injury_counts(get_db_engine())
     predictions = []
     
     for i, (index, row) in enumerate(df_valid.iterrows()):
-        p_away, p_draw, p_home = probs[i]
-        
-        # --- FILTERS ---
-        if p_draw > DRAW_THRESHOLD: continue
-        if p_draw > p_home and p_draw > p_away: continue
-        if p_home < CONFIDENCE_THRESHOLD and p_away < CONFIDENCE_THRESHOLD: continue
-        
-        # --- SNIPER LOGIC ---
-        market_draw_prob = 0.0
-        value_msg = ""
-        if pd.notnull(row['draw_odd']):
-            market_draw_prob = StatsEngine.calculate_implied_prob(row['draw_odd'])
-            if market_draw_prob > config.SNIPER_THRESHOLDS['MAX_DRAW_ODDS_IMPLIED']: continue
-            
-            my_prob = p_home if p_home > p_away else p_away
-            implied_win = StatsEngine.calculate_implied_prob(row['home_odd'] if p_home > p_away else row['away_odd'])
-            edge = my_prob - implied_win
-            if edge > 0.05: value_msg = f"💎 +{round(edge*100,1)}%"
-
-        # --- EXTRACT STATS ---
-        h_avg_goals = X_pred.iloc[i]['home_rolling_goals']
-        a_avg_goals = X_pred.iloc[i]['away_rolling_goals']
-        h_conceded = X_pred.iloc[i]['home_rolling_conceded']
-        a_conceded = X_pred.iloc[i]['away_rolling_conceded']
-        
-        injuries = check_injuries(row['fixture_id'], engine)
-        injury_msg = f"🚑 {injuries}" if injuries > 0 else ""
-        
-        # Poisson Check
-        pois_draw = StatsEngine.calculate_poisson_draw_chance((h_avg_goals + a_conceded)/2, (a_avg_goals + h_conceded)/2)
-        status = "✅ BET"
-        if pois_draw > 0.25: status = "⚠️ RISK (Poisson)"
-
-        predictions.append({
-            'Match': f"{row['home_team']} vs {row['away_team']}",
-            'Tip': "HOME" if p_home > p_away else "AWAY",
-            'Conf': round(max(p_home, p_away) * 100, 1),
-            # NEW COLUMNS START HERE
-            'H_Win%': round(p_home * 100, 0),
-            'D_Win%': round(p_draw * 100, 0),
-            'A_Win%': round(p_away * 100, 0),
-            'H_GF': round(h_avg_goals, 2), # Home Goals For
-            'A_GF': round(a_avg_goals, 2), # Away Goals For
-            'H_GA': round(h_conceded, 2),  # Home Goals Against
-            'A_GA': round(a_conceded, 2),  # Away Goals Against
-            # END NEW COLUMNS
-            'Odds': row['home_odd'] if p_home > p_away else row['away_odd'],
-            'Value': value_msg,
-            'Injuries': injury_msg,
-            'Status': status
-        })
+        prediction = score_fixture(probs[i], row, X_pred.iloc[i], injury_counts.get(row['fixture_id'], 0))
+        if prediction:
+            prediction['Factors'] = factors[prediction['Tip']][i]
+            predictions.append(prediction)
 
     if not predictions:
         print("No matches passed the filters today.")
     else:
         df_pred = pd.DataFrame(predictions).sort_values('Conf', ascending=False)
         
-        # Define readable column order
-        cols = [
-            'Match', 'Tip', 'Conf', 
-            'H_Win%', 'D_Win%', 'A_Win%', 
-            'H_GF', 'A_GF', 'H_GA', 'A_GA', 
-            'Odds', 'Value', 'Injuries', 'Status'
-        ]
-        
         print("\n🎯 TOP SNIPER TARGETS:")
         # to_string renders nicely in terminal without index
-        print(df_pred[cols].to_string(index=False))
+        print(df_pred[CARD_COLUMNS].to_string(index=False))
         
         filename = f"predictions_{datetime.now().strftime('%Y-%m-%d')}.csv"
         df_pred.to_csv(config.BASE_DIR / filename, index=False)
         print(f"\n💾 Saved to {filename}")
 
+    filename = f"attributions_{datetime.now().strftime('%Y-%m-%d')}.csv"
+    attribution_table.to_csv(config.BASE_DIR / filename, index=False)
+    print(f"💾 Attributions (logits, per class) saved to {filename}")
+
+# --- INCREMENTAL MODE ---
+# Intraday refreshes (new odds / injuries) only recompute fixtures whose inputs
+# changed and only re-emit fixtures whose displayed numbers changed.
+
+def fixture_key(row):
+    """Stable fixture identity (fixtures.id is regenerated by every import)."""
+    return f"{pd.Timestamp(row['match_date']).isoformat()}|{row['home_team']}|{row['away_team']}"
+
+def model_version():
+    version = model_registry.current_version('football')
+    if version:
+        return version
+    stat = os.stat(config.MODEL_PATH)
+    return f"{stat.st_mtime_ns}-{stat.st_size}"
+
+def fixture_input_hash(x_row, row, injuries, version):
+    """Everything the card depends on: team state features, odds, injuries and the model."""
+    payload = [version, int(injuries)]
+    payload += [None if pd.isnull(row[c]) else float(row[c]) for c in ('home_odd', 'draw_odd', 'away_odd')]
+    payload += [round(float(v), 6) for v in x_row.to_numpy()]
+    return hashlib.sha256(json.dumps(payload).encode('utf-8')).hexdigest()[:16]
+
+def emitted_numbers(prediction, fixture_probs, row):
+    """What downstream consumers see for a fixture (rounded like the card)."""
+    p_away, p_draw, p_home = fixture_probs
+    odds = [None if pd.isnull(row[c]) else float(row[c]) for c in ('home_odd', 'draw_odd', 'away_odd')]
+    return {
+        'H_Win%': round(float(p_home) * 100, 0),
+        'D_Win%': round(float(p_draw) * 100, 0),
+        'A_Win%': round(float(p_away) * 100, 0),
+        'Odds_1X2': odds,
+        'Tip': prediction['Tip'] if prediction else None,
+        'Conf': float(prediction['Conf']) if prediction else None,
+        'Value': prediction['Value'] if prediction else "",
+        'Injuries': prediction['Injuries'] if prediction else "",
+        'Status': prediction['Status'] if prediction else "FILTERED",
+    }
+
+def load_prediction_state():
+    if not config.PREDICTION_STATE_PATH.exists():
+        return {'fixtures': {}}
+    with open(config.PREDICTION_STATE_PATH, 'r') as f:
+        return json.load(f)
+
+def save_prediction_state(state):
+    config.PREDICTION_STATE_PATH.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = f"{config.PREDICTION_STATE_PATH}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp_path, config.PREDICTION_STATE_PATH)
+
+def incremental_daily_predict():
+    print("🔁 Starting Incremental Prediction (Delta Mode)...")
+    model = league_shards.load_router('football', config.MODEL_PATH)
+    version = model_version()
+    df_history = pd.read_csv(config.PROCESSED_DATA_PATH)
+    stats_db = get_latest_team_stats(df_history)
+
+    df_fixtures = load_upcoming_fixtures()
+    if df_fixtures.empty:
+        print("⚠️ No upcoming fixtures found.")
+        return
+
+    X_pred, df_valid = prepare_features(df_fixtures, stats_db)
+    if X_pred.empty: return
+
+    injury_counts = load_injury_counts(get_db_engine())
+    state = load_prediction_state()
+    previous = state.get('fixtures', {})
+    now = datetime.now().isoformat(timespec='seconds')
+
+    # 1. Which fixtures have new inputs?
+    keys, hashes, changed = [], [], []
+    for i, (index, row) in enumerate(df_valid.iterrows()):
+        key = fixture_key(row)
+        h = fixture_input_hash(X_pred.iloc[i], row, injury_counts.get(row['fixture_id'], 0), version)
+        keys.append(key)
+        hashes.append(h)
+        if previous.get(key, {}).get('input_hash') != h:
+            changed.append(i)
+
+    print(f"   {len(keys)} fixtures | {len(changed)} with new inputs | {len(keys) - len(changed)} unchanged")
+
+    # 2. Recompute only those fixtures
+    deltas = []
+    fixtures_state = {k: previous[k] for k in keys if k in previous}
+    if changed:
+        probs = model.predict_proba(X_pred.iloc[changed])
+        # Attributions of the recomputed fixtures only, like the full run does for all of them
+        attribution_table, contributions = attributions.explain(
+            model, X_pred.iloc[changed], df_valid.iloc[changed][['fixture_id', 'match_date', 'home_team', 'away_team']])
+        factors = {tip: attributions.top_factors(contributions, list(X_pred.columns), k)
+                   for tip, k in (('AWAY', 0), ('HOME', 2))}
+        for j, (fixture_probs, i) in enumerate(zip(probs, changed)):
+            row = df_valid.iloc[i]
+            prediction = score_fixture(fixture_probs, row, X_pred.iloc[i], injury_counts.get(row['fixture_id'], 0))
+            emitted = emitted_numbers(prediction, fixture_probs, row)
+            old = previous.get(keys[i], {}).get('emitted')
+            fixtures_state[keys[i]] = {'input_hash': hashes[i], 'emitted': emitted, 'updated_at': now}
+
+            # 3. Only numbers that actually moved are re-emitted
+            if old == emitted:
+                continue
+            deltas.append({
+                'Change': "NEW" if old is None else "UPDATED",
+                'Match': f"{row['home_team']} vs {row['away_team']}",
+                'Kickoff': row['match_date'],
+                'Tip': emitted['Tip'],
+                'Conf': emitted['Conf'],
+                'Prev_Conf': old['Conf'] if old else None,
+                'H_Win%': emitted['H_Win%'],
+                'D_Win%': emitted['D_Win%'],
+                'A_Win%': emitted['A_Win%'],
+                'Odds_1X2': emitted['Odds_1X2'],
+                'Prev_Odds_1X2': old['Odds_1X2'] if old else None,
+                'Value': emitted['Value'],
+                'Injuries': emitted['Injuries'],
+                'Status': emitted['Status'],
+                'Prev_Status': old['Status'] if old else None,
+                'Factors': factors[emitted['Tip']][j] if emitted['Tip'] else "",
+            })
+
+    dropped = len(set(previous) - set(keys))
+    save_prediction_state({'updated_at': now, 'model_version': version, 'fixtures': fixtures_state})
+    if dropped:
+        print(f"   🧹 {dropped} fixtures no longer upcoming (removed from state).")
+
+    if not deltas:
+        print("✅ No prediction moved since the last run.")
+        return pd.DataFrame()
+
+    df_delta = pd.DataFrame(deltas)
+    print("\n📣 CHANGED PREDICTIONS:")
+    print(df_delta.drop(columns=['Kickoff', 'Factors']).to_string(index=False))
+
+    stamp = datetime.now().strftime('%Y-%m-%d_%H%M%S')
+    filename = f"predictions_delta_{stamp}.csv"
+    df_delta.to_csv(config.BASE_DIR / filename, index=False)
+    print(f"\n💾 Saved {len(df_delta)} changed fixtures to {filename}")
+
+    filename = f"attributions_delta_{stamp}.csv"
+    attribution_table.to_csv(config.BASE_DIR / filename, index=False)
+    print(f"💾 Attributions (logits, per class) of the {len(changed)} recomputed fixtures saved to {filename}")
+    return df_delta
+
 if __name__ == "__main__":
-    smart_daily_predict()
\ No newline at end of file
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--incremental', action='store_true',
+                        help="Recompute only fixtures with new inputs and emit a delta report")
+    args = parser.parse_args()
+    if args.incremental:
+        incremental_daily_predict()
+    else:
+        smart_daily_predict()
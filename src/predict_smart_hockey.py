@@ -1,6 +1,5 @@
 import pandas as pd
 import numpy as np
-import joblib
 import sys
 import os
 from datetime import datetime
@@ -9,10 +8,16 @@ from sqlalchemy import create_engine
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 try:
     from src import config
-    from src.stats_engine import StatsEngine
+    from src.batch_scoring import build_team_snapshot, build_feature_matrix, implied_prob, value_labels
+    from src import model_registry
+    from src import league_shards
+    from src import attributions
 except ImportError:
     import config
-    from stats_engine import StatsEngine
+    from batch_scoring import build_team_snapshot, build_feature_matrix, implied_prob, value_labels
+    import model_registry
+    import league_shards
+    import attributions
 
 def get_db_engine():
     url = f"postgresql://{config.DB_USER}:{config.DB_PASS}@{config.DB_HOST}:{config.DB_PORT}/{config.DB_NAME}"
@@ -20,39 +25,8 @@ def get_db_engine():
 
 def get_latest_hockey_stats(df_history):
     print("🕵️  Building Hockey Stats Knowledge Base...")
-    stats_db = {}
-    df_history['date'] = pd.to_datetime(df_history['date'], format='mixed', errors='coerce')
-    df_history = df_history.dropna(subset=['date']).sort_values('date')
-    
-    for _, row in df_history.iterrows():
-        # Update Elo based on REGULATION performance (Now using correct reg_goals columns)
-        # Using 30 as K-factor
-        delta = StatsEngine.calculate_elo_change(
-            elo_home=row['home_elo'], elo_away=row['away_elo'],
-            home_goals=row['reg_goals_home'], away_goals=row['reg_goals_away']
-        )
-        
-        # Get Rolling Stats (Safely)
-        h_goals = row.get('home_rolling_goals', 0)
-        h_conceded = row.get('home_rolling_conceded', 0)
-        a_goals = row.get('away_rolling_goals', 0)
-        a_conceded = row.get('away_rolling_conceded', 0)
-
-        stats_db[row['home_team_name']] = {
-            'elo': row['home_elo'] + delta,
-            'last_date': row['date'],
-            'rolling_goals': h_goals,
-            'rolling_conceded': h_conceded,
-            'btts_rate': row.get('home_btts_rate', 0)
-        }
-        stats_db[row['away_team_name']] = {
-            'elo': row['away_elo'] - delta,
-            'last_date': row['date'],
-            'rolling_goals': a_goals,
-            'rolling_conceded': a_conceded,
-            'btts_rate': row.get('away_btts_rate', 0)
-        }
-    return stats_db
+    # Vectorized replay of the history (Elo deltas use REGULATION goals, K=30)
+    return build_team_snapshot(df_history, 'hockey')
 
 def load_hockey_fixtures():
     engine = get_db_engine()
@@ -72,15 +46,51 @@ def load_hockey_fixtures():
         print(f"⚠️ Could not load fixtures: {e}")
         return pd.DataFrame()
 
+def build_hockey_predictions(probs, df_valid):
+    """
+    1X2 tip, confidence and value for every fixture at once.
+    probs columns: [Away, Draw, Home]
+    """
+    p_away, p_draw, p_home = probs[:, 0], probs[:, 1], probs[:, 2]
+
+    # --- IMPROVED TIP LOGIC (1X2) ---
+    # Highest probability outcome; ties fall back to DRAW
+    home_best = (p_home > p_away) & (p_home > p_draw)
+    away_best = (p_away > p_home) & (p_away > p_draw)
+    choices = [home_best, away_best]
+
+    tip = np.select(choices, ["HOME", "AWAY"], "DRAW")
+    conf = np.select(choices, [p_home, p_away], p_draw)
+    odds = np.select(
+        choices,
+        [df_valid['home_odd'].to_numpy(dtype=float), df_valid['away_odd'].to_numpy(dtype=float)],
+        df_valid['draw_odd'].to_numpy(dtype=float)
+    )
+
+    # Value Calculation (no odds -> no edge)
+    edge = conf - implied_prob(odds)
+
+    return pd.DataFrame({
+        'Match': (df_valid['home_team_name'] + " vs " + df_valid['away_team_name']).to_numpy(),
+        'Tip': tip,
+        'Conf': np.round(conf * 100, 1),
+        'H_Win%': np.round(p_home * 100, 0),
+        'D_Win%': np.round(p_draw * 100, 0),
+        'A_Win%': np.round(p_away * 100, 0),
+        'Odds': odds,
+        'Value': value_labels(edge),
+        'Status': "✅ PREDICTED"
+    })
+
 def smart_daily_predict_hockey():
     print("🔮 Starting Hockey Prediction (Sniper Mode)...")
     
-    if not config.HOCKEY_MODEL_PATH.exists():
+    if not config.HOCKEY_MODEL_PATH.exists() and not model_registry.current_version('hockey'):
         print("❌ Model not found. Train first.")
         return
 
     try:
-        model = joblib.load(config.HOCKEY_MODEL_PATH)
+        model = league_shards.load_router('hockey', config.HOCKEY_MODEL_PATH)
         df_history = pd.read_csv(config.HOCKEY_PROCESSED_PATH)
         stats_db = get_latest_hockey_stats(df_history)
         
@@ -89,108 +99,32 @@ def smart_daily_predict_hockey():
             print("⚠️ No upcoming matches found.")
             return
 
-        # Build Features
-        feature_rows = []
-        valid_indices = []
-
-        for index, row in df_fixtures.iterrows():
-            home = row['home_team_name']
-            away = row['away_team_name']
-            
-            if home not in stats_db or away not in stats_db: 
-                continue
-                
-            h_stats = stats_db[home]
-            a_stats = stats_db[away]
-            
-            try: date = pd.to_datetime(row['date'])
-            except: continue
-
-            h_rest = max(0, min((date - h_stats['last_date']).days, 7))
-            a_rest = max(0, min((date - a_stats['last_date']).days, 7))
-
-            features = {
-                'league_id': row['league_id'],
-                'home_elo': h_stats['elo'],
-                'away_elo': a_stats['elo'],
-                'elo_diff': h_stats['elo'] - a_stats['elo'],
-                'home_rolling_goals': h_stats['rolling_goals'],
-                'away_rolling_goals': a_stats['rolling_goals'],
-                'home_rolling_conceded': h_stats['rolling_conceded'],
-                'away_rolling_conceded': a_stats['rolling_conceded'],
-                'form_diff': 0, # Placeholder
-                'defensive_diff': h_stats['rolling_conceded'] - a_stats['rolling_conceded'],
-                'home_btts_rate': h_stats['btts_rate'],
-                'away_btts_rate': a_stats['btts_rate'],
-                'btts_interaction': h_stats['btts_rate'] * a_stats['btts_rate'],
-                'home_rest_days': h_rest,
-                'away_rest_days': a_rest,
-                'rest_diff': h_rest - a_rest
-            }
-            
-            row_data = [features.get(col, 0) for col in config.MODEL_FEATURES]
-            feature_rows.append(row_data)
-            valid_indices.append(index)
-
-        if not feature_rows:
+        # Build Features (all fixtures in one pass)
+        X_pred, df_valid = build_feature_matrix(df_fixtures, stats_db, 'hockey')
+        if X_pred.empty:
             print("❌ No valid team stats found for upcoming games.")
             return
 
-        X_pred = pd.DataFrame(feature_rows, columns=config.MODEL_FEATURES)
-        df_valid = df_fixtures.loc[valid_indices]
-        
         # Predict
         probs = model.predict_proba(X_pred)
-        
-        predictions = []
-        
-        for i, (index, row) in enumerate(df_valid.iterrows()):
-            # Unpack Probabilities: [Away, Draw, Home]
-            p_away, p_draw, p_home = probs[i]
-            
-            # --- IMPROVED TIP LOGIC (1X2) ---
-            # Determine the highest probability outcome
-            if p_home > p_away and p_home > p_draw:
-                tip = "HOME"
-                conf = p_home
-                odd_col = 'home_odd'
-            elif p_away > p_home and p_away > p_draw:
-                tip = "AWAY"
-                conf = p_away
-                odd_col = 'away_odd'
-            else:
-                tip = "DRAW"
-                conf = p_draw
-                odd_col = 'draw_odd'
-            
-            # Value Calculation
-            value_msg = ""
-            if pd.notnull(row[odd_col]):
-                try:
-                    implied_prob = StatsEngine.calculate_implied_prob(row[odd_col])
-                    edge = conf - implied_prob
-                    if edge > 0.05: value_msg = f"💎 +{round(edge*100,1)}%"
-                except:
-                    pass
-
-            predictions.append({
-                'Match': f"{row['home_team_name']} vs {row['away_team_name']}",
-                'Tip': tip,
-                'Conf': round(conf * 100, 1),
-                'H_Win%': round(p_home * 100, 0),
-                'D_Win%': round(p_draw * 100, 0),
-                'A_Win%': round(p_away * 100, 0),
-                'Odds': row[odd_col],
-                'Value': value_msg,
-                'Status': "✅ PREDICTED"
-            })
+        df_pred = build_hockey_predictions(probs, df_valid)
+
+        # Why: per-class attributions of every game; the tip's strongest drivers go on the card
+        attribution_table, contributions = attributions.explain(
+            model, X_pred, df_valid[['fixture_id', 'date', 'home_team_name', 'away_team_name']])
+        factors = {tip: attributions.top_factors(contributions, list(X_pred.columns), k)
+                   for tip, k in (('AWAY', 0), ('DRAW', 1), ('HOME', 2))}
+        df_pred['Factors'] = [factors[tip][i] for i, tip in enumerate(df_pred['Tip'])]
+        attribution_path = config.BASE_DIR / f"hockey_attributions_{datetime.now().strftime('%Y-%m-%d')}.csv"
+        attribution_table.to_csv(attribution_path, index=False)
+        print(f"💾 Attributions (logits, per class) saved to {attribution_path}")
 
         # Output
-        if not predictions:
+        if df_pred.empty:
             print("⚠️ Predictions list is empty.")
             return
 
-        df_pred = pd.DataFrame(predictions).sort_values('Conf', ascending=False)
+        df_pred = df_pred.sort_values('Conf', ascending=False)
         cols = [
             'Match', 'Tip', 'Conf', 
             'H_Win%', 'D_Win%', 'A_Win%', 
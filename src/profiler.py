@@ -0,0 +1,149 @@
+import cProfile
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+try:
+    from src import config
+except ImportError:
+    import config
+
+# psutil is optional: without it RSS is read from /proc (Linux) or skipped.
+try:
+    import psutil
+    PSUTIL_AVAILABLE = True
+except ImportError:
+    PSUTIL_AVAILABLE = False
+
+
+def current_rss_mb():
+    """Resident memory of this process in MB (None if it cannot be measured)."""
+    if PSUTIL_AVAILABLE:
+        return psutil.Process().memory_info().rss / 1e6
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf('SC_PAGE_SIZE') / 1e6
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+class RssSampler(threading.Thread):
+    """Polls RSS in the background to capture the peak of a single stage."""
+
+    def __init__(self, interval=0.05):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.peak = current_rss_mb()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.is_set():
+            rss = current_rss_mb()
+            if rss is not None and (self.peak is None or rss > self.peak):
+                self.peak = rss
+            self._stop_event.wait(self.interval)
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+        return self.peak
+
+
+class StageProfiler:
+    """
+    Records wall time, CPU time, peak memory (tracemalloc + RSS) and row counts
+    per pipeline stage. Stages must run one at a time for memory to be attributable.
+    """
+
+    def __init__(self, run_id, pstats=False, pstats_dir=None):
+        self.run_id = run_id
+        self.pstats = pstats
+        self.pstats_dir = pstats_dir or config.PROFILE_PSTATS_DIR
+        self.stages = {}
+
+    @contextmanager
+    def stage(self, name):
+        record = {}
+        self.stages[name] = record
+
+        started_tracing = not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+
+        sampler = RssSampler()
+        rss_start = current_rss_mb()
+        sampler.start()
+
+        profile = cProfile.Profile() if self.pstats else None
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        if profile:
+            profile.enable()
+        try:
+            yield record
+        finally:
+            if profile:
+                profile.disable()
+            record['wall_time'] = round(time.perf_counter() - wall_start, 3)
+            record['cpu_time'] = round(time.process_time() - cpu_start, 3)
+            record['py_peak_mb'] = round(tracemalloc.get_traced_memory()[1] / 1e6, 2)
+            rss_peak = sampler.stop()
+            rss_end = current_rss_mb()
+            record['rss_start_mb'] = round(rss_start, 1) if rss_start is not None else None
+            record['rss_end_mb'] = round(rss_end, 1) if rss_end is not None else None
+            record['rss_peak_mb'] = round(rss_peak, 1) if rss_peak is not None else None
+            if started_tracing:
+                tracemalloc.stop()
+            if profile:
+                self.pstats_dir.mkdir(parents=True, exist_ok=True)
+                pstats_path = self.pstats_dir / f"{self.run_id}_{name}.pstats"
+                profile.dump_stats(pstats_path)
+                record['pstats'] = str(pstats_path)
+
+    def report(self):
+        print("\n⏱️  STAGE PROFILE:")
+        print(f"   {'stage':<22} {'wall s':>8} {'cpu s':>8} {'py peak MB':>11} {'rss peak MB':>12} {'rows':>9}")
+        for name, r in self.stages.items():
+            rows = r.get('rows')
+            print(f"   {name:<22} {r.get('wall_time', 0):>8} {r.get('cpu_time', 0):>8} "
+                  f"{r.get('py_peak_mb', 0):>11} {str(r.get('rss_peak_mb')):>12} {str(rows):>9}")
+
+    def append_log(self, extra=None, log_path=None):
+        """Appends one JSON line per run so performance can be trended over weeks."""
+        log_path = log_path or config.PROFILE_LOG_PATH
+        log_path.parent.mkdir(parents=True, exist_ok=True)
+        line = {
+            'run_id': self.run_id,
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'stages': self.stages,
+        }
+        line.update(extra or {})
+        with open(log_path, 'a') as f:
+            f.write(json.dumps(line, default=str) + "\n")
+        print(f"💾 Profile appended to {log_path}")
+
+
+# --- ROW COUNTS ---
+
+def count_csv_rows(path):
+    """Data rows in a CSV (newline count minus header), None if missing."""
+    if not os.path.exists(path):
+        return None
+    with open(path, 'rb') as f:
+        lines = sum(chunk.count(b'\n') for chunk in iter(lambda: f.read(1 << 20), b''))
+    return max(lines - 1, 0)
+
+
+def latest_predictions_rows(prefix):
+    """Rows in today's predictions file for a sport."""
+    filename = f"{prefix}{datetime.now().strftime('%Y-%m-%d')}.csv"
+    return count_csv_rows(config.BASE_DIR / filename)
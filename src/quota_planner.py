@@ -0,0 +1,273 @@
+import contextvars
+import hashlib
+import json
+import math
+import threading
+import sys
+import os
+from datetime import datetime, timezone
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+try:
+    from src import config
+except ImportError:
+    import config
+
+# --- TASKS ---
+# Everything the daily imports spend quota on, most valuable first (lower = earlier).
+# 'estimate' is used until the ledger has seen the real cost of a task.
+TASKS = {
+    'football.results':  {'priority': 0, 'estimate': 1},   # /fixtures yesterday
+    'hockey.results':    {'priority': 0, 'estimate': 1},   # /games yesterday
+    'football.fixtures': {'priority': 1, 'estimate': 2},   # /fixtures today + tomorrow
+    'hockey.fixtures':   {'priority': 1, 'estimate': 2},   # /games today + tomorrow
+    'football.odds':     {'priority': 2, 'estimate': 2 * 3},   # 2 days x ~3 pages
+    'football.injuries': {'priority': 3, 'estimate': math.ceil(300 / 20)},   # batches of 20 fixtures
+}
+
+# TaskBudget the current thread / coroutine is spending (inherited by asyncio.to_thread)
+_CURRENT_TASK = contextvars.ContextVar('quota_task', default=None)
+
+
+def _today():
+    """API-Sports quotas reset at 00:00 UTC."""
+    return datetime.now(timezone.utc).strftime('%Y-%m-%d')
+
+
+class TaskBudget:
+    """
+    Handle returned by QuotaPlanner.task(): grants requests to one run of a task.
+    `outstanding` (granted, not sent yet) and `spent` are updated under the planner's lock.
+    """
+
+    def __init__(self, planner, name):
+        self.planner = planner
+        self.name = name
+        self.granted = 0
+        self.denied = 0
+        self.outstanding = 0
+        self.spent = 0
+
+    def grant(self, wanted):
+        """How many of `wanted` requests may be sent now (0..wanted)."""
+        allowed = self.planner.grant(self, wanted)
+        self.granted += allowed
+        self.denied += wanted - allowed
+        if allowed < wanted:
+            print(f"🧮 Quota: {self.name} limited to {allowed}/{wanted} requests "
+                  f"({self.planner.remaining()} left today).")
+        return allowed
+
+
+class QuotaPlanner:
+    """
+    Daily request budget of one API key, shared by the football and hockey imports.
+
+    - Every request that reaches the network is recorded (cache hits are free),
+      attributed to the running task, and persisted in a JSON ledger so the
+      budget survives restarts. The server's x-ratelimit-requests-* headers
+      re-sync the count when other clients use the same key.
+    - grant() lets a task spend only what is left after reserving the
+      estimated cost of every more valuable task that has not run yet today,
+      so results are never starved by odds pages or injury batches.
+    - Granted requests stay reserved until they are sent or their task ends,
+      so concurrent tasks never hand out the same remaining budget twice.
+
+    Thread-safe: the orchestrator runs both sports' imports concurrently.
+    """
+
+    def __init__(self, ledger_path=None, daily_limit=None, per_minute=None):
+        self.ledger_path = ledger_path or config.API_QUOTA_LEDGER
+        self.daily_limit = daily_limit or config.API_REQUESTS_PER_DAY
+        self.per_minute = per_minute or config.API_REQUESTS_PER_MINUTE
+        self.lock = threading.Lock()
+        self.ledger = self._load()
+        self.outstanding = 0   # Granted to open tasks, not sent yet
+
+    # --- LEDGER ---
+
+    def _load(self):
+        try:
+            with open(self.ledger_path, 'r') as f:
+                ledger = json.load(f)
+        except (OSError, ValueError):
+            ledger = {}
+        ledger.setdefault('observed', {})   # Last real cost per task, kept across days
+        return self._roll_day(ledger)
+
+    def _roll_day(self, ledger):
+        if ledger.get('day') != _today():
+            ledger.update({'day': _today(), 'used': 0, 'by_task': {}, 'started': [], 'server_limit': None})
+        return ledger
+
+    def _save(self):
+        self.ledger_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.ledger_path.with_suffix(f".tmp{os.getpid()}")
+        with open(tmp, 'w') as f:
+            json.dump(self.ledger, f, indent=2)
+        os.replace(tmp, self.ledger_path)
+
+    @property
+    def limit(self):
+        return self.ledger.get('server_limit') or self.daily_limit
+
+    def used(self):
+        with self.lock:
+            return self._roll_day(self.ledger)['used']
+
+    def remaining(self):
+        with self.lock:
+            self._roll_day(self.ledger)
+            return max(0, self.limit - config.API_QUOTA_RESERVE - self.ledger['used'] - self.outstanding)
+
+    def record(self, n=1):
+        """Counts n requests sent to the network, charged to the current task."""
+        budget = _CURRENT_TASK.get()
+        task = budget.name if budget else 'other'
+        with self.lock:
+            self._roll_day(self.ledger)
+            self.ledger['used'] += n
+            self.ledger['by_task'][task] = self.ledger['by_task'].get(task, 0) + n
+            if budget is not None:
+                budget.spent += n
+                sent = min(n, budget.outstanding)   # Retries are not covered by the grant
+                budget.outstanding -= sent
+                self.outstanding -= sent
+            self._save()
+
+    def update_from_headers(self, headers):
+        """API-Sports reports the daily quota in x-ratelimit-requests-limit / -remaining."""
+        limit = headers.get('x-ratelimit-requests-limit')
+        remaining = headers.get('x-ratelimit-requests-remaining')
+        if limit is None or remaining is None:
+            return
+        try:
+            limit, remaining = int(limit), int(remaining)
+        except ValueError:
+            return
+        with self.lock:
+            self._roll_day(self.ledger)
+            self.ledger['server_limit'] = limit
+            # Other consumers of the key count too: never believe we used less than the server says
+            self.ledger['used'] = max(self.ledger['used'], limit - remaining)
+
+    # --- PLANNING ---
+
+    def estimate(self, task):
+        return self.ledger['observed'].get(task, TASKS.get(task, {}).get('estimate', 1))
+
+    def _reserved_for(self, task):
+        """Estimated cost of the more valuable tasks that have not started yet today."""
+        priority = TASKS.get(task, {}).get('priority', max(t['priority'] for t in TASKS.values()) + 1)
+        return sum(
+            self.estimate(name) for name, spec in TASKS.items()
+            if spec['priority'] < priority and name not in self.ledger['started']
+        )
+
+    def grant(self, budget, wanted):
+        """Reserves up to `wanted` requests for `budget` (a TaskBudget) until they are sent or it ends."""
+        with self.lock:
+            self._roll_day(self.ledger)
+            if budget.name not in self.ledger['started']:
+                self.ledger['started'].append(budget.name)
+            available = (self.limit - config.API_QUOTA_RESERVE - self.ledger['used'] - self.outstanding
+                         - self._reserved_for(budget.name))
+            allowed = max(0, min(wanted, available))
+            budget.outstanding += allowed
+            self.outstanding += allowed
+            self._save()
+            return allowed
+
+    def task(self, name):
+        """
+        Context manager for one import task:
+            with QUOTA.task('football.odds') as budget:
+                calls = calls[:budget.grant(len(calls))]
+        Requests sent inside are charged to `name`; unsent grants are released on
+        exit and the real cost of this run is remembered as the estimate for
+        tomorrow's plan.
+        """
+        return _TaskContext(self, name)
+
+    def _finish(self, budget, observe):
+        with self.lock:
+            self.outstanding -= budget.outstanding
+            budget.outstanding = 0
+            if observe:
+                self.ledger['observed'][budget.name] = max(budget.spent, 1)
+            self._save()
+
+    def plan(self, tasks=None):
+        """
+        Today's schedule: tasks in priority order with their estimated cost,
+        admitted while the remaining budget covers them.
+        Returns [(task, priority, estimate, status)] with status done/planned/deferred.
+        """
+        tasks = tasks or TASKS
+        with self.lock:
+            self._roll_day(self.ledger)
+            budget = self.limit - config.API_QUOTA_RESERVE - self.ledger['used'] - self.outstanding
+            rows = []
+            for name in sorted(tasks, key=lambda t: (TASKS.get(t, {}).get('priority', 99), t)):
+                cost = self.estimate(name)
+                if name in self.ledger['started']:
+                    status = 'done'
+                elif cost <= budget:
+                    status = 'planned'
+                    budget -= cost
+                else:
+                    status = 'deferred'
+                rows.append((name, TASKS.get(name, {}).get('priority'), cost, status))
+            return rows
+
+    def print_plan(self):
+        rows = self.plan()
+        with self.lock:
+            day, by_task = self.ledger['day'], dict(self.ledger['by_task'])
+        print(f"\n🧮 API QUOTA {day}: {self.used()}/{self.limit} used "
+              f"({config.API_QUOTA_RESERVE} kept in reserve), {self.per_minute}/min")
+        for name, priority, cost, status in rows:
+            spent = by_task.get(name, 0)
+            print(f"   P{priority} {name:<18} ~{cost:>3} req  spent {spent:>3}  {status}")
+        planned = sum(cost for _, _, cost, status in rows if status == 'planned')
+        if planned:
+            print(f"   Remaining plan: ~{planned} requests, ~{math.ceil(planned / self.per_minute)} min at the per-minute limit")
+
+
+class _TaskContext:
+    def __init__(self, planner, name):
+        self.planner = planner
+        self.budget = TaskBudget(planner, name)
+        self.token = None
+
+    def __enter__(self):
+        self.token = _CURRENT_TASK.set(self.budget)
+        return self.budget
+
+    def __exit__(self, exc_type, exc, tb):
+        _CURRENT_TASK.reset(self.token)
+        # A task cut short by the budget tells us little about its real cost
+        self.planner._finish(self.budget, observe=exc_type is None and not self.budget.denied)
+        return False
+
+
+_PLANNERS = {}
+_PLANNERS_LOCK = threading.Lock()
+
+def get_quota_planner(api_key=None):
+    """One planner (and ledger file) per API key, shared by both importers."""
+    api_key = api_key or config.API_KEY
+    with _PLANNERS_LOCK:
+        if api_key not in _PLANNERS:
+            if api_key == config.API_KEY:
+                _PLANNERS[api_key] = QuotaPlanner()
+            else:
+                suffix = hashlib.sha256(api_key.encode()).hexdigest()[:8]
+                path = config.API_QUOTA_LEDGER.with_name(f"{config.API_QUOTA_LEDGER.stem}_{suffix}.json")
+                _PLANNERS[api_key] = QuotaPlanner(ledger_path=path)
+        return _PLANNERS[api_key]
+
+
+if __name__ == "__main__":
+    get_quota_planner().print_plan()
\ No newline at end of file
@@ -0,0 +1,152 @@
+import argparse
+import hashlib
+import json
+import threading
+import time
+import sys
+import os
+from datetime import date, datetime, timedelta
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+try:
+    from src import config
+except ImportError:
+    import config
+
+
+def request_key(base_url, endpoint, params):
+    """Stable address of a request: same host + endpoint + params -> same file."""
+    canonical = json.dumps({
+        'base_url': base_url.rstrip('/'),
+        'endpoint': endpoint.strip('/'),
+        'params': {str(k): str(v) for k, v in (params or {}).items()},
+    }, sort_keys=True)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def _parse_date(value):
+    try:
+        return datetime.strptime(str(value), '%Y-%m-%d').date()
+    except ValueError:
+        return None
+
+
+def ttl_for(endpoint, params, today=None):
+    """
+    Seconds a response stays fresh, None = forever.
+    - Finished seasons and dates at least 2 days old never change.
+    - Yesterday can still receive late results; today/tomorrow and odds move by the minute.
+    """
+    today = today or date.today()
+    params = params or {}
+    ttl = config.API_CACHE_TTL
+
+    season = params.get('season')
+    if season is not None and str(season).isdigit():
+        # Seasons are labelled by their starting year and end by the summer after
+        if today >= date(int(season) + 1, 7, 1):
+            return None
+
+    day = _parse_date(params.get('date')) if 'date' in params else None
+    if day is not None:
+        if day <= today - timedelta(days=2):
+            return None
+        if day == today - timedelta(days=1):
+            return ttl['recent']
+
+    if endpoint.strip('/') == 'odds':
+        return ttl['odds']
+    if day is not None or endpoint.strip('/') == 'injuries':
+        return ttl['live']
+    return ttl['default']
+
+
+class ResponseCache:
+    """
+    On-disk cache of API payloads: cache/api/<sha256 of request>.json.
+    In replay mode entries never expire and misses are not fetched.
+    """
+
+    def __init__(self, cache_dir=None, replay=None):
+        self.cache_dir = cache_dir or config.API_CACHE_DIR
+        self.replay = config.API_REPLAY if replay is None else replay
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, key):
+        return self.cache_dir / f"{key}.json"
+
+    def get(self, base_url, endpoint, params):
+        path = self._path(request_key(base_url, endpoint, params))
+        try:
+            with open(path, 'r') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+
+        expires_at = entry.get('expires_at')
+        if not self.replay and expires_at is not None and time.time() > expires_at:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry['payload']
+
+    def put(self, base_url, endpoint, params, payload):
+        ttl = ttl_for(endpoint, params)
+        now = time.time()
+        entry = {
+            'base_url': base_url, 'endpoint': endpoint, 'params': params,
+            'fetched_at': now,
+            'expires_at': None if ttl is None else now + ttl,
+            'payload': payload,
+        }
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        path = self._path(request_key(base_url, endpoint, params))
+        # fetch_many writes from several threads of one process: the temp file is per thread
+        tmp = path.with_suffix(f".tmp{os.getpid()}-{threading.get_ident()}")
+        with open(tmp, 'w') as f:
+            json.dump(entry, f)
+        os.replace(tmp, path)
+
+
+def cache_summary(cache_dir=None):
+    cache_dir = cache_dir or config.API_CACHE_DIR
+    now = time.time()
+    summary = {'entries': 0, 'permanent': 0, 'expired': 0, 'bytes': 0}
+    for path in cache_dir.glob('*.json'):
+        summary['entries'] += 1
+        summary['bytes'] += path.stat().st_size
+        with open(path, 'r') as f:
+            expires_at = json.load(f).get('expires_at')
+        if expires_at is None:
+            summary['permanent'] += 1
+        elif now > expires_at:
+            summary['expired'] += 1
+    return summary
+
+
+def purge_expired(cache_dir=None):
+    cache_dir = cache_dir or config.API_CACHE_DIR
+    now = time.time()
+    removed = 0
+    for path in cache_dir.glob('*.json'):
+        with open(path, 'r') as f:
+            expires_at = json.load(f).get('expires_at')
+        if expires_at is not None and now > expires_at:
+            path.unlink()
+            removed += 1
+    return removed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--purge-expired', action='store_true')
+    args = parser.parse_args()
+
+    if args.purge_expired:
+        print(f"🧹 Removed {purge_expired()} expired responses.")
+    s = cache_summary()
+    print(f"📦 API cache {config.API_CACHE_DIR}: {s['entries']} responses "
+          f"({s['permanent']} permanent, {s['expired']} expired), {s['bytes'] / 1e6:.1f} MB")
\ No newline at end of file
@@ -1,55 +1,21 @@
-import time
-from datetime import datetime
+import argparse
 import sys
 import os
 
-# Import Hockey Modules
-import importer_hockey
-import preprocess_hockey
-import train_model_hockey
-import predict_smart_hockey
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+try:
+    from src import orchestrator
+except ImportError:
+    import orchestrator
 
-def run_hockey_job():
-    start_time = time.time()
-    print(f"\n🏒 STARTING HOCKEY PIPELINE: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-    print("=" * 60)
-
-    # STEP 1: Import (Results & Fixtures)
-    print("\n>>> [STEP 1] Importing Data...")
-    try:
-        importer_hockey.run_importer()
-    except Exception as e:
-        print(f"❌ Importer Failed: {e}")
-        return
-
-    # STEP 2: Preprocess (Feature Engineering)
-    print("\n>>> [STEP 2] Processing Features...")
-    try:
-        preprocess_hockey.feature_engineering_hockey()
-    except Exception as e:
-        print(f"❌ Preprocess Failed: {e}")
-        return
-
-    # STEP 3: Train (Retrain Model on new results)
-    print("\n>>> [STEP 3] Retraining Model...")
-    try:
-        train_model_hockey.train_model_hockey()
-    except Exception as e:
-        print(f"❌ Training Failed: {e}")
-        return
-
-    # STEP 4: Predict (Sniper Mode)
-    print("\n>>> [STEP 4] Generating Predictions...")
-    try:
-        predict_smart_hockey.smart_daily_predict_hockey()
-    except Exception as e:
-        print(f"❌ Prediction Failed: {e}")
-        return
-
-    elapsed = round(time.time() - start_time, 2)
-    print("=" * 60)
-    print(f"✅ HOCKEY PIPELINE FINISHED in {elapsed} seconds.")
-    print("============================================================")
+def run_hockey_job(**kwargs):
+    """Hockey daily job: Import -> Preprocess -> Train -> Predict (via the orchestrator)."""
+    return orchestrator.run_pipeline(sports=['hockey'], **kwargs)
 
 if __name__ == "__main__":
-    run_hockey_job()
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--profile', action='store_true', help="Record time/memory/rows per stage")
+    parser.add_argument('--pstats', action='store_true', help="Also dump cProfile stats per stage")
+    args = parser.parse_args()
+    run_hockey_job(profile=args.profile, pstats=args.pstats)
@@ -53,4 +53,21 @@ class StatsEngine:
         goal_diff = abs(home_goals - away_goals)
         mov_multiplier = 1.0 if goal_diff <= 1 else np.log(goal_diff + 1)
 
-        return k_factor * mov_multiplier * (actual - expected_home)
\ No newline at end of file
+        return k_factor * mov_multiplier * (actual - expected_home)
+
+    @staticmethod
+    def calculate_elo_change_batch(elo_home, elo_away, home_goals, away_goals, k_factor=30, home_adv=100):
+        """Vectorized calculate_elo_change: same formula, applied to whole arrays at once."""
+        elo_home = np.asarray(elo_home, dtype=float)
+        elo_away = np.asarray(elo_away, dtype=float)
+        home_goals = np.asarray(home_goals, dtype=float)
+        away_goals = np.asarray(away_goals, dtype=float)
+
+        actual = np.select([home_goals > away_goals, home_goals == away_goals], [1.0, 0.5], 0.0)
+        expected_home = 1 / (1 + 10 ** ((elo_away - (elo_home + home_adv)) / 400))
+
+        goal_diff = np.abs(home_goals - away_goals)
+        with np.errstate(invalid='ignore'):
+            mov_multiplier = np.where(goal_diff <= 1, 1.0, np.log(goal_diff + 1))
+
+        return k_factor * mov_multiplier * (actual - expected_home)
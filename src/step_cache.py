@@ -0,0 +1,231 @@
+import hashlib
+import json
+import os
+import shutil
+import sys
+from datetime import datetime
+from sqlalchemy import create_engine, text
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+try:
+    from src import config
+    from src import model_registry
+except ImportError:
+    import config
+    import model_registry
+
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def get_db_engine():
+    url = f"postgresql://{config.DB_USER}:{config.DB_PASS}@{config.DB_HOST}:{config.DB_PORT}/{config.DB_NAME}"
+    return create_engine(url)
+
+
+# --- HASHING HELPERS ---
+
+def hash_file(path, chunk_size=1 << 20):
+    """Streaming sha256 of a file (None if it does not exist)."""
+    if not os.path.exists(path):
+        return None
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def hash_obj(obj):
+    """Stable sha256 of any JSON-serialisable object."""
+    return hashlib.sha256(json.dumps(obj, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+def code_version(files):
+    """Hash of the source files a step executes (changes whenever the logic changes)."""
+    return hash_obj({f: hash_file(os.path.join(SRC_DIR, f)) for f in files})
+
+
+def params_file(path):
+    """Content of an optional params JSON (e.g. best_params.json)."""
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+# --- INPUT FINGERPRINTS ---
+
+def football_high_water():
+    """New-row high-water marks for finished football matches."""
+    query = text("""
+        SELECT COUNT(*), MAX(match_id), MAX(match_date),
+               COALESCE(SUM(home_goals + away_goals), 0)
+        FROM matches WHERE status = 'FT'
+    """)
+    with get_db_engine().connect() as conn:
+        count, max_id, max_date, goal_sum = conn.execute(query).fetchone()
+        teams = conn.execute(text("SELECT COUNT(*) FROM teams")).scalar()
+    return {'matches': count, 'max_match_id': max_id, 'max_date': max_date,
+            'goal_checksum': goal_sum, 'teams': teams}
+
+
+def hockey_high_water():
+    """New-row high-water marks for finished hockey games (same filter as preprocess_hockey)."""
+    query = text(f"""
+        SELECT COUNT(*), MAX(fixture_id), MAX(date),
+               COALESCE(SUM(score_p1_home + score_p2_home + score_p3_home
+                            + score_p1_away + score_p2_away + score_p3_away), 0)
+        FROM {config.HOCKEY_TABLE} WHERE status_short IN ('FT', 'AOT', 'AP')
+    """)
+    with get_db_engine().connect() as conn:
+        count, max_id, max_date, goal_sum = conn.execute(query).fetchone()
+    return {'games': count, 'max_fixture_id': max_id, 'max_date': max_date,
+            'goal_checksum': goal_sum}
+
+
+# --- CACHEABLE STEPS ---
+# Import & predict are never cached: they depend on the API and on the clock.
+STEP_SPECS = {
+    'football.preprocess': {
+        'inputs': lambda: {'db': football_high_water()},
+        'code': ['preprocess.py', 'stats_engine.py', 'config.py'],
+        'outputs': [config.PROCESSED_DATA_PATH],
+    },
+    'hockey.preprocess': {
+        'inputs': lambda: {'db': hockey_high_water()},
+        'code': ['preprocess_hockey.py', 'config.py'],
+        'outputs': [config.HOCKEY_PROCESSED_PATH],
+    },
+}
+
+
+# Train steps are looked up in the model registry instead of cache/steps/: it owns their
+# outputs (versions + CURRENT, which predictions read). Each version's manifest records
+# the fingerprint it was trained on (training.fingerprint); a step is skipped when the
+# latest registered version, promoted or not, has the same one.
+TRAIN_SPECS = {
+    'football.train': {
+        'sport': 'football',
+        'data': config.PROCESSED_DATA_PATH,
+        'params': config.MODELS_DIR / "best_params.json",
+        'code': ['train_model.py', 'league_shards.py', 'binned_dataset.py', 'model_registry.py', 'config.py'],
+    },
+    'hockey.train': {
+        'sport': 'hockey',
+        'data': config.HOCKEY_PROCESSED_PATH,
+        'params': None,   # Hockey params live in train_model_hockey.py
+        'code': ['train_model_hockey.py', 'train_model.py', 'league_shards.py', 'binned_dataset.py',
+                 'model_registry.py', 'config.py'],
+    },
+}
+
+
+def is_cacheable(step_name):
+    return step_name in STEP_SPECS or step_name in TRAIN_SPECS
+
+
+def fingerprint(step_name):
+    """Returns (fingerprint, inputs) for a cacheable step."""
+    if step_name in TRAIN_SPECS:
+        spec = TRAIN_SPECS[step_name]
+        inputs = {
+            'data': hash_file(spec['data']),
+            'params': params_file(spec['params']) if spec['params'] else None,
+            'features': config.MODEL_FEATURES,
+        }
+    else:
+        spec = STEP_SPECS[step_name]
+        inputs = spec['inputs']()
+    inputs['code_version'] = code_version(spec['code'])
+    return hash_obj(inputs)[:16], inputs
+
+
+def train_fingerprint(step_name):
+    """What a trainer stores in its version's training record (None if it cannot be computed)."""
+    try:
+        return fingerprint(step_name)[0]
+    except Exception as e:
+        print(f"⚠️ Training fingerprint unavailable ({e}). This version will not be skippable.")
+        return None
+
+
+# --- ARTIFACT CACHE ---
+
+def _entry_dir(step_name, fp):
+    return config.STEP_CACHE_DIR / step_name / fp
+
+
+def lookup(step_name, fp):
+    """
+    Returns the cache manifest for this fingerprint, or None on a miss.
+    Train steps: the latest registered version's manifest, if it was trained on `fp`.
+    """
+    if step_name in TRAIN_SPECS:
+        sport = TRAIN_SPECS[step_name]['sport']
+        versions = model_registry.list_versions(sport)
+        if not versions:
+            return None
+        manifest = model_registry.load_manifest(sport, versions[-1])
+        return manifest if (manifest.get('training') or {}).get('fingerprint') == fp else None
+    manifest_path = _entry_dir(step_name, fp) / "manifest.json"
+    if not manifest_path.exists():
+        return None
+    with open(manifest_path, 'r') as f:
+        return json.load(f)
+
+
+def restore(step_name, fp, manifest):
+    """
+    Makes the live outputs identical to the cached ones.
+    Outputs that already match are left untouched; others are copied back atomically.
+    Train steps have nothing to restore: the registry's promotion gate already decided
+    whether that version is served.
+    """
+    if step_name in TRAIN_SPECS:
+        return 0
+    entry = _entry_dir(step_name, fp)
+    restored = 0
+    for name, digest in manifest['outputs'].items():
+        target = next(p for p in STEP_SPECS[step_name]['outputs'] if p.name == name)
+        if hash_file(target) == digest:
+            continue
+        tmp_path = f"{target}.tmp"
+        shutil.copy2(entry / name, tmp_path)
+        os.replace(tmp_path, target)
+        restored += 1
+    return restored
+
+
+def store(step_name, fp, inputs):
+    """Copies the step outputs into the cache under its fingerprint (train steps: the registry did)."""
+    if step_name in TRAIN_SPECS:
+        return
+    entry = _entry_dir(step_name, fp)
+    entry.mkdir(parents=True, exist_ok=True)
+    outputs = {}
+    for path in STEP_SPECS[step_name]['outputs']:
+        if not path.exists():
+            continue  # Optional artifacts
+        shutil.copy2(path, entry / path.name)
+        outputs[path.name] = hash_file(path)
+
+    manifest = {
+        'step': step_name,
+        'fingerprint': fp,
+        'inputs': inputs,
+        'outputs': outputs,
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+    }
+    with open(entry / "manifest.json", 'w') as f:
+        json.dump(manifest, f, indent=2, default=str)
+    prune(step_name)
+
+
+def prune(step_name, keep=None):
+    """Keeps only the most recent entries of a step."""
+    keep = keep or config.STEP_CACHE_KEEP
+    step_dir = config.STEP_CACHE_DIR / step_name
+    entries = sorted((p for p in step_dir.iterdir() if p.is_dir()), key=lambda p: p.stat().st_mtime)
+    for old in entries[:-keep]:
+        shutil.rmtree(old, ignore_errors=True)
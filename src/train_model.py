@@ -1,33 +1,198 @@
 import pandas as pd
-import joblib
 import json
 import numpy as np
+import argparse
+import time
 import sys
 import os
+from contextlib import contextmanager
+from datetime import datetime, timedelta
 from sklearn.ensemble import HistGradientBoostingClassifier
-from sklearn.metrics import classification_report, confusion_matrix, log_loss
-
-# Try importing SHAP
-try:
-    import shap
-    SHAP_AVAILABLE = True
-except ImportError:
-    SHAP_AVAILABLE = False
-    print("⚠️ SHAP library not installed. Explainer will not be generated.")
+from sklearn.metrics import accuracy_score, classification_report, confusion_matrix, log_loss
 
 # Add project root to path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 try:
     from src import config
+    from src import model_registry
+    from src import league_shards
+    from src import binned_dataset
+    from src import step_cache
 except ImportError:
     import config
+    import model_registry
+    import league_shards
+    import binned_dataset
+    import step_cache
+
+def recency_weights(dates):
+    """Time decay: weights grow linearly from 1 (oldest match) to 3 (newest)."""
+    days_diff = (dates - dates.min()).dt.days
+    total_days = (dates.max() - dates.min()).days
+    return 1 + (2 * (days_diff / total_days)) if total_days else pd.Series(1.0, index=dates.index)
+
+def load_model_params(categorical_indices):
+    """Default HGB params, overridden by models/best_params.json when present."""
+    model_params = {
+        'learning_rate': 0.05,
+        'max_iter': 300,
+        'max_depth': 12,
+        'l2_regularization': 1.0,
+        'categorical_features': categorical_indices,
+        
+        # RESTORED: 'balanced' ensures the model learns to identify Draws again.
+        'class_weight': 'balanced', 
+        
+        'random_state': 42,
+        'scoring': 'neg_log_loss'
+    }
+
+    # Load optimized params
+    params_path = config.MODELS_DIR / "best_params.json"
+    if os.path.exists(params_path):
+        print(f"⚡ Loading optimized params from {params_path}...")
+        with open(params_path, "r") as f:
+            best_params = json.load(f)
+        model_params.update(best_params)
+        model_params['categorical_features'] = categorical_indices 
+        # Force balanced
+        model_params['class_weight'] = 'balanced'
+    return model_params
+
+# --- EARLY STOPPING (time-ordered validation) ---
+
+def validation_mask(dates, weeks=None):
+    """The last `weeks` weeks of matches, used to decide when boosting stops."""
+    weeks = weeks or config.EARLY_STOPPING_WEEKS
+    return (dates > dates.max() - pd.Timedelta(weeks=weeks)).to_numpy()
+
+def fit_early_stopping(params, X, y, sample_weight, valid, binned=None):
+    """
+    sklearn's own early stopping validates on a random 10% (future matches
+    leak into training). Here boosting runs in chunks of EARLY_STOPPING_CHUNK
+    iterations (warm_start) on the rows before the `valid` weeks and stops once
+    their log loss has not improved for EARLY_STOPPING_PATIENCE iterations.
+    The model is then refit on all rows with the best iteration count, so the
+    most recent weeks are not lost. Returns (model, early stopping record).
+    `binned` serves the refit only: its thresholds were fitted on all rows, the
+    search bins the rows before the `valid` weeks itself, as a plain fit would.
+    """
+    chunk, patience = config.EARLY_STOPPING_CHUNK, config.EARLY_STOPPING_PATIENCE
+    X_fit, y_fit, w_fit = X[~valid], y[~valid], sample_weight[~valid]
+    X_val, y_val = X[valid], y[valid]
+
+    model = HistGradientBoostingClassifier(**{**params, 'early_stopping': False, 'warm_start': True})
+    n_iter, best_iter, best_loss = 0, 0, np.inf
+    while n_iter < config.EARLY_STOPPING_MAX_ITER and n_iter - best_iter < patience:
+        n_iter = min(config.EARLY_STOPPING_MAX_ITER, n_iter + chunk)
+        model.set_params(max_iter=n_iter)
+        if n_iter <= chunk:
+            model.fit(X_fit, y_fit, sample_weight=w_fit)
+        else:
+            with frozen_binning(model):   # Same rows: reuse the bins instead of refitting them every chunk
+                model.fit(X_fit, y_fit, sample_weight=w_fit)
+        loss = log_loss(y_val, model.predict_proba(X_val), labels=[0, 1, 2])
+        if loss < best_loss:
+            best_iter, best_loss = n_iter, loss
+
+    # Exact iteration inside the best chunk
+    losses = [log_loss(y_val, p, labels=[0, 1, 2]) for p in model.staged_predict_proba(X_val)]
+    best_iter = int(np.argmin(losses)) + 1
+    print(f"⏹️ Early stopping: best iteration {best_iter} of {n_iter} tried "
+          f"(validation: last {config.EARLY_STOPPING_WEEKS} weeks, {valid.sum():,} rows, log loss {min(losses):.4f})")
+
+    model = HistGradientBoostingClassifier(**{**params, 'early_stopping': False, 'max_iter': best_iter})
+    binned_dataset.fit_binned(model, binned, X, y, sample_weight)
+    return model, {
+        'best_iteration': best_iter, 'iterations_tried': n_iter,
+        'valid_weeks': config.EARLY_STOPPING_WEEKS, 'valid_rows': int(valid.sum()),
+        'valid_log_loss': round(float(min(losses)), 5),
+    }
 
-def train_model():
+def fit_model(params, X, y, sample_weight, dates=None, binned=None):
+    """
+    Time-ordered early stopping when enabled and the validation weeks hold enough rows.
+    `binned` (binned_dataset.load) serves the bins of X's rows to every fit.
+    """
+    model, record = None, {}
+    if config.EARLY_STOPPING and dates is not None:
+        valid = validation_mask(dates)
+        if config.EARLY_STOPPING_MIN_ROWS <= valid.sum() < len(valid) and y[valid].nunique() == 3:
+            model, record = fit_early_stopping(params, X, y, sample_weight, valid, binned)
+        else:
+            print(f"ℹ️ {valid.sum()} rows in the last {config.EARLY_STOPPING_WEEKS} weeks: fixed max_iter={params['max_iter']}.")
+    if model is None:
+        model = binned_dataset.fit_binned(HistGradientBoostingClassifier(**params), binned, X, y, sample_weight)
+    if binned is not None:
+        record.update(binned_dataset.report(binned, "Training"))
+    return model, record
+
+def load_binned(name, data_path, X, model_params, fit_rows):
+    """
+    The processed CSV's bins with thresholds fitted on `fit_rows` (the training rows'
+    CSV positions, never the holdout), built on first use. None when BINNED_CACHE is off.
+    """
+    if not config.BINNED_CACHE:
+        return None
+    return binned_dataset.load(binned_dataset.prepare(
+        name, data_path, list(X.columns), model_params['categorical_features'],
+        model_params.get('max_bins', 255), X, fit_rows))
+
+# --- INCREMENTAL (warm start) ---
+
+@contextmanager
+def frozen_binning(model):
+    """
+    Keeps the fitted category encoding and bin thresholds while `model` is refit
+    with warm_start. sklearn re-bins every new X on fit, which would shift the
+    bins the existing trees split on.
+    """
+    preprocess, mapper = model._preprocess_X, model._bin_mapper
+
+    def _preprocess_X(X, *, reset):
+        return (preprocess(X, reset=False), None) if reset else preprocess(X, reset=False)
+
+    def _bin_data(X, is_training_data):
+        model._bin_mapper = mapper
+        X_binned = mapper.transform(X)
+        return X_binned if is_training_data else np.ascontiguousarray(X_binned)
+
+    model._preprocess_X, model._bin_data = _preprocess_X, _bin_data
+    try:
+        yield model
+    finally:
+        del model._preprocess_X, model._bin_data
+        model._bin_mapper = mapper
+
+def incremental_base(features, model_params):
+    """
+    (model, manifest) of the served model to continue boosting from,
+    or (None, reason) when a full refit is due.
+    """
+    version = model_registry.current_version('football')
+    if version is None:
+        return None, "no registered model"
+    manifest = model_registry.load_manifest('football', version)
+    training = manifest.get('training') or {}
+    if not training.get('full_refit_at'):
+        return None, "current model has no training lineage"
+    if manifest['features_hash'] != model_registry.features_hash(features):
+        return None, "feature set changed"
+    if any(manifest['params'].get(k) != model_params.get(k) for k in ('learning_rate', 'max_depth', 'l2_regularization')):
+        return None, "model params changed"
+    age = datetime.now() - datetime.fromisoformat(training['full_refit_at'])
+    if age > timedelta(days=config.INCREMENTAL_FULL_REFIT_DAYS):
+        return None, f"last full refit {age.days} days ago (weekly schedule)"
+    return model_registry.load_model('football', mmap=False), manifest
+
+def train_model(incremental=None, shards=None):
     print(f"🚀 Loading processed data from {config.PROCESSED_DATA_PATH}...")
     if not config.PROCESSED_DATA_PATH.exists():
         print(f"❌ Error: Data file not found at {config.PROCESSED_DATA_PATH}")
         return
 
+    # Inputs this version is trained on: the orchestrator skips the step while they are unchanged
+    fingerprint = step_cache.train_fingerprint('football.train')
     df = pd.read_csv(config.PROCESSED_DATA_PATH)
 
     # 1. DEFINE TARGET
@@ -45,12 +210,7 @@ def train_model():
         df = df.sort_values('date')
         
         print("⏳ Applying Time Decay (Recency Weighting)...")
-        min_date = df['date'].min()
-        max_date = df['date'].max()
-        days_diff = (df['date'] - min_date).dt.days
-        total_days = (max_date - min_date).days
-        # Standard weighting curve
-        df['sample_weight'] = 1 + (2 * (days_diff / total_days))
+        df['sample_weight'] = recency_weights(df['date'])
     else:
         df['sample_weight'] = 1.0 
     
@@ -73,34 +233,64 @@ def train_model():
     w_train = weights.iloc[:split_idx]
 
     # 5. INITIALIZE MODEL (RESTORED BALANCED MODE)
-    model_params = {
-        'learning_rate': 0.05,
-        'max_iter': 300,
-        'max_depth': 12,
-        'l2_regularization': 1.0,
-        'categorical_features': categorical_indices,
-        
-        # RESTORED: 'balanced' ensures the model learns to identify Draws again.
-        'class_weight': 'balanced', 
-        
-        'random_state': 42,
-        'scoring': 'neg_log_loss'
-    }
+    model_params = load_model_params(categorical_indices)
+    train_end = str(df['date'].iloc[split_idx - 1]) if 'date' in df.columns else None
 
-    # Load optimized params
-    params_path = config.MODELS_DIR / "best_params.json"
-    if os.path.exists(params_path):
-        print(f"⚡ Loading optimized params from {params_path}...")
-        with open(params_path, "r") as f:
-            best_params = json.load(f)
-        model_params.update(best_params)
-        model_params['categorical_features'] = categorical_indices 
-        # Force balanced
-        model_params['class_weight'] = 'balanced'
+    # The served model on this run's holdout rows: the baseline for drift and promotion
+    current_metrics = league_shards.score_current('football', X_test, y_test)
+
+    # 5b. INCREMENTAL: continue boosting the served model on the rows it has not seen
+    incremental = config.INCREMENTAL_TRAINING if incremental is None else incremental
+    model, training, early_stopping = None, None, {}
+    if incremental and train_end:
+        base, manifest = incremental_base(features, model_params)
+        if base is None or current_metrics is None:
+            print(f"🔁 Full refit: {manifest if base is None else 'current model cannot be scored on this holdout'}.")
+        else:
+            lineage = manifest['training']
+            train_dates = df['date'].iloc[:split_idx]
+            new = (train_dates > pd.Timestamp(lineage['train_end'])).to_numpy()
+            # New trees are fit on a recent window, not the new rows alone, so they follow form rather than noise
+            window = (train_dates > train_dates.max() - pd.Timedelta(days=config.INCREMENTAL_WINDOW_DAYS)).to_numpy() | new
+            if not new.any():
+                print(f"✅ No new results since {lineage['train_end']}. Keeping {manifest['version']}.")
+                return
+            if y_train[window].nunique() < 3:
+                print(f"🔁 Full refit: {window.sum()} recent rows do not cover all three outcomes.")
+            else:
+                print(f"➕ Incremental: +{config.INCREMENTAL_EXTRA_ITER} iterations on the last {window.sum():,} rows "
+                      f"({new.sum():,} new) from {manifest['version']} ({base.n_iter_} iterations)...")
+                start = time.perf_counter()
+                base.set_params(warm_start=True, max_iter=base.n_iter_ + config.INCREMENTAL_EXTRA_ITER)
+                with frozen_binning(base):
+                    base.fit(X_train[window], y_train[window], sample_weight=w_train[window])
+                base.set_params(warm_start=False)
+                train_seconds = time.perf_counter() - start
 
-    print("🧠 Training HistGradientBoostingClassifier (Balanced Mode)...")
-    model = HistGradientBoostingClassifier(**model_params)
-    model.fit(X_train, y_train, sample_weight=w_train)
+                loss = float(log_loss(y_test, base.predict_proba(X_test), labels=[0, 1, 2]))
+                # Same holdout rows as the served model's score (chained drift is bounded by the weekly full refit)
+                drift = loss / current_metrics['log_loss'] - 1
+                if drift > config.INCREMENTAL_MAX_DRIFT:
+                    print(f"🔁 Full refit: the update is {drift:+.1%} worse than the served model on the holdout "
+                          f"({loss:.4f} vs {current_metrics['log_loss']:.4f}).")
+                else:
+                    model, model_params = base, {**model_params, 'max_iter': base.max_iter}
+                    training = {
+                        **lineage, 'mode': 'incremental', 'base_version': manifest['version'],
+                        'train_end': train_end, 'new_rows': int(new.sum()), 'drift': round(drift, 4),
+                    }
+                    print(f"⏱️ Incremental fit {train_seconds:.1f}s vs {lineage['full_train_seconds']:.1f}s "
+                          f"full retrain: {lineage['full_train_seconds'] - train_seconds:.1f}s saved "
+                          f"(log loss drift {drift:+.1%}).")
+
+    if model is None:
+        print("🧠 Training HistGradientBoostingClassifier (Balanced Mode)...")
+        start = time.perf_counter()
+        train_dates = df['date'].iloc[:split_idx] if 'date' in df.columns else None
+        binned = load_binned('football', config.PROCESSED_DATA_PATH, X, model_params, X_train.index)
+        model, early_stopping = fit_model(model_params, X_train, y_train, w_train, train_dates, binned)
+        train_seconds = time.perf_counter() - start
+        model_params = {**model_params, 'max_iter': model.max_iter}
 
     # 6. EVALUATE
     y_pred = model.predict(X_test)
@@ -108,29 +298,45 @@ def train_model():
     
     print("\n📊 CLASSIFICATION REPORT:")
     print(classification_report(y_test, y_pred, target_names=['Away', 'Draw', 'Home']))
-    print(f"📉 Log Loss: {log_loss(y_test, y_prob):.4f}")
+    metrics = {
+        'log_loss': round(float(log_loss(y_test, y_prob, labels=[0, 1, 2])), 5),
+        'accuracy': round(float(accuracy_score(y_test, y_pred)), 4),
+        'holdout_rows': len(y_test),
+    }
+    print(f"📉 Log Loss: {metrics['log_loss']:.4f}")
+    if training is None:
+        training = {
+            'mode': 'full', 'full_refit_at': datetime.now().isoformat(timespec='seconds'),
+            'full_train_seconds': round(train_seconds, 2), 'full_log_loss': metrics['log_loss'],
+            'train_end': train_end, **early_stopping,
+        }
 
-    # 7. SAVE EVERYTHING
-    print(f"💾 Saving Model to {config.MODEL_PATH}...")
-    joblib.dump(model, config.MODEL_PATH)
-    
-    with open(config.FEATURE_COLUMNS_PATH, 'w') as f:
-        json.dump(features, f)
-
-    if SHAP_AVAILABLE:
-        print("🔍 Generating SHAP Explainer...")
-        try:
-            background_data = X_train.tail(500)
-            explainer = shap.Explainer(model.predict, background_data)
-            
-            # --- UPDATE: Added Print Statement Here ---
-            print(f"💾 Saving SHAP Explainer to {config.SHAP_EXPLAINER_PATH}...")
-            joblib.dump(explainer, config.SHAP_EXPLAINER_PATH)
-            
-        except Exception as e:
-            print(f"⚠️ SHAP Generation Failed: {e}")
+    artifacts = {}
+    if config.LEAGUE_SHARDS if shards is None else shards:
+        artifacts, routed_probs = league_shards.train_shards(
+            X, y, weights, split_idx, model_params, model, df['date'] if 'date' in df.columns else None)
+        metrics['routed_log_loss'] = round(float(log_loss(y_test, routed_probs, labels=[0, 1, 2])), 5)
+        print(f"📉 Log Loss with league shards: {metrics['routed_log_loss']:.4f}")
+
+    # 7. SAVE EVERYTHING (new registry version; served only if it is not worse than the current one)
+    version = model_registry.register(
+        'football', model, features, model_params, metrics,
+        model_registry.data_high_water(config.PROCESSED_DATA_PATH, 'match_date'), train_seconds, artifacts,
+        training={**training, 'fingerprint': fingerprint},
+    )
+    model_registry.promote('football', version, legacy={
+        model_registry.MODEL_FILE: config.MODEL_PATH,
+        model_registry.FEATURES_FILE: config.FEATURE_COLUMNS_PATH,
+    }, current_metrics=current_metrics)
 
     print("✅ Training Pipeline Complete.")
 
 if __name__ == "__main__":
-    train_model()
\ No newline at end of file
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--incremental', action='store_true', default=None,
+                        help="Continue boosting the current model on new results (default: config.INCREMENTAL_TRAINING)")
+    parser.add_argument('--full', dest='incremental', action='store_false', help="Force a full refit")
+    parser.add_argument('--shards', action='store_true', default=None,
+                        help="Also train per-league shard models (default: config.LEAGUE_SHARDS)")
+    args = parser.parse_args()
+    train_model(args.incremental, args.shards)
\ No newline at end of file
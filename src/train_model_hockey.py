@@ -1,32 +1,35 @@
 import pandas as pd
-import joblib
+import argparse
 import numpy as np
+import time
 import sys
 import os
-from sklearn.ensemble import HistGradientBoostingClassifier
-from sklearn.metrics import classification_report, log_loss
+from sklearn.metrics import accuracy_score, classification_report, log_loss
 
 # Add project root to path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 try:
     from src import config
+    from src import model_registry
+    from src import league_shards
+    from src import step_cache
+    from src.train_model import fit_model, load_binned
 except ImportError:
     import config
+    import model_registry
+    import league_shards
+    import step_cache
+    from train_model import fit_model, load_binned
 
-# Try SHAP for Explainability
-try:
-    import shap
-    SHAP_AVAILABLE = True
-except ImportError:
-    SHAP_AVAILABLE = False
-
-def train_model_hockey():
+def train_model_hockey(shards=None):
     print(f"🚀 Loading Hockey data from {config.HOCKEY_PROCESSED_PATH}...")
     
     if not config.HOCKEY_PROCESSED_PATH.exists():
         print(f"❌ Error: Data file not found. Run preprocess_hockey.py first.")
         return
 
+    # Inputs this version is trained on: the orchestrator skips the step while they are unchanged
+    fingerprint = step_cache.train_fingerprint('hockey.train')
     df = pd.read_csv(config.HOCKEY_PROCESSED_PATH)
 
     # 1. VERIFY TARGET
@@ -82,7 +85,7 @@ def train_model_hockey():
 
     # 5. TRAIN MODEL (HistGradientBoosting)
     print("🧠 Training Hockey Model (Regulation Result)...")
-    model = HistGradientBoostingClassifier(
+    model_params = dict(
         learning_rate=0.05,
         max_iter=300,
         max_depth=10,
@@ -92,7 +95,12 @@ def train_model_hockey():
         random_state=42,
         scoring='neg_log_loss'
     )
-    model.fit(X_train, y_train, sample_weight=w_train)
+    start = time.perf_counter()
+    binned = load_binned('hockey', config.HOCKEY_PROCESSED_PATH, X, model_params, X_train.index)
+    # Stops on the last weeks of the training games (time-ordered), then refits on all of them
+    model, early_stopping = fit_model(model_params, X_train, y_train, w_train, df['date'].iloc[:split_idx], binned)
+    train_seconds = time.perf_counter() - start
+    model_params['max_iter'] = model.max_iter
 
     # 6. EVALUATE
     print("📊 Generating Predictions...")
@@ -113,31 +121,37 @@ def train_model_hockey():
     except Exception as e:
         print(f"⚠️ Report Generation Error: {e}")
 
+    metrics = {'accuracy': round(float(accuracy_score(y_test, y_pred)), 4), 'holdout_rows': len(y_test)}
     try:
         loss = log_loss(y_test, y_prob, labels=[0, 1, 2])
+        metrics['log_loss'] = round(float(loss), 5)
         print(f"📉 Log Loss: {loss:.4f}")
     except Exception as e:
         print(f"⚠️ Log Loss Calculation Failed: {e}")
 
-    # 7. SAVE MODEL
-    print(f"💾 Saving Model to {config.HOCKEY_MODEL_PATH}...")
-    joblib.dump(model, config.HOCKEY_MODEL_PATH)
-    
-    # 8. SAVE SHAP EXPLAINER (Optional)
-    if SHAP_AVAILABLE:
-        print("🔍 Generating SHAP Explainer...")
-        try:
-            # Use a small background sample for speed
-            background_data = X_train.tail(200) 
-            explainer = shap.Explainer(model.predict, background_data)
-            
-            shap_path = config.MODELS_DIR / "shap_explainer_hockey.pkl"
-            print(f"💾 Saving SHAP Explainer to {shap_path}...")
-            joblib.dump(explainer, shap_path)
-        except Exception as e:
-            print(f"⚠️ SHAP Failed: {e}")
+    # 7. LEAGUE SHARDS (Optional, NHL/KHL/... get their own model when it beats the pooled one)
+    artifacts = {}
+    if config.LEAGUE_SHARDS if shards is None else shards:
+        artifacts, routed_probs = league_shards.train_shards(X, y, weights, split_idx, model_params, model, df['date'])
+        metrics['routed_log_loss'] = round(float(log_loss(y_test, routed_probs, labels=[0, 1, 2])), 5)
+        print(f"📉 Log Loss with league shards: {metrics['routed_log_loss']:.4f}")
+
+    # 8. SAVE MODEL (new registry version, promoted if it beats the current model on the same holdout)
+    current_metrics = league_shards.score_current('hockey', X_test, y_test)
+    version = model_registry.register(
+        'hockey', model, features, model_params, metrics,
+        model_registry.data_high_water(config.HOCKEY_PROCESSED_PATH, 'date'), train_seconds, artifacts,
+        training={'mode': 'full', **early_stopping, 'fingerprint': fingerprint},
+    )
+    model_registry.promote('hockey', version, legacy={
+        model_registry.MODEL_FILE: config.HOCKEY_MODEL_PATH,
+    }, current_metrics=current_metrics)
 
     print("✅ Hockey Training Complete.")
 
 if __name__ == "__main__":
-    train_model_hockey()
\ No newline at end of file
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--shards', action='store_true', default=None,
+                        help="Also train per-league shard models (default: config.LEAGUE_SHARDS)")
+    args = parser.parse_args()
+    train_model_hockey(args.shards)
\ No newline at end of file
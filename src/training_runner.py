@@ -0,0 +1,160 @@
+# Trains several models at once (football and hockey, with or without league
+# shards) on one CPU budget: every job runs in its own process with an explicit
+# share of the OpenMP threads, instead of each fit grabbing every core.
+#
+#     python src/training_runner.py --jobs football hockey --cpus 8
+#     python src/training_runner.py --jobs football hockey --compare   # + sequential baseline
+
+import argparse
+import json
+import multiprocessing
+import time
+import sys
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from threadpoolctl import threadpool_info, threadpool_limits
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+try:
+    from src import config
+    from src.profiler import count_csv_rows
+except ImportError:
+    import config
+    from profiler import count_csv_rows
+
+# name -> (module, function, processed data the job trains on, accepts incremental=)
+JOBS = {
+    'football': ('train_model', 'train_model', config.PROCESSED_DATA_PATH, True),
+    'hockey': ('train_model_hockey', 'train_model_hockey', config.HOCKEY_PROCESSED_PATH, False),
+}
+
+
+def thread_budget():
+    """OpenMP threads this process may use: its runner share, else every core."""
+    limits = [m['num_threads'] for m in threadpool_info() if m['user_api'] == 'openmp']
+    return min(limits) if limits else os.cpu_count() or 1
+
+
+def partition_threads(weights, cpus):
+    """
+    Splits `cpus` threads between jobs in proportion to `weights` (training rows),
+    largest remainders first. Every job gets at least one thread.
+    """
+    total = sum(weights) or len(weights)
+    exact = [cpus * (w or total / len(weights)) / total for w in weights]
+    shares = [max(1, int(x)) for x in exact]
+    for i in sorted(range(len(weights)), key=lambda i: exact[i] - int(exact[i]), reverse=True):
+        if sum(shares) >= cpus:
+            break
+        shares[i] += 1
+    return shares
+
+
+# --- ONE JOB (spawned process) ---
+
+def run_job(name, module, func, kwargs, threads):
+    """Calls module.func(**kwargs) with OpenMP capped at `threads`. Returns its timing record."""
+    try:
+        from src.orchestrator import load_module
+    except ImportError:
+        from orchestrator import load_module
+    start, cpu_start = time.perf_counter(), time.process_time()
+    # threadpoolctl only caps runtimes already loaded: import the trainer (and sklearn's OpenMP) first
+    job = getattr(load_module(module), func)
+    with threadpool_limits(limits=threads):
+        threads = thread_budget()   # What actually runs, recorded instead of what was asked for
+        job(**kwargs)
+    return {
+        'job': name, 'threads': threads,
+        'seconds': round(time.perf_counter() - start, 2),
+        'cpu_seconds': round(time.process_time() - cpu_start, 2),
+    }
+
+
+def _pool(workers):
+    # spawn: a fresh OpenMP runtime per job, so its thread cap is the only one in force
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+
+
+def run_isolated(module, func, threads, **kwargs):
+    """One training call in a child process limited to `threads` (used by the orchestrator)."""
+    with _pool(1) as pool:
+        return pool.submit(run_job, module, module, func, kwargs, threads).result()
+
+
+# --- RUNS ---
+
+def job_kwargs(job, shards=None, full=False):
+    kwargs = {} if shards is None else {'shards': shards}
+    if full and JOBS[job][3]:
+        kwargs['incremental'] = False
+    return kwargs
+
+
+def run_concurrent(jobs, cpus, kwargs):
+    shares = partition_threads([count_csv_rows(JOBS[job][2]) or 0 for job in jobs], cpus)
+    print(f"\n🧵 Concurrent: {', '.join(f'{job} x{n}' for job, n in zip(jobs, shares))} threads on {cpus} CPUs")
+    start = time.perf_counter()
+    with _pool(len(jobs)) as pool:
+        futures = [pool.submit(run_job, job, *JOBS[job][:2], kwargs[job], threads) for job, threads in zip(jobs, shares)]
+        results = [future.result() for future in futures]
+    return time.perf_counter() - start, results
+
+
+def run_sequential(jobs, cpus, kwargs):
+    print(f"\n🧵 Sequential baseline: one job at a time on all {cpus} CPUs")
+    start = time.perf_counter()
+    with _pool(1) as pool:
+        results = [pool.submit(run_job, job, *JOBS[job][:2], kwargs[job], cpus).result() for job in jobs]
+    return time.perf_counter() - start, results
+
+
+def run_training(jobs=None, cpus=None, compare=False, shards=None, full=False, log_path=None):
+    """
+    Trains `jobs` concurrently with partitioned threads. compare=True first runs
+    them one after another on the whole budget and reports the speedup; models are
+    trained and registered twice, both times as full refits so the work is the same.
+    Every run is appended to TRAINING_RUNS_LOG_PATH.
+    """
+    jobs = jobs or list(JOBS)
+    cpus = cpus or config.TRAINING_RUNNER_CPUS
+    log_path = log_path or config.TRAINING_RUNS_LOG_PATH
+    kwargs = {job: job_kwargs(job, shards, full or compare) for job in jobs}
+
+    record = {'timestamp': datetime.now().isoformat(timespec='seconds'), 'jobs': jobs, 'cpus': cpus,
+              'shards': shards, 'full': full or compare}
+    if compare:
+        seconds, results = run_sequential(jobs, cpus, kwargs)
+        record.update(sequential_seconds=round(seconds, 2), sequential=results)
+    seconds, results = run_concurrent(jobs, cpus, kwargs)
+    record.update(concurrent_seconds=round(seconds, 2), concurrent=results)
+
+    print("\n" + "=" * 60)
+    for mode in ('sequential', 'concurrent'):
+        for r in record.get(mode, []):
+            print(f"   {mode:<11} {r['job']:<9} {r['threads']:>3} threads {r['seconds']:>8}s  (cpu {r['cpu_seconds']}s)")
+    print(f"⏱️ Concurrent wall time: {record['concurrent_seconds']}s")
+    if compare:
+        speedup = record['sequential_seconds'] / record['concurrent_seconds'] if record['concurrent_seconds'] else 0
+        record['speedup'] = round(speedup, 2)
+        print(f"⏱️ Sequential wall time: {record['sequential_seconds']}s -> {speedup:.2f}x")
+
+    log_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(log_path, 'a') as f:
+        f.write(json.dumps(record) + "\n")
+    print(f"💾 Run appended to {log_path}")
+    return record
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--jobs', nargs='+', choices=list(JOBS), default=list(JOBS))
+    parser.add_argument('--cpus', type=int, default=None, help="Threads shared by all jobs (default: every core)")
+    parser.add_argument('--compare', action='store_true', help="Also time the sequential baseline")
+    parser.add_argument('--shards', action='store_true', default=None,
+                        help="Also train league shards, inside each job's thread share")
+    parser.add_argument('--full', action='store_true', help="Force full refits (implied by --compare)")
+    args = parser.parse_args()
+    run_training(args.jobs, args.cpus, args.compare, args.shards, args.full)
@@ -0,0 +1,203 @@
+import json
+import multiprocessing
+import time
+import sys
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+import optuna
+from sklearn.ensemble import HistGradientBoostingClassifier
+from sklearn.metrics import log_loss
+from sklearn.model_selection import TimeSeriesSplit
+from threadpoolctl import threadpool_limits
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+try:
+    from src import config
+    from src import model_registry
+    from src import binned_dataset
+except ImportError:
+    import config
+    import model_registry
+    import binned_dataset
+
+# --- DATASET (parsed once, shared read-only) ---
+
+def prepare_dataset(name, data_path, ensure_target, date_col, features):
+    """
+    Converts the processed CSV into float32 X / int8 y .npy files under
+    TUNING_DIR/<name>/, rebuilt only when the CSV changes. Workers open them
+    with mmap_mode='r', so every process shares the same pages.
+    rows.npy maps them back to CSV rows (the binned dataset's order).
+    """
+    out_dir = config.TUNING_DIR / name
+    stat = os.stat(data_path)
+    meta = {'source': str(data_path), 'size': stat.st_size, 'mtime': stat.st_mtime, 'features': list(features)}
+    meta_path = out_dir / "meta.json"
+    if meta_path.exists() and (out_dir / "rows.npy").exists():
+        with open(meta_path, 'r') as f:
+            if json.load(f) == meta:
+                print(f"📦 Reusing memory-mapped dataset {out_dir}")
+                return out_dir
+
+    start = time.perf_counter()
+    df = pd.read_csv(data_path)
+    df = ensure_target(df)
+    if date_col in df.columns:
+        df[date_col] = pd.to_datetime(df[date_col], format='mixed')
+        df = df.sort_values(date_col)
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    np.save(out_dir / "X.npy", df[features].fillna(0).to_numpy(dtype=np.float32))
+    np.save(out_dir / "y.npy", df['target'].to_numpy(dtype=np.int8))
+    np.save(out_dir / "rows.npy", df.index.to_numpy())
+    with open(meta_path, 'w') as f:
+        json.dump(meta, f)
+    print(f"📦 Dataset {len(df):,} x {len(features)} -> float32 {out_dir} ({time.perf_counter() - start:.1f}s)")
+    return out_dir
+
+
+def load_dataset(data_dir):
+    return np.load(data_dir / "X.npy", mmap_mode='r'), np.load(data_dir / "y.npy", mmap_mode='r')
+
+
+def load_rows(data_dir):
+    return np.load(data_dir / "rows.npy", mmap_mode='r')
+
+
+# --- ITERATIONS (from the trainer's early stopping) ---
+
+def recorded_iterations(name, learning_rate):
+    """
+    Boosting iterations for a trial's `learning_rate`: the served model's
+    early-stopped iteration count, scaled by the learning-rate ratio.
+    None until a model with early stopping has been registered.
+    """
+    version = model_registry.current_version(name)
+    if version is None:
+        return None
+    manifest = model_registry.load_manifest(name, version)
+    best = (manifest.get('training') or {}).get('best_iteration')
+    reference = manifest['params'].get('learning_rate')
+    if not best or not reference:
+        return None
+    return int(np.clip(np.ceil(best * reference / learning_rate), 10, config.EARLY_STOPPING_MAX_ITER))
+
+
+# --- OBJECTIVE ---
+
+def make_objective(data_dir, suggest_params, n_splits, binned=None):
+    """`binned`: one binned_dataset per split, thresholds fitted on that split's training rows."""
+    X, y = load_dataset(data_dir)
+    rows = load_rows(data_dir) if binned is not None else None
+    splits = list(TimeSeriesSplit(n_splits=n_splits).split(X))
+
+    def objective(trial):
+        model = HistGradientBoostingClassifier(**suggest_params(trial))
+        use_bins = binned is not None and binned_dataset.usable(model, binned[0])
+        scores = []
+        try:
+            for step, (train, valid) in enumerate(splits):
+                # Time-ordered folds are contiguous: slices stay views of the memory map
+                train, valid = slice(train[0], train[-1] + 1), slice(valid[0], valid[-1] + 1)
+                if use_bins and not binned_dataset.holds_out_validation(model, train.stop - train.start):
+                    # Fit and score on the cached bins: no fold is binned again
+                    binned_dataset.fit_binned(model, binned[step], None, y[train], rows=rows[train])
+                    probs = binned_dataset.predict_proba_binned(model, binned[step], rows[valid])
+                else:
+                    model.fit(X[train], y[train])
+                    probs = model.predict_proba(X[valid])
+                scores.append(-log_loss(y[valid], probs, labels=[0, 1, 2]))
+                # Report after every fold: hopeless trials stop before the last (largest) fold
+                trial.report(float(np.mean(scores)), step)
+                if trial.should_prune():
+                    raise optuna.TrialPruned()
+        except optuna.TrialPruned:
+            raise
+        except Exception as e:
+            print(f"⚠️ Trial failed: {e}")
+            return -9999
+        return float(np.mean(scores))
+
+    return objective
+
+
+# --- STUDY ---
+
+def storage_url():
+    config.TUNING_DIR.mkdir(parents=True, exist_ok=True)
+    return f"sqlite:///{config.TUNING_DIR / 'optuna.db'}"
+
+
+def get_study(name):
+    """Resumable: the same study name continues from the trials already stored."""
+    storage = optuna.storages.RDBStorage(storage_url(), engine_kwargs={'connect_args': {'timeout': 60}})
+    return optuna.create_study(
+        study_name=name, storage=storage, direction="maximize", load_if_exists=True,
+        pruner=optuna.pruners.MedianPruner(n_startup_trials=config.TUNING_STARTUP_TRIALS, n_warmup_steps=0),
+    )
+
+
+def _worker(name, data_dir, suggest_params, n_splits, n_trials, threads, binned_dirs=None):
+    optuna.logging.set_verbosity(optuna.logging.WARNING)
+    study = get_study(name)
+    binned = [binned_dataset.load(d) for d in binned_dirs] if binned_dirs else None
+    with threadpool_limits(limits=threads):
+        study.optimize(make_objective(data_dir, suggest_params, n_splits, binned), n_trials=n_trials)
+    if binned is not None:
+        binned_dataset.report(binned, f"Worker {os.getpid()}")
+
+
+def run_study(name, data_path, ensure_target, date_col, suggest_params, best_params_path,
+              n_trials=None, workers=None, n_splits=3, features=None):
+    """
+    Shared runner of optimize.py / optimize_hockey.py.
+    Trials are spread over `workers` processes sharing one SQLite study;
+    re-running only adds the trials still missing to reach n_trials.
+    """
+    n_trials = n_trials or config.TUNING_TRIALS
+    workers = workers or config.TUNING_WORKERS
+    features = features or config.MODEL_FEATURES
+
+    data_dir = prepare_dataset(name, data_path, ensure_target, date_col, features)
+    binned_dirs = None
+    if config.BINNED_CACHE:
+        # One cache per fold boundary: a split's thresholds never see its validation rows
+        rows = load_rows(data_dir)
+        binned_dirs = [binned_dataset.prepare(name, data_path, features,
+                                              [i for i, col in enumerate(features) if col == 'league_id'],
+                                              fit_rows=rows[train])
+                       for train, _ in TimeSeriesSplit(n_splits=n_splits).split(rows)]
+    study = get_study(name)
+    finished = [t for t in study.trials if t.state.is_finished()]
+    todo = max(0, n_trials - len(finished))
+    print(f"🗂️ Study '{name}' in {storage_url()}: {len(finished)} trials stored, {todo} to run on {workers} workers")
+
+    start = time.perf_counter()
+    if todo:
+        threads = max(1, (os.cpu_count() or 1) // workers)
+        shares = [todo // workers + (i < todo % workers) for i in range(workers)]
+        # spawn: building the binned caches ran OpenMP in this process, which does not survive a fork
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+            futures = [pool.submit(_worker, name, data_dir, suggest_params, n_splits, share, threads, binned_dirs)
+                       for share in shares if share]
+            for future in futures:
+                future.result()
+
+    study = get_study(name)
+    states = pd.Series([t.state.name for t in study.trials]).value_counts().to_dict()
+    print(f"⏱️ {todo} trials in {time.perf_counter() - start:.1f}s | study totals: {states}")
+
+    trial = study.best_trial
+    print("\n🏆 Best trial:")
+    print(f"   Value: {trial.value}")
+    print("   Params: ")
+    for key, value in trial.params.items():
+        print(f"    {key}: {value}")
+
+    with open(best_params_path, "w") as f:
+        json.dump(trial.params, f, indent=4)
+    print(f"\n✅ Optimization Complete. Saved to {best_params_path}")
+    return study
\ No newline at end of file